@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compression benchmark - MavecodeCourse
+Reports bytes on the wire and CPU per request for each encoding on catalog-sized
+JSON payloads: compressing every response (CompressionMiddleware levels) versus
+serving the precompressed bytes stored in the catalog cache.
+
+Usage: python benchmarks/bench_compression.py [iterations]
+"""
+
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+now = datetime.now(timezone.utc).isoformat()
+
+
+def article_list(n=100, content_chars=20_000):
+    return json.dumps([{
+        'id': str(uuid.uuid4()), 'slug': f'artikel-{i}', 'title': f'Artikel ke-{i}',
+        'content': 'Belajar coding itu menyenangkan. ' * (content_chars // 33),
+        'excerpt': 'Ringkasan artikel.', 'thumbnail': None, 'category': 'tutorial',
+        'tags': ['coding', 'tips'], 'author': 'Firza Ilmi', 'views': i, 'created_at': now, 'updated_at': now
+    } for i in range(n)]).encode()
+
+
+def course_list(n=100):
+    return json.dumps([{
+        'id': str(uuid.uuid4()), 'title': f'Kursus {i}', 'description': 'Deskripsi kursus. ' * 10,
+        'thumbnail': 'https://images.unsplash.com/photo-1?w=400', 'price': 199000, 'is_free': False,
+        'category': 'web', 'level': 'beginner', 'duration_hours': 10, 'instructor': 'Firza Ilmi',
+        'created_at': now, 'updated_at': now
+    } for i in range(n)]).encode()
+
+
+def cpu_ms(fn):
+    started = time.process_time()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.process_time() - started) / ITERATIONS * 1000
+
+
+def main():
+    encodings = ['gzip'] + (['br'] if server.brotli is not None else [])
+    payloads = [('articles (full)', article_list()), ('courses', course_list())]
+    print(f"{'payload':<18}{'encoding':<10}{'bytes':>10}{'ratio':>8}{'per-request ms':>16}{'cached hit ms':>15}")
+    for name, body in payloads:
+        print(f"{name:<18}{'identity':<10}{len(body):>10}{1.0:>8.2f}{0.0:>16.3f}{0.0:>15.3f}")
+        for encoding in encodings:
+            dynamic = server.compress_body(body, encoding)
+            dynamic_ms = cpu_ms(lambda: server.compress_body(body, encoding))
+
+            cache = server.CatalogCache(ttl=60, max_entries=8)
+            entry = cache.put('/bench', body, 'application/json', frozenset())
+            cache.encoded_body(entry, encoding)
+            hit_ms = cpu_ms(lambda: cache.encoded_body(entry, encoding))
+            stored = entry.encoded[encoding]
+
+            print(f"{'':<18}{encoding:<10}{len(dynamic):>10}{len(body) / len(dynamic):>8.1f}"
+                  f"{dynamic_ms:>16.3f}{hit_ms:>15.3f}   (cached bytes: {len(stored)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Export benchmark - MavecodeCourse
+Seeds a scratch database with progress rows, streams /api/admin/export/progress from
+a uvicorn subprocess and reports throughput and the server's RSS before the export
+and at its peak. Peak RSS should stay flat as the row count grows: the run fails (exit
+status 1) when the export grows it by more than the limit.
+
+Usage: python benchmarks/bench_export.py [rows] [ndjson|csv] [max_growth_mb]
+Defaults: 10,000,000 rows, ndjson, 64 MB.
+Requires MONGO_URL; writes only to the `<DB_NAME>_bench` database and drops it afterwards.
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import httpx
+
+import server
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+FORMAT = sys.argv[2] if len(sys.argv) > 2 else 'ndjson'
+MAX_GROWTH_MB = float(sys.argv[3]) if len(sys.argv) > 3 else 64
+SEED_BATCH = 10_000
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def memory_kb(pid: int, field: str) -> int:
+    for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+        if line.startswith(field + ':'):
+            return int(line.split()[1])
+    return 0
+
+
+async def seed(db):
+    now = server.utcnow()
+    for start in range(0, ROWS, SEED_BATCH):
+        await db.progress.insert_many([{
+            'user_id': f'user-{i // 40}', 'course_id': f'course-{i % 25}', 'video_id': f'video-{i % 40}',
+            'completed': i % 3 != 0, 'progress_percent': i % 101, 'updated_at': now
+        } for i in range(start, min(start + SEED_BATCH, ROWS))], ordered=False)
+
+
+def wait_until_up(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+def export(pid: int, base_url: str) -> tuple:
+    headers = {'Authorization': 'Bearer ' + server.create_token('admin', is_admin=True)}
+    rows = size = 0
+    started = time.perf_counter()
+    with httpx.stream('GET', f'{base_url}/api/admin/export/progress', params={'format': FORMAT},
+                      headers=headers, timeout=None) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes():
+            rows += chunk.count(b'\n')
+            size += len(chunk)
+    elapsed = time.perf_counter() - started
+    if FORMAT == 'csv':
+        rows -= 1  # header
+    return rows, size, elapsed, memory_kb(pid, 'VmHWM')
+
+
+async def main():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    bench_name = f"{server.db_name}_bench"
+    bench_db = server.client[bench_name]
+    await server.client.drop_database(bench_name)
+    print(f"Seeding {ROWS:,} progress rows...")
+    await seed(bench_db)
+
+    port = free_port()
+    env = {**os.environ, 'DB_NAME': bench_name, 'RATE_LIMIT_ENABLED': 'false'}
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'server:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_until_up(base_url + '/api/')
+        idle_kb = memory_kb(proc.pid, 'VmRSS')
+        rows, size, elapsed, peak_kb = await asyncio.to_thread(export, proc.pid, base_url)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+        await server.client.drop_database(bench_name)
+
+    print(f"{'format':<8}{'rows':>12}{'MB':>10}{'seconds':>10}{'rows/s':>12}{'idle RSS MB':>14}{'peak RSS MB':>14}")
+    print(f"{FORMAT:<8}{rows:>12,}{size / 1e6:>10.1f}{elapsed:>10.1f}{rows / elapsed:>12,.0f}"
+          f"{idle_kb / 1024:>14.1f}{peak_kb / 1024:>14.1f}")
+    growth_mb = (peak_kb - idle_kb) / 1024
+    if growth_mb > MAX_GROWTH_MB:
+        print(f"❌ Peak RSS grew {growth_mb:.1f} MB during the export, over the {MAX_GROWTH_MB:g} MB limit")
+        exit(1)
+    print(f"✅ Peak RSS grew {growth_mb:.1f} MB, within the {MAX_GROWTH_MB:g} MB limit")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Id layout benchmark - MavecodeCourse
+Seeds the same users and progress rows in the old layout (ObjectId _id plus a string
+`id` with its own unique index, string references) and in the current one (binary UUID
+_id, binary references), then reports data size, index sizes and their sum - the
+working set a fully cached collection needs - plus by-id lookup latency for each.
+
+Usage: python benchmarks/bench_ids.py [users] [progress_rows]
+Defaults: 1,000,000 users, 10,000,000 progress rows.
+Requires MONGO_URL; writes only to the `<DB_NAME>_bench` database and drops it afterwards.
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+PROGRESS_ROWS = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000_000
+COURSES = 200
+VIDEOS_PER_COURSE = 25
+SEED_BATCH = 10_000
+LOOKUPS = 2_000
+
+
+def user_doc(user_id: str, i: int, legacy: bool) -> dict:
+    doc = {'email': f'user{i}@example.com', 'name': f'User {i}', 'phone': None, 'is_premium': i % 5 == 0,
+           'created_at': server.utcnow()}
+    return {'id': user_id, **doc} if legacy else {'_id': server.store_id(user_id), **doc}
+
+
+def progress_doc(user_id: str, course_id: str, video_id: str, i: int, legacy: bool) -> dict:
+    doc = {'user_id': user_id, 'course_id': course_id, 'video_id': video_id}
+    return {**(doc if legacy else server.stored_document(doc)), 'completed': i % 3 != 0,
+            'progress_percent': i % 101, 'updated_at': server.utcnow()}
+
+
+async def seed(db, legacy: bool, user_ids: list, course_ids: list, video_ids: list):
+    users, progress = db.users, db.progress
+    for start in range(0, USERS, SEED_BATCH):
+        await users.insert_many([user_doc(user_ids[i], i, legacy)
+                                 for i in range(start, min(start + SEED_BATCH, USERS))], ordered=False)
+    for start in range(0, PROGRESS_ROWS, SEED_BATCH):
+        rows = []
+        for i in range(start, min(start + SEED_BATCH, PROGRESS_ROWS)):
+            course = i % COURSES
+            rows.append(progress_doc(user_ids[i // 10 % USERS], course_ids[course],
+                                     video_ids[course * VIDEOS_PER_COURSE + i % VIDEOS_PER_COURSE], i, legacy))
+        await progress.insert_many(rows, ordered=False)
+    if legacy:
+        await users.create_index('id', unique=True)
+    await users.create_index('email', unique=True)
+    await progress.create_index([('user_id', 1), ('course_id', 1), ('video_id', 1)])
+
+
+async def lookup_ms(db, legacy: bool, user_ids: list) -> float:
+    samples = []
+    for user_id in random.sample(user_ids, min(LOOKUPS, len(user_ids))):
+        query = {'id': user_id} if legacy else server.by_id(user_id)
+        started = time.perf_counter()
+        await db.users.find_one(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def main():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    random.seed(7)
+    user_ids = [str(uuid.uuid4()) for _ in range(USERS)]
+    course_ids = [str(uuid.uuid4()) for _ in range(COURSES)]
+    video_ids = [str(uuid.uuid4()) for _ in range(COURSES * VIDEOS_PER_COURSE)]
+
+    print(f"{USERS:,} users, {PROGRESS_ROWS:,} progress rows")
+    print(f"{'layout':<8}{'collection':<11}{'avg doc B':>10}{'data MB':>10}{'index MB':>10}"
+          f"{'working MB':>12}{'  indexes'}")
+    for layout, legacy in (('old', True), ('binary', False)):
+        bench_name = f"{server.db_name}_bench"
+        bench_db = server.client[bench_name]
+        await server.client.drop_database(bench_name)
+        try:
+            await seed(bench_db, legacy, user_ids, course_ids, video_ids)
+            for name in ('users', 'progress'):
+                stats = await bench_db.command('collStats', name)
+                indexes = ', '.join(f"{index} {size / 1e6:.0f}" for index, size in stats['indexSizes'].items())
+                print(f"{layout:<8}{name:<11}{stats['avgObjSize']:>10.0f}{stats['size'] / 1e6:>10.0f}"
+                      f"{stats['totalIndexSize'] / 1e6:>10.0f}{(stats['size'] + stats['totalIndexSize']) / 1e6:>12.0f}"
+                      f"  {indexes}")
+            print(f"{layout:<8}user by id p50: {await lookup_ms(bench_db, legacy, user_ids):.3f} ms")
+        finally:
+            await server.client.drop_database(bench_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+List view benchmark - MavecodeCourse
+Seeds a scratch database with long articles and courses, then measures payload
+size and latency of /api/articles and /api/courses for view=full vs view=summary.
+
+Usage: python benchmarks/bench_list_views.py [documents] [article_chars]
+Requires MONGO_URL; writes only to the `<DB_NAME>_bench` database and drops it afterwards.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+import server
+
+DOCUMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+ARTICLE_CHARS = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+ROUNDS = 30
+
+
+async def seed(db):
+    now = datetime.now(timezone.utc).isoformat()
+    await db.articles.insert_many([{
+        'id': str(uuid.uuid4()), 'slug': f'artikel-{i}', 'title': f'Artikel ke-{i}',
+        'content': 'Belajar coding itu menyenangkan. ' * (ARTICLE_CHARS // 33),
+        'excerpt': 'Ringkasan artikel.', 'thumbnail': None, 'category': 'tutorial',
+        'tags': ['coding'], 'author': 'Firza Ilmi', 'views': i, 'created_at': now, 'updated_at': now
+    } for i in range(DOCUMENTS)])
+    await db.courses.insert_many([{
+        'id': str(uuid.uuid4()), 'title': f'Kursus {i}', 'description': 'Deskripsi kursus yang panjang. ' * 60,
+        'thumbnail': None, 'price': 199000, 'is_free': False, 'category': 'web', 'level': 'beginner',
+        'duration_hours': 10, 'instructor': 'Firza Ilmi', 'created_at': now, 'updated_at': now
+    } for i in range(DOCUMENTS)])
+
+
+async def measure(http, path, view):
+    latencies = []
+    size = 0
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        response = await http.get(path, params={'view': view})
+        latencies.append((time.perf_counter() - started) * 1000)
+        size = len(response.content)
+    return statistics.median(latencies), size
+
+
+async def main():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    bench_db = server.client[f"{server.db_name}_bench"]
+    await bench_db.client.drop_database(bench_db.name)
+    server.db = bench_db
+    await seed(bench_db)
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as http:
+        print(f"{DOCUMENTS} documents, {ARTICLE_CHARS} chars per article")
+        print(f"{'endpoint':<16}{'view':<10}{'p50 ms':>10}{'bytes':>12}")
+        for path in ('/api/articles', '/api/courses'):
+            for view in ('full', 'summary'):
+                p50, size = await measure(http, path, view)
+                print(f"{path:<16}{view:<10}{p50:>10.2f}{size:>12}")
+
+    await bench_db.client.drop_database(bench_db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
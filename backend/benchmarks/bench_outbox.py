@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Outbox dispatch benchmark - MavecodeCourse
+Starts a local SMTP stub, queues the same number of email notifications for each
+batch size and times the dispatcher draining them, reporting notifications per
+second and how many messages reached the stub. Webhooks are not included: their
+cost is the receiving endpoint's latency.
+
+Usage: python benchmarks/bench_outbox.py [notifications] [batch_sizes]
+Defaults: 5,000 notifications, batch sizes 1,10,100,500.
+Requires MONGO_URL; writes only to the `<DB_NAME>_bench` database and drops it afterwards.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / 'tests'))
+
+import server
+from smtp_stub import SMTPStub
+
+NOTIFICATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+BATCH_SIZES = [int(size) for size in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 10, 100, 500]
+QUEUE_BATCH = 1_000
+
+
+async def drain() -> int:
+    sent = 0
+    while batch := await server.dispatch_outbox_batch():
+        sent += batch
+    return sent
+
+
+async def main():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    stub = SMTPStub(keep_messages=False)
+    server.SMTP_HOST, server.SMTP_PORT = '127.0.0.1', await stub.start()
+    server.SMTP_STARTTLS, server.SMTP_USER = False, None
+    bench_name = f"{server.db_name}_bench"
+    server.db = server.client[bench_name]
+    await server.client.drop_database(bench_name)
+    try:
+        print(f"{NOTIFICATIONS:,} email notifications per run")
+        print(f"{'batch':>6}{'seconds':>10}{'per second':>12}{'received':>10}")
+        for batch_size in BATCH_SIZES:
+            await server.db.outbox.drop()
+            await server.setup_outbox()
+            for start in range(0, NOTIFICATIONS, QUEUE_BATCH):
+                await server.queue_notifications([
+                    server.email_notification(f"bench:{i}", 'bench', f"user{i}@example.com", 'Bench', 'Body\n')
+                    for i in range(start, min(start + QUEUE_BATCH, NOTIFICATIONS))
+                ])
+            server.OUTBOX_BATCH_SIZE = batch_size
+            stub.received = 0
+            started = time.perf_counter()
+            sent = await drain()
+            seconds = time.perf_counter() - started
+            print(f"{batch_size:>6}{seconds:>10.2f}{sent / seconds:>12.0f}{stub.received:>10,}")
+    finally:
+        await server.client.drop_database(bench_name)
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Quiz grading benchmark - MavecodeCourse
+Builds random submissions to one quiz, stored as the server stores them (one byte per
+answer), then times grading them and computing per-question difficulty and
+discrimination with the server's NumPy functions against a per-submission Python loop.
+
+Usage: python benchmarks/bench_quiz.py [submissions] [questions]
+Defaults: 100,000 submissions, 20 questions.
+Runs in memory; no database needed.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server
+
+SUBMISSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+QUESTIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+OPTIONS = 4
+
+
+def build():
+    answer_key = bytes(random.randrange(OPTIONS) for _ in range(QUESTIONS))
+    submissions = []
+    for _ in range(SUBMISSIONS):
+        skill = random.random()
+        submissions.append(server.encode_answers([
+            key if random.random() < skill else random.choice([None, *range(OPTIONS)]) for key in answer_key
+        ]))
+    return answer_key, submissions
+
+
+def loop_grade(answer_key: bytes, submissions: list) -> dict:
+    correct = [[answer == key for answer, key in zip(submission, answer_key)] for submission in submissions]
+    scores = [sum(row) for row in correct]
+    difficulty, discrimination = [], []
+    n = len(correct)
+    for j in range(QUESTIONS):
+        item = [float(row[j]) for row in correct]
+        rest = [score - x for score, x in zip(scores, item)]
+        item_mean, rest_mean = sum(item) / n, sum(rest) / n
+        covariance = sum((x - item_mean) * (r - rest_mean) for x, r in zip(item, rest))
+        spread = (sum((x - item_mean) ** 2 for x in item) * sum((r - rest_mean) ** 2 for r in rest)) ** 0.5
+        difficulty.append(item_mean)
+        discrimination.append(covariance / spread if spread else float('nan'))
+    return {'difficulty': difficulty, 'discrimination': discrimination, 'scores': scores}
+
+
+def vector_grade(answer_key: bytes, submissions: list) -> dict:
+    answers = np.frombuffer(b''.join(submissions), dtype=np.uint8).reshape(-1, QUESTIONS)
+    return server.quiz_item_statistics(server.grade_answers(answer_key, answers))
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    random.seed(7)
+    answer_key, submissions = build()
+    print(f"{SUBMISSIONS:,} submissions x {QUESTIONS} questions")
+    vector, vector_s = timed(vector_grade, answer_key, submissions)
+    loop, loop_s = timed(loop_grade, answer_key, submissions)
+    assert np.array_equal(vector['scores'], loop['scores'])
+    assert np.allclose(vector['discrimination'], loop['discrimination'], equal_nan=True)
+    print(f"{'method':<8}{'total ms':>10}{'per 1k ms':>11}")
+    for name, seconds in (('loop', loop_s), ('numpy', vector_s)):
+        print(f"{name:<8}{seconds * 1000:>10.1f}{seconds * 1e6 / SUBMISSIONS:>11.3f}")
+    print(f"speedup {loop_s / vector_s:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
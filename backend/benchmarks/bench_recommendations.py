@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Recommendation benchmark - MavecodeCourse
+Builds the co-occurrence model from synthetic engagement (popularity-skewed course
+picks per user) and reports build time, model memory and per-call latency of
+CourseRecommender.recommend for users with history and for cold-start users.
+
+Usage: python benchmarks/bench_recommendations.py [users] [courses]
+Defaults: 200,000 users, 200 courses. No database needed.
+"""
+
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+COURSES = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+CALLS = 20_000
+
+
+def synthetic():
+    courses = [{'id': str(uuid.uuid4()), 'title': f'Kursus {i}', 'category': f'cat-{i % 8}',
+                'level': ('beginner', 'intermediate', 'advanced')[i % 3]} for i in range(COURSES)]
+    weights = [1 / (rank + 1) for rank in range(COURSES)]
+    user_courses = {}
+    for u in range(USERS):
+        picks = random.choices(courses, weights=weights, k=random.randint(1, 6))
+        user_courses[f'user-{u}'] = {c['id'] for c in picks}
+    return courses, user_courses
+
+
+def latency_us(fn, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    random.seed(7)
+    courses, user_courses = synthetic()
+    started = time.perf_counter()
+    model = server.CourseRecommender.build(courses, user_courses)
+    build_s = time.perf_counter() - started
+    model.similarity_matrix()
+
+    matrix_kb = (model.counts.nbytes + model.similarity.nbytes) / 1024
+    print(f"{USERS:,} users, {COURSES} courses: build {build_s:.2f}s, matrices {matrix_kb:.0f} KiB")
+
+    users = random.choices(list(user_courses), k=CALLS)
+    cases = [
+        ('with history', [(u, 5, None, None) for u in users]),
+        ('cold start', [(None, 5, None, None)] * CALLS),
+        ('cold + category', [(None, 5, 'cat-3', 'beginner')] * CALLS),
+    ]
+    print(f"{'case':<18}{'p50 us':>10}{'p99 us':>10}")
+    for name, args_list in cases:
+        p50, p99 = latency_us(model.recommend, args_list)
+        print(f"{name:<18}{p50:>10.1f}{p99:>10.1f}")
+
+    started = time.perf_counter()
+    for u in range(CALLS):
+        model.observe(f'user-{u}', courses[u % COURSES]['id'])
+    print(f"observe: {(time.perf_counter() - started) / CALLS * 1e6:.1f} us per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Serialization micro-benchmark - MavecodeCourse
+Compares CPU per request for the big list endpoints between FastAPI's default
+response_model validation + stdlib JSON encoding and the FAST_SERIALIZATION path.
+
+Usage: python benchmarks/bench_serialization.py [iterations]
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+import server
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+now = datetime.now(timezone.utc).isoformat()
+
+
+def make_articles(n=100, content_chars=20_000):
+    return [{
+        'id': str(uuid.uuid4()), 'slug': f'artikel-{i}', 'title': f'Artikel ke-{i}',
+        'content': 'Belajar coding itu menyenangkan. ' * (content_chars // 33),
+        'excerpt': 'Ringkasan artikel.', 'thumbnail': 'https://images.unsplash.com/photo-1?w=400',
+        'category': 'tutorial', 'tags': ['coding', 'tips'], 'author': 'Firza Ilmi',
+        'views': i, 'created_at': now, 'updated_at': now
+    } for i in range(n)]
+
+
+def make_courses(n=100):
+    return [{
+        'id': str(uuid.uuid4()), 'title': f'Kursus {i}', 'description': 'Deskripsi kursus. ' * 20,
+        'thumbnail': 'https://images.unsplash.com/photo-1?w=400', 'price': 199000, 'is_free': False,
+        'category': 'web', 'level': 'beginner', 'duration_hours': 10, 'instructor': 'Firza Ilmi',
+        'created_at': now, 'updated_at': now
+    } for i in range(n)]
+
+
+def make_certificates(n=100):
+    return [{
+        'id': f'CERT-{uuid.uuid4().hex[:12].upper()}', 'user_id': str(uuid.uuid4()), 'user_name': 'Siswa',
+        'course_id': str(uuid.uuid4()), 'course_title': 'Kursus', 'issued_at': now,
+        'is_signed': False, 'signature_url': None
+    } for i in range(n)]
+
+
+def route_for(path):
+    return next(r for r in server.app.routes if getattr(r, 'path', None) == path and 'GET' in r.methods)
+
+
+def default_path(route, docs):
+    content = asyncio.run(serialize_response(field=route.response_field, response_content=docs))
+    return JSONResponse(content).body
+
+
+def fast_path(model, docs):
+    server.FAST_SERIALIZATION = True
+    return server.model_list_response(model, docs).body
+
+
+def cpu_per_request(fn, *args):
+    fn(*args)  # warm-up
+    started = time.process_time()
+    for _ in range(ITERATIONS):
+        body = fn(*args)
+    return (time.process_time() - started) / ITERATIONS * 1000, len(body)
+
+
+def main():
+    cases = [
+        ('/api/articles', server.ArticleResponse, make_articles()),
+        ('/api/courses', server.CourseResponse, make_courses()),
+        ('/api/admin/certificates', server.CertificateResponse, make_certificates()),
+    ]
+    print(f"{'endpoint':<26}{'default ms':>12}{'fast ms':>10}{'speedup':>9}{'bytes':>10}")
+    for path, model, docs in cases:
+        default_ms, size = cpu_per_request(default_path, route_for(path), docs)
+        fast_ms, _ = cpu_per_request(fast_path, model, docs)
+        print(f"{path:<26}{default_ms:>12.3f}{fast_ms:>10.3f}{default_ms / fast_ms:>8.1f}x{size:>10}")
+
+
+if __name__ == "__main__":
+    main()
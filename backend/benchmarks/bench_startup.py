@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark - MavecodeCourse
+Measures cold import time of server.py, lifespan startup time and the latency of
+the first and second requests, with and without Mongo warm-up pings. Every sample
+runs in a fresh interpreter so nothing is cached between runs.
+
+Usage: python benchmarks/bench_startup.py [runs]
+First-request numbers hit /api/courses when MONGO_URL is set, /api/ otherwise.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != 'child' else 5
+
+
+async def child():
+    started = time.perf_counter()
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    imported = time.perf_counter()
+    import httpx
+
+    path = '/api/courses' if server.mongo_url else '/api/'
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.lifespan(server.app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as http:
+            t0 = time.perf_counter()
+            await http.get(path)
+            t1 = time.perf_counter()
+            await http.get(path)
+            t2 = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'startup_ms': (ready - imported) * 1000,
+        'first_request_ms': (t1 - t0) * 1000,
+        'second_request_ms': (t2 - t1) * 1000,
+    }))
+
+
+def sample(warmup_pings):
+    env = {**os.environ, 'MONGO_WARMUP_PINGS': str(warmup_pings)}
+    out = subprocess.run(
+        [sys.executable, __file__, 'child'], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'warm-up pings':<15}{'import ms':>11}{'startup ms':>12}{'1st req ms':>12}{'2nd req ms':>12}")
+    for pings in (0, int(os.environ.get('MONGO_WARMUP_PINGS', '2'))):
+        runs = [sample(pings) for _ in range(RUNS)]
+        med = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        print(f"{pings:<15}{med['import_ms']:>11.1f}{med['startup_ms']:>12.1f}"
+              f"{med['first_request_ms']:>12.1f}{med['second_request_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'child':
+        asyncio.run(child())
+    else:
+        main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Timestamp storage benchmark - MavecodeCourse
+Seeds the same progress rows twice, once with ISO string `updated_at` (the old format)
+and once with BSON datetimes, indexes both on updated_at and reports document and
+index sizes plus the latency of a one-day range query against each collection.
+
+Usage: python benchmarks/bench_timestamps.py [rows]
+Defaults: 1,000,000 rows.
+Requires MONGO_URL; writes only to the `<DB_NAME>_bench` database and drops it afterwards.
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SEED_BATCH = 10_000
+QUERIES = 200
+DAYS = 365
+
+
+async def seed(collection, start, as_string: bool):
+    for offset in range(0, ROWS, SEED_BATCH):
+        docs = []
+        for i in range(offset, min(offset + SEED_BATCH, ROWS)):
+            at = start + timedelta(seconds=i * DAYS * 86400 // ROWS)
+            docs.append({
+                'user_id': f'user-{i // 40}', 'course_id': f'course-{i % 25}', 'video_id': f'video-{i % 40}',
+                'completed': i % 3 != 0, 'updated_at': at.isoformat() if as_string else at
+            })
+        await collection.insert_many(docs, ordered=False)
+    await collection.create_index('updated_at')
+
+
+async def range_latency_ms(collection, start, as_string: bool) -> tuple:
+    samples = []
+    for _ in range(QUERIES):
+        since = start + timedelta(days=random.randrange(DAYS - 1))
+        until = since + timedelta(days=1)
+        query = ({'updated_at': {'$gte': since.isoformat(), '$lt': until.isoformat()}} if as_string
+                 else {'updated_at': {'$gte': since, '$lt': until}})
+        started = time.perf_counter()
+        await collection.find(query, {'_id': 0, 'user_id': 1}).to_list(None)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+async def main():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    random.seed(7)
+    bench_name = f"{server.db_name}_bench"
+    bench_db = server.client[bench_name]
+    await server.client.drop_database(bench_name)
+    start = server.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=DAYS)
+    try:
+        print(f"Seeding {ROWS:,} rows per format...")
+        print(f"{'format':<10}{'avg doc B':>11}{'data MB':>10}{'index MB':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        for name, as_string in (('string', True), ('datetime', False)):
+            collection = bench_db[f'progress_{name}']
+            await seed(collection, start, as_string)
+            stats = await bench_db.command('collStats', collection.name)
+            p50, p99 = await range_latency_ms(collection, start, as_string)
+            print(f"{name:<10}{stats['avgObjSize']:>11.0f}{stats['size'] / 1e6:>10.1f}"
+                  f"{stats['indexSizes']['updated_at_1'] / 1e6:>10.1f}{p50:>9.2f}{p99:>9.2f}")
+    finally:
+        await server.client.drop_database(bench_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
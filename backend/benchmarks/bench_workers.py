@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Worker scaling benchmark - MavecodeCourse
+Starts gunicorn with 1..N workers using gunicorn.conf.py and measures throughput
+against one endpoint with a fixed number of concurrent keep-alive clients.
+
+Usage: python benchmarks/bench_workers.py [max_workers] [path] [seconds]
+Defaults: max_workers = available CPUs, path = /api/categories, 10 seconds per run.
+Use a bcrypt-bound path such as /api/auth/login (with MONGO_URL set) to see CPU scaling.
+"""
+
+import asyncio
+import os
+import runpy
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+available_cpus = runpy.run_path(str(BACKEND_DIR / 'gunicorn.conf.py'))['available_cpus']
+
+MAX_WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else available_cpus()
+PATH = sys.argv[2] if len(sys.argv) > 2 else '/api/categories'
+SECONDS = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+CONCURRENCY = 64
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+async def load(base_url: str) -> tuple:
+    done = 0
+    errors = 0
+    deadline = time.monotonic() + SECONDS
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as http:
+        async def client_loop():
+            nonlocal done, errors
+            while time.monotonic() < deadline:
+                try:
+                    response = await http.get(PATH)
+                    if response.status_code < 500:
+                        done += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+        await asyncio.gather(*(client_loop() for _ in range(CONCURRENCY)))
+    return done / SECONDS, errors
+
+
+def run(workers: int) -> tuple:
+    port = free_port()
+    env = {**os.environ, 'WEB_CONCURRENCY': str(workers), 'PORT': str(port)}
+    proc = subprocess.Popen(
+        ['gunicorn', 'server:app', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_up(base_url + '/api/')
+        return asyncio.run(load(base_url))
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+
+def main():
+    print(f"{PATH}, {CONCURRENCY} concurrent clients, {SECONDS:.0f}s per run")
+    print(f"{'workers':<10}{'req/s':>10}{'speedup':>10}{'errors':>8}")
+    baseline = None
+    counts = sorted({1, *range(2, MAX_WORKERS + 1, 2), MAX_WORKERS})
+    for workers in counts:
+        rps, errors = run(workers)
+        baseline = baseline or rps
+        print(f"{workers:<10}{rps:>10.0f}{rps / baseline:>9.1f}x{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Cache invalidation bus check - MavecodeCourse
+Drives CacheInvalidationBus with a scripted change stream and checks that it evicts
+only the entries built from the written collection, notifies subscribers, resumes
+from the last token after a disconnect, restarts with a cleared cache when the token
+has left the oplog (ChangeStreamHistoryLost) and falls back to TTL expiry without a
+replica set.
+
+With --live it also measures write-to-eviction latency against MONGO_URL, which must
+be a replica set (a single node started with --replSet is enough); it writes only to
+the `<DB_NAME>_bench` database and drops it afterwards.
+
+Usage: python benchmarks/check_invalidation_bus.py [--live] [writes]
+Defaults: 200 writes.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server
+
+LIVE = '--live' in sys.argv
+ARGS = [arg for arg in sys.argv[1:] if arg != '--live']
+WRITES = int(ARGS[0]) if ARGS else 200
+
+
+class ScriptedStream:
+    """One watch() call: yields its events, then raises `error` once `fail` is set (or waits to be cancelled)."""
+
+    def __init__(self, events: list, error: Exception = None, fail: asyncio.Event = None):
+        self.events = events
+        self.error = error
+        self.fail = fail
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for token, collection in self.events:
+            self.resume_token = token
+            yield {'ns': {'coll': collection}, 'operationType': 'update'}
+        if self.error is not None:
+            if self.fail is not None:
+                await self.fail.wait()
+            raise self.error
+        await asyncio.Event().wait()
+
+
+class ScriptedDatabase:
+    """Stands in for `server.db`: each watch() opens the next scripted stream."""
+
+    def __init__(self, streams: list):
+        self.streams = streams
+        self.resumed_from = []
+
+    def watch(self, pipeline, resume_after=None):
+        self.resumed_from.append(resume_after)
+        if not self.streams:
+            return ScriptedStream([])
+        opened = self.streams.pop(0)
+        if isinstance(opened, Exception):
+            raise opened
+        return opened
+
+
+def cached(cache: server.CatalogCache, *collections: str):
+    for collection in collections:
+        cache.put(f'/api/{collection}?', b'[]', 'application/json', frozenset([collection]))
+
+
+def check(condition: bool, message: str):
+    print(f"   {'✅' if condition else '❌'} {message}")
+    if not condition:
+        check.failed = True
+
+
+check.failed = False
+
+
+async def run_bus(streams: list, prepare=None, settle: float = 0.05):
+    cache = server.CatalogCache(ttl=60, max_entries=100)
+    bus = server.CacheInvalidationBus(cache, server.CACHE_INVALIDATION_COLLECTIONS)
+    notified = []
+    bus.subscribe(notified.append)
+    if prepare is not None:
+        prepare(cache)
+    server.db = ScriptedDatabase(streams)
+    bus.start()
+    await asyncio.sleep(settle)
+    return bus, cache, notified
+
+
+async def check_stubbed():
+    server.CHANGE_STREAM_RETRY_SECONDS = 0
+    print("Scripted change stream")
+
+    bus, cache, notified = await run_bus([ScriptedStream([])])
+    cached(cache, 'courses', 'faqs')
+    bus.publish('courses')
+    check(cache.get('/api/courses?') is None and cache.get('/api/faqs?') is not None,
+          "a write evicts only entries built from its collection")
+    check(notified == ['courses'], "subscribers are told which collection changed")
+    await bus.stop()
+
+    # Entries cached before the stream opens may be stale: the first open clears them
+    bus, cache, notified = await run_bus([ScriptedStream([('t1', 'faqs')])], prepare=lambda c: cached(c, 'courses'))
+    check(cache.get('/api/courses?') is None, "opening without a resume token clears the cache")
+    check(bus.mode == 'change_stream' and bus.resume_token == 't1', "the last event's token is kept")
+    await bus.stop()
+
+    streams = [ScriptedStream([('t1', 'courses'), ('t2', 'videos')], AutoReconnect('connection reset')),
+               ScriptedStream([('t3', 'faqs')])]
+    bus, cache, notified = await run_bus(streams)
+    check(server.db.resumed_from == [None, 't2'], "a dropped stream resumes after the last token")
+    check(notified == ['courses', 'videos', 'faqs'], "no event is lost or repeated across the reconnect")
+    await bus.stop()
+
+    # Entries cached while the stream was down may have missed events: the restart clears them
+    fail = asyncio.Event()
+    streams = [ScriptedStream([('t1', 'courses')], OperationFailure('history lost', server.CHANGE_STREAM_HISTORY_LOST),
+                              fail)]
+    bus, cache, notified = await run_bus(streams)
+    cached(cache, 'faqs')
+    fail.set()
+    await asyncio.sleep(0.05)
+    check(server.db.resumed_from[:2] == [None, None], "ChangeStreamHistoryLost restarts without a resume token")
+    check(cache.get('/api/faqs?') is None, "the restart clears the cache")
+    await bus.stop()
+
+    bus, cache, notified = await run_bus([OperationFailure('not a replica set', server.CHANGE_STREAMS_UNSUPPORTED)])
+    check(bus.mode == 'ttl' and bus._task.done(), "without a replica set the bus stops and entries expire by TTL")
+    await bus.stop()
+
+
+async def check_live():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    bench_name = f"{server.db_name}_bench"
+    await server.client.drop_database(bench_name)
+    server.db = server.client[bench_name]
+    cache = server.CatalogCache(ttl=600, max_entries=100)
+    bus = server.CacheInvalidationBus(cache, server.CACHE_INVALIDATION_COLLECTIONS)
+    evicted = asyncio.Event()
+    bus.subscribe(lambda collection: evicted.set())
+    try:
+        bus.start()
+        while bus.mode != 'change_stream':
+            if bus.mode == 'ttl':
+                print("❌ Error: MONGO_URL is not a replica set")
+                exit(1)
+            await asyncio.sleep(0.05)
+        samples = []
+        for i in range(WRITES):
+            cached(cache, 'courses')
+            evicted.clear()
+            started = time.perf_counter()
+            await server.db.courses.update_one({'_id': 'bench'}, {'$set': {'n': i}}, upsert=True)
+            await asyncio.wait_for(evicted.wait(), 10)
+            samples.append((time.perf_counter() - started) * 1000)
+            check.failed |= cache.get('/api/courses?') is not None
+        samples.sort()
+        print(f"Live replica set: {WRITES:,} writes, write-to-eviction p50 {statistics.median(samples):.1f} ms, "
+              f"p99 {samples[int(len(samples) * 0.99)]:.1f} ms")
+    finally:
+        await bus.stop()
+        await server.client.drop_database(bench_name)
+
+
+async def main():
+    await check_stubbed()
+    if LIVE:
+        await check_live()
+    exit(1 if check.failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Certificate renderer - MavecodeCourse
+Draws a certificate as PNG or PDF with Pillow. It runs inside the server's process
+pool, so this module deliberately imports nothing but Pillow and the stdlib: worker
+processes start quickly and never load the web app.
+"""
+
+import io
+from datetime import datetime
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Bump when the layout changes so previously cached renders are not served
+TEMPLATE_VERSION = 1
+
+WIDTH, HEIGHT = 1754, 1240  # A4 landscape at 150 dpi
+BACKGROUND = (255, 255, 255)
+PRIMARY = (79, 70, 229)
+TEXT = (30, 41, 59)
+MUTED = (100, 116, 139)
+
+MONTHS_ID = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni', 'Juli',
+             'Agustus', 'September', 'Oktober', 'November', 'Desember']
+
+_fonts = {}
+
+
+def font(size: int, bold: bool = False):
+    key = (size, bold)
+    if key not in _fonts:
+        try:
+            _fonts[key] = ImageFont.truetype('DejaVuSans-Bold.ttf' if bold else 'DejaVuSans.ttf', size)
+        except OSError:
+            _fonts[key] = ImageFont.load_default(size=size)
+    return _fonts[key]
+
+
+def format_date(iso: str) -> str:
+    try:
+        issued = datetime.fromisoformat(iso)
+    except ValueError:
+        return iso
+    return f"{issued.day} {MONTHS_ID[issued.month - 1]} {issued.year}"
+
+
+def centered(draw: ImageDraw.ImageDraw, y: int, text: str, text_font, fill):
+    width = draw.textlength(text, font=text_font)
+    draw.text(((WIDTH - width) / 2, y), text, font=text_font, fill=fill)
+
+
+def fit_font(draw: ImageDraw.ImageDraw, text: str, size: int, max_width: int, bold: bool = True):
+    while size > 24 and draw.textlength(text, font=font(size, bold)) > max_width:
+        size -= 4
+    return font(size, bold)
+
+
+def render_certificate(cert: dict, signature: bytes = None, fmt: str = 'png') -> bytes:
+    """Renders `cert` (a certificates document) and returns the encoded file bytes."""
+    image = Image.new('RGB', (WIDTH, HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    draw.rectangle([40, 40, WIDTH - 40, HEIGHT - 40], outline=PRIMARY, width=8)
+    draw.rectangle([64, 64, WIDTH - 64, HEIGHT - 64], outline=(199, 210, 254), width=2)
+
+    centered(draw, 130, 'MAVECODE', font(40, bold=True), PRIMARY)
+    centered(draw, 220, 'SERTIFIKAT PENYELESAIAN', font(72, bold=True), TEXT)
+    centered(draw, 360, 'Diberikan kepada', font(34), MUTED)
+    centered(draw, 420, cert['user_name'], fit_font(draw, cert['user_name'], 96, WIDTH - 300), TEXT)
+    draw.line([(WIDTH / 2 - 420, 550), (WIDTH / 2 + 420, 550)], fill=PRIMARY, width=3)
+    centered(draw, 590, 'atas keberhasilannya menyelesaikan kursus', font(34), MUTED)
+    centered(draw, 650, cert['course_title'], fit_font(draw, cert['course_title'], 60, WIDTH - 300), PRIMARY)
+    centered(draw, 760, f"Diterbitkan {format_date(cert['issued_at'])}", font(30), MUTED)
+
+    signature_box = (WIDTH - 620, 860, WIDTH - 180, 1020)
+    if cert.get('is_signed') and signature:
+        try:
+            mark = Image.open(io.BytesIO(signature)).convert('RGBA')
+            mark.thumbnail((signature_box[2] - signature_box[0], signature_box[3] - signature_box[1]))
+            image.paste(mark, (signature_box[0], signature_box[3] - mark.height), mark)
+        except OSError:
+            pass
+    elif cert.get('is_signed'):
+        draw.text((signature_box[0], 960), 'Ditandatangani secara digital', font=font(28), fill=MUTED)
+    draw.line([(signature_box[0], 1030), (signature_box[2], 1030)], fill=TEXT, width=2)
+    draw.text((signature_box[0], 1045), 'Firza Ilmi', font=font(30, bold=True), fill=TEXT)
+    draw.text((signature_box[0], 1085), 'Instruktur Mavecode', font=font(24), fill=MUTED)
+
+    draw.text((180, 1045), f"No. {cert['id']}", font=font(26), fill=MUTED)
+    draw.text((180, 1085), 'Verifikasi di mavecode.id/certificates', font=font(24), fill=MUTED)
+
+    out = io.BytesIO()
+    if fmt == 'pdf':
+        image.save(out, format='PDF', resolution=150.0)
+    else:
+        image.save(out, format='PNG', optimize=True)
+    return out.getvalue()
@@ -0,0 +1,68 @@
+"""
+Gunicorn config for production - MavecodeCourse
+
+Usage: gunicorn server:app -c gunicorn.conf.py
+
+Runs one Uvicorn worker (uvloop + httptools) per available CPU so bcrypt and JSON
+work are spread across cores. The app is not preloaded: each worker imports
+server.py after the fork and builds its own Mongo client and in-memory caches in
+the app lifespan.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+def available_cpus() -> int:
+    """CPUs this container may actually use: affinity mask, capped by a cgroup v2 quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = Path('/sys/fs/cgroup/cpu.max').read_text().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', available_cpus()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = False
+
+# On SIGTERM each worker stops accepting, lets in-flight requests finish and runs
+# the lifespan shutdown (background tasks, Gemini and Mongo clients) within this window.
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+timeout = int(os.environ.get('WORKER_TIMEOUT', '60'))
+keepalive = 5
+
+# Recycle workers now and then so a slow leak can't take the instance down
+max_requests = int(os.environ.get('MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', '1000'))
+
+# In-memory rate limits are per worker; share them through Mongo unless told otherwise
+if workers > 1:
+    os.environ.setdefault('RATE_LIMIT_BACKEND', 'mongo')
+
+accesslog = '-'
+errorlog = '-'
+
+# Prometheus metrics from every worker are aggregated through a shared directory.
+# It must be set before the workers import prometheus_client, so it is set here.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'mavecode-prometheus'))
+
+
+def on_starting(server):
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
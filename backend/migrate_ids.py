@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Id migration - MavecodeCourse
+Rewrites each collection so the business id is `_id`, stored as a binary UUID, and
+user_id / course_id / video_id references use the same form. Documents are copied in
+_id order into `<name>__ids_v1`, the collection's other indexes are recreated there
+(the index on `id` is dropped: `_id` covers it now) and the copy is renamed over the
+original. Progress is checkpointed in the `migrations` collection, so an interrupted
+run resumes where it stopped.
+
+Stop the app (or keep it in maintenance mode) while this runs: writes made to a
+collection between its copy and its rename would be lost. Deploy the app version that
+reads `_id` right after it finishes.
+
+Usage: python migrate_ids.py [batch_size]
+Defaults: 1000 documents per batch.
+"""
+
+import asyncio
+import sys
+import time
+
+from pymongo import ReplaceOne
+
+import server
+
+BATCH_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+MIGRATION_ID = 'ids_v1'
+TEMP_SUFFIX = '__ids_v1'
+COLLECTIONS = ('users', 'courses', 'videos', 'articles', 'live_classes', 'faqs', 'orders',
+               'progress', 'certificates', 'contact_messages')
+
+
+def migrated(doc: dict) -> dict:
+    """Storage form of a legacy document. Documents without `id` (progress rows) keep their _id."""
+    if 'id' in doc:
+        doc = {field: value for field, value in doc.items() if field != '_id'}
+    return server.stored_document(doc)
+
+
+async def copy_documents(db, name: str, checkpoint: dict) -> int:
+    source, target = db[name], db[name + TEMP_SUFFIX]
+    last_id = checkpoint.get(name)
+    copied = 0
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+        batch = await source.find(query).sort('_id', 1).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+        if not batch:
+            break
+        documents = [migrated(doc) for doc in batch]
+        await target.bulk_write([ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in documents],
+                                ordered=False)
+        copied += len(batch)
+        last_id = batch[-1]['_id']
+        await db.migrations.update_one(
+            {'_id': MIGRATION_ID}, {'$set': {f'checkpoint.{name}': last_id}}, upsert=True
+        )
+    return copied
+
+
+async def copy_indexes(source, target) -> list:
+    recreated = []
+    for index_name, info in (await source.index_information()).items():
+        keys = info.pop('key')
+        if index_name == '_id_' or [field for field, _ in keys] == ['id']:
+            continue
+        options = {option: value for option, value in info.items() if option not in ('v', 'ns')}
+        await target.create_index(keys, name=index_name, **options)
+        recreated.append(index_name)
+    return recreated
+
+
+async def migrate_collection(db, name: str, state: dict, existing: set):
+    started = time.perf_counter()
+    temp = name + TEMP_SUFFIX
+    checkpoint = state.get('checkpoint', {})
+    if name in checkpoint and temp not in existing:
+        # The copy was already renamed into place before the last run stopped
+        print(f"   ✅ {name}: already migrated")
+        return
+    if name not in existing:
+        print(f"   ➖ {name}: no collection")
+        return
+    copied = await copy_documents(db, name, checkpoint)
+    if temp not in await db.list_collection_names():
+        print(f"   ➖ {name}: empty")
+        return
+    source_count, target_count = await asyncio.gather(
+        db[name].count_documents({}), db[temp].count_documents({})
+    )
+    if target_count != source_count:
+        print(f"   ⚠️ {name}: {source_count:,} documents became {target_count:,} (duplicate ids were merged)")
+    indexes = await copy_indexes(db[name], db[temp])
+    await db[temp].rename(name, dropTarget=True)
+    await db.migrations.update_one({'_id': MIGRATION_ID}, {'$addToSet': {'done': name}}, upsert=True)
+    print(f"   ✅ {name}: {copied:,} documents copied, indexes {indexes or 'none'} recreated "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+async def main():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    db = server.db
+    state = await db.migrations.find_one({'_id': MIGRATION_ID}) or {}
+    existing = set(await db.list_collection_names())
+    print(f"🆔 Migrating ids in {server.db_name} (batch {BATCH_SIZE})")
+    for name in COLLECTIONS:
+        if name in state.get('done', []):
+            print(f"   ✅ {name}: already migrated")
+            continue
+        await migrate_collection(db, name, state, existing)
+
+    await db.migrations.update_one({'_id': MIGRATION_ID}, {'$set': {'finished_at': server.utcnow()}}, upsert=True)
+    print("\n✅ Done. Start the app version that stores ids as _id.")
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
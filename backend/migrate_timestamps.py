@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Timestamp migration - MavecodeCourse
+Rewrites ISO 8601 string timestamps as BSON datetimes while the app keeps serving.
+Documents are walked in _id order in small batches; each field is only replaced if
+it still holds the string that was read, so concurrent writes are never clobbered.
+Progress is checkpointed in the `migrations` collection, so an interrupted run
+resumes where it stopped. Safe to run more than once.
+
+Usage: python migrate_timestamps.py [batch_size] [pause_seconds]
+Defaults: 500 documents per batch, 0.05s pause between batches.
+Once it reports done, set TIMESTAMP_LEGACY_READS=false on the app.
+"""
+
+import asyncio
+import sys
+import time
+
+from pymongo import UpdateOne
+
+import server
+
+# Also imported by the server's migrate_timestamps job, which runs with the defaults
+ARGS = sys.argv[1:] if __name__ == "__main__" else []
+BATCH_SIZE = int(ARGS[0]) if len(ARGS) > 0 else 500
+PAUSE_SECONDS = float(ARGS[1]) if len(ARGS) > 1 else 0.05
+MIGRATION_ID = 'timestamps_v1'
+COLLECTIONS = ('users', 'courses', 'videos', 'articles', 'live_classes', 'orders',
+               'progress', 'certificates', 'contact_messages')
+
+
+def conversions(doc: dict) -> list:
+    """(field, original string, datetime) for every timestamp of `doc` still stored as a string."""
+    found = []
+    for field in server.TIMESTAMP_FIELDS:
+        value = doc.get(field)
+        if not isinstance(value, str):
+            continue
+        try:
+            parsed = server.parse_timestamp(value, server.TIMESTAMP_ZONES.get(field, server.timezone.utc))
+        except ValueError:
+            print(f"   ⚠️ {doc['_id']}: unparseable {field}={value!r}, left as is")
+            continue
+        found.append((field, value, parsed))
+    return found
+
+
+async def migrate_collection(db, name: str, checkpoint: dict) -> int:
+    collection = db[name]
+    string_filter = {'$or': [{field: {'$type': 'string'}} for field in server.TIMESTAMP_FIELDS]}
+    projection = {field: 1 for field in server.TIMESTAMP_FIELDS}
+    last_id = checkpoint.get(name)
+    converted = 0
+    while True:
+        query = {**string_filter, **({'_id': {'$gt': last_id}} if last_id is not None else {})}
+        batch = await collection.find(query, projection).sort('_id', 1).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+        if not batch:
+            break
+        operations = [
+            UpdateOne({'_id': doc['_id'], field: original}, {'$set': {field: parsed}})
+            for doc in batch for field, original, parsed in conversions(doc)
+        ]
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            converted += result.modified_count
+        last_id = batch[-1]['_id']
+        await db.migrations.update_one(
+            {'_id': MIGRATION_ID}, {'$set': {f'checkpoint.{name}': last_id}}, upsert=True
+        )
+        if PAUSE_SECONDS:
+            await asyncio.sleep(PAUSE_SECONDS)
+    return converted
+
+
+async def migrate(db, report) -> int:
+    """Runs or resumes the migration; `report(name, converted, seconds)` is awaited after each collection."""
+    state = await db.migrations.find_one({'_id': MIGRATION_ID}) or {}
+    if state.get('finished_at'):
+        # A finished run is checked again from the start for values written as strings since
+        await db.migrations.update_one({'_id': MIGRATION_ID}, {'$unset': {'checkpoint': ''}})
+        state = {}
+    checkpoint = state.get('checkpoint', {})
+
+    total = 0
+    for name in COLLECTIONS:
+        started = time.perf_counter()
+        converted = await migrate_collection(db, name, checkpoint)
+        total += converted
+        await report(name, converted, time.perf_counter() - started)
+
+    await db.migrations.update_one(
+        {'_id': MIGRATION_ID}, {'$set': {'finished_at': server.utcnow(), 'converted': total}}, upsert=True
+    )
+    return total
+
+
+async def main():
+    server.connect_mongo()
+    if server.db is None:
+        print("❌ Error: MONGO_URL not set")
+        exit(1)
+    print(f"🕒 Migrating timestamps in {server.db_name} (batch {BATCH_SIZE}, pause {PAUSE_SECONDS}s)")
+
+    async def report(name: str, converted: int, seconds: float):
+        print(f"   ✅ {name}: {converted:,} fields converted in {seconds:.1f}s")
+
+    total = await migrate(server.db, report)
+    print(f"\n✅ Done: {total:,} fields converted. Set TIMESTAMP_LEGACY_READS=false on the app.")
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -13,6 +13,7 @@ from pathlib import Path
 import uuid
 
 import certifi
+from bson.binary import Binary
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 import dns.resolver
@@ -88,13 +89,13 @@ async def seed_database():
     client = AsyncIOMotorClient(final_url, **client_kwargs)
     db = client[DB_NAME]
     
-    now = datetime.now(timezone.utc).isoformat()
+    now = datetime.now(timezone.utc)
     
     # ============ Seed Courses ============
     print("\n📚 Seeding courses...")
     courses = [
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'JavaScript Fundamentals', 
             'description': 'Pelajari dasar-dasar JavaScript dari variabel hingga async/await. Cocok untuk pemula yang ingin memulai karir sebagai web developer.',
             'thumbnail': 'https://images.unsplash.com/photo-1627398242454-45a1465c2479?w=400', 
@@ -108,7 +109,7 @@ async def seed_database():
             'updated_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'React.js Mastery', 
             'description': 'Bangun aplikasi web modern dengan React.js. Dari komponen dasar hingga state management dengan Redux.',
             'thumbnail': 'https://images.unsplash.com/photo-1633356122544-f134324a6cee?w=400', 
@@ -122,7 +123,7 @@ async def seed_database():
             'updated_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'Python untuk Data Science', 
             'description': 'Kuasai Python dan library populer seperti Pandas, NumPy, dan Matplotlib untuk analisis data.',
             'thumbnail': 'https://images.unsplash.com/photo-1526379095098-d400fd0bf935?w=400', 
@@ -136,7 +137,7 @@ async def seed_database():
             'updated_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'Node.js Backend Development', 
             'description': 'Buat REST API dan backend scalable dengan Node.js, Express, dan MongoDB.',
             'thumbnail': 'https://images.unsplash.com/photo-1558494949-ef010cbdcc31?w=400', 
@@ -150,7 +151,7 @@ async def seed_database():
             'updated_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'HTML & CSS untuk Pemula', 
             'description': 'Langkah pertama menjadi web developer. Pelajari cara membuat website dari nol.',
             'thumbnail': 'https://images.unsplash.com/photo-1621839673705-6617adf9e890?w=400', 
@@ -164,7 +165,7 @@ async def seed_database():
             'updated_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'Flutter Mobile App Development', 
             'description': 'Buat aplikasi mobile cross-platform dengan satu codebase menggunakan Flutter dan Dart.',
             'thumbnail': 'https://images.unsplash.com/photo-1512941937669-90a1b58e7e9c?w=400', 
@@ -187,7 +188,7 @@ async def seed_database():
     print("\n📝 Seeding articles...")
     articles = [
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'slug': 'tips-belajar-coding-efektif', 
             'title': '10 Tips Belajar Coding yang Efektif untuk Pemula',
             'content': 'Belajar coding bisa terasa overwhelming di awal. Berikut 10 tips yang bisa membantu perjalanan coding kamu:\n\n1. Mulai dari dasar\n2. Praktik setiap hari\n3. Bangun project nyata\n4. Jangan takut error\n5. Bergabung dengan komunitas\n6. Baca dokumentasi\n7. Review code orang lain\n8. Istirahat yang cukup\n9. Set goal yang realistis\n10. Nikmati prosesnya',
@@ -201,7 +202,7 @@ async def seed_database():
             'updated_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'slug': 'trend-teknologi-2025', 
             'title': 'Trend Teknologi yang Wajib Dipelajari di 2025',
             'content': 'Teknologi terus berkembang pesat. Berikut trend yang perlu kamu perhatikan:\n\n- AI dan Machine Learning\n- Cloud Computing\n- Cybersecurity\n- Blockchain\n- IoT (Internet of Things)\n- Edge Computing\n- Low-Code/No-Code\n- Web3 Development',
@@ -215,7 +216,7 @@ async def seed_database():
             'updated_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'slug': 'cara-membuat-portfolio-developer', 
             'title': 'Cara Membuat Portfolio Developer yang Menarik',
             'content': 'Portfolio adalah kunci untuk mendapatkan pekerjaan sebagai developer. Berikut tips membuat portfolio yang menarik:\n\n1. Tampilkan project terbaik\n2. Gunakan desain yang clean\n3. Sertakan link GitHub\n4. Tulis deskripsi yang jelas\n5. Tambahkan testimonial\n6. Optimalkan untuk mobile',
@@ -237,11 +238,11 @@ async def seed_database():
     # ============ Seed FAQs ============
     print("\n❓ Seeding FAQs...")
     faqs = [
-        {'id': str(uuid.uuid4()), 'question': 'Apakah saya perlu pengalaman coding sebelumnya?', 'answer': 'Tidak! Kursus kami dirancang untuk pemula. Kamu bisa mulai dari nol dan belajar step by step.', 'category': 'general', 'order': 1},
-        {'id': str(uuid.uuid4()), 'question': 'Bagaimana cara mengakses kursus premium?', 'answer': 'Kamu bisa berlangganan paket Pro atau Enterprise untuk mengakses semua kursus premium, live class, dan fitur eksklusif lainnya.', 'category': 'subscription', 'order': 2},
-        {'id': str(uuid.uuid4()), 'question': 'Apakah ada sertifikat setelah menyelesaikan kursus?', 'answer': 'Ya! Setiap kursus yang diselesaikan akan mendapatkan sertifikat digital yang bisa kamu bagikan di LinkedIn atau CV.', 'category': 'certificate', 'order': 3},
-        {'id': str(uuid.uuid4()), 'question': 'Berapa lama akses kursus berlaku?', 'answer': 'Untuk kursus yang sudah dibeli atau selama berlangganan aktif, kamu bisa mengakses materi selamanya tanpa batas waktu.', 'category': 'subscription', 'order': 4},
-        {'id': str(uuid.uuid4()), 'question': 'Bagaimana jika saya stuck atau butuh bantuan?', 'answer': 'Kamu bisa bertanya di forum komunitas, menggunakan fitur AI chatbot, atau hubungi mentor langsung via live class (untuk member Pro/Enterprise).', 'category': 'support', 'order': 5}
+        {'_id': Binary.from_uuid(uuid.uuid4()), 'question': 'Apakah saya perlu pengalaman coding sebelumnya?', 'answer': 'Tidak! Kursus kami dirancang untuk pemula. Kamu bisa mulai dari nol dan belajar step by step.', 'category': 'general', 'order': 1},
+        {'_id': Binary.from_uuid(uuid.uuid4()), 'question': 'Bagaimana cara mengakses kursus premium?', 'answer': 'Kamu bisa berlangganan paket Pro atau Enterprise untuk mengakses semua kursus premium, live class, dan fitur eksklusif lainnya.', 'category': 'subscription', 'order': 2},
+        {'_id': Binary.from_uuid(uuid.uuid4()), 'question': 'Apakah ada sertifikat setelah menyelesaikan kursus?', 'answer': 'Ya! Setiap kursus yang diselesaikan akan mendapatkan sertifikat digital yang bisa kamu bagikan di LinkedIn atau CV.', 'category': 'certificate', 'order': 3},
+        {'_id': Binary.from_uuid(uuid.uuid4()), 'question': 'Berapa lama akses kursus berlaku?', 'answer': 'Untuk kursus yang sudah dibeli atau selama berlangganan aktif, kamu bisa mengakses materi selamanya tanpa batas waktu.', 'category': 'subscription', 'order': 4},
+        {'_id': Binary.from_uuid(uuid.uuid4()), 'question': 'Bagaimana jika saya stuck atau butuh bantuan?', 'answer': 'Kamu bisa bertanya di forum komunitas, menggunakan fitur AI chatbot, atau hubungi mentor langsung via live class (untuk member Pro/Enterprise).', 'category': 'support', 'order': 5}
     ]
     
     await db.faqs.delete_many({})
@@ -252,11 +253,11 @@ async def seed_database():
     print("\n🎥 Seeding live classes...")
     live_classes = [
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'Live Coding: Build Todo App with React',
             'description': 'Belajar membuat aplikasi Todo dari nol menggunakan React.js dan hooks.',
             'instructor': 'Firza Ilmi', 
-            'scheduled_at': (datetime.now(timezone.utc) + timedelta(days=3)).isoformat(),
+            'scheduled_at': now + timedelta(days=3),
             'duration_minutes': 90, 
             'meeting_url': 'https://meet.google.com/abc-defg-hij',
             'max_participants': 100, 
@@ -264,11 +265,11 @@ async def seed_database():
             'created_at': now
         },
         {
-            'id': str(uuid.uuid4()), 
+            '_id': Binary.from_uuid(uuid.uuid4()), 
             'title': 'Q&A Session: Karir sebagai Developer',
             'description': 'Sesi tanya jawab seputar persiapan karir, interview, dan tips sukses sebagai developer.',
             'instructor': 'Firza Ilmi', 
-            'scheduled_at': (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
+            'scheduled_at': now + timedelta(days=7),
             'duration_minutes': 60, 
             'meeting_url': 'https://meet.google.com/xyz-uvwx-rst',
             'max_participants': 200, 
@@ -1,63 +1,1118 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.routing import APIRoute
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+from bson.binary import Binary, UUID_SUBTYPE
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from starlette.datastructures import Headers, MutableHeaders
 import os
 import logging
-print("--- STARTING MAVECODE BACKEND (REDEPLOY ATTEMPT 2026-01-30_0017) ---")
-print(f"DEBUG: MONGO_URL configured: {bool(os.environ.get('MONGO_URL'))}")
-
+import time
+import asyncio
+import threading
+import functools
+import gzip
+import hashlib
+import hmac
+import ipaddress
+import io
+from collections import OrderedDict, deque
+import re
+import json
+import math
+import operator
+import shutil
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, BeforeValidator, Field, EmailStr, ValidationError
+from pydantic_core import to_json
+from typing import Annotated, List, Literal, NamedTuple, Optional, Union
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import bcrypt
 import random
 
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# ============ Metrics ============
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests handled', ['method', 'route', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ['method', 'route', 'status']
+)
+HTTP_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being handled', multiprocess_mode='livesum'
+)
+
+MONGO_COMMAND_LATENCY = Histogram(
+    'mongo_command_duration_seconds', 'MongoDB command latency',
+    ['collection', 'command', 'outcome'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+)
+MONGO_POOL_CHECKOUT_WAIT = Gauge(
+    'mongo_pool_checkout_wait_seconds', 'Time the last connection checkout waited on the pool',
+    multiprocess_mode='max'
+)
+MONGO_POOL_WAITING = Gauge(
+    'mongo_pool_checkouts_waiting', 'Connection checkouts currently waiting on the pool',
+    multiprocess_mode='livesum'
+)
+
+GEMINI_LATENCY = Histogram(
+    'gemini_request_duration_seconds', 'Gemini upstream latency', ['status'],
+    buckets=(.25, .5, 1, 2, 4, 8, 15, 30)
+)
+GEMINI_ERRORS = Counter('gemini_errors_total', 'Gemini calls that did not return an answer', ['reason'])
+GEMINI_RATE_LIMITED = Counter('gemini_rate_limited_total', 'Gemini calls rejected with 429')
+
+EVENT_LOOP_LAG = Gauge(
+    'event_loop_lag_seconds', 'How late the event loop woke up for a scheduled tick', multiprocess_mode='max'
+)
+EVENT_LOOP_PROBE_INTERVAL = 0.5
+
+RATE_LIMITED = Counter('rate_limited_total', 'Requests rejected by the rate limiter', ['rule'])
+
+CACHE_INVALIDATIONS = Counter(
+    'catalog_cache_invalidations_total', 'Catalog cache invalidations received from the change stream', ['collection']
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every Mongo command by collection and operation name."""
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = '-'
+        self._pending[event.request_id] = collection
+
+    def _finish(self, event, outcome):
+        collection = self._pending.pop(event.request_id, '-')
+        seconds = event.duration_micros / 1_000_000
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name, outcome).observe(seconds)
+        record_timing('mongo', seconds)
+
+    def succeeded(self, event):
+        self._finish(event, 'ok')
+
+    def failed(self, event):
+        self._finish(event, 'error')
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks how long checkouts wait for a pooled connection.
+
+    pymongo runs each checkout on a single Motor worker thread, so the start time
+    is kept thread-locally between the started and checked-out events.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        MONGO_POOL_WAITING.inc()
+
+    def _checkout_done(self):
+        started = getattr(self._local, 'started', None)
+        if started is None:
+            return
+        self._local.started = None
+        MONGO_POOL_WAITING.dec()
+        MONGO_POOL_CHECKOUT_WAIT.set(time.perf_counter() - started)
+
+    def connection_checked_out(self, event):
+        self._checkout_done()
+
+    def connection_check_out_failed(self, event):
+        self._checkout_done()
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+async def monitor_event_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + EVENT_LOOP_PROBE_INTERVAL
+        await asyncio.sleep(EVENT_LOOP_PROBE_INTERVAL)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - scheduled))
+
+# ============ Slow Query Log ============
+
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.1'))
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', '200'))
+SLOW_QUERY_MAX_CONCURRENT_EXPLAINS = 2
+
+# Commands that can be wrapped in `explain`, and the driver/session fields explain rejects
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+EXPLAIN_STRIPPED_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'writeConcern'}
+
+# The ASGI scope of the request being served; Motor copies the context into its
+# worker threads, so command listeners can see which route issued a command.
+current_request_scope: ContextVar[Optional[dict]] = ContextVar('current_request_scope', default=None)
+
+def current_route() -> str:
+    scope = current_request_scope.get()
+    if scope is None:
+        return 'background'
+    route = scope.get('route')
+    return f"{scope.get('method')} {route.path if route is not None else scope.get('path')}"
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Collapses an explain document (find or aggregate shape) into plan stages and counters."""
+    stages = []
+    counters = {}
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'stage' and isinstance(value, str):
+                    stages.append(value)
+                elif key in ('totalDocsExamined', 'totalKeysExamined', 'nReturned') and key not in counters:
+                    counters[key] = value
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(explain.get('queryPlanner', explain))
+    walk(explain.get('executionStats', {}))
+    if not stages or not counters:
+        walk(explain.get('stages', []))
+
+    if 'IXSCAN' in stages or 'IDHACK' in stages or 'EXPRESS_IXSCAN' in stages:
+        plan = 'IXSCAN'
+    elif 'COLLSCAN' in stages:
+        plan = 'COLLSCAN'
+    else:
+        plan = stages[0] if stages else 'UNKNOWN'
+    return {
+        'plan': plan,
+        'stages': list(dict.fromkeys(stages)),
+        'docs_examined': counters.get('totalDocsExamined'),
+        'keys_examined': counters.get('totalKeysExamined'),
+        'returned': counters.get('nReturned'),
+    }
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """Keeps the most recent slow Mongo commands, explaining a sample of them.
+
+    Listener callbacks run on Motor's worker threads, so explains are handed to
+    the event loop and run after the slow command has already returned.
+    """
+
+    def __init__(self, threshold_ms: float, sample_rate: float, maxlen: int):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.entries = deque(maxlen=maxlen)
+        self._pending = {}
+        self._loop = None
+        # Taken on listener threads and released on the loop, so guarded by a lock
+        self._explains_in_flight = 0
+        self._explains_lock = threading.Lock()
+
+    def bind_loop(self, loop):
+        self._loop = loop
+
+    def started(self, event):
+        if event.command_name == 'explain':
+            return
+        command = None
+        if event.command_name in EXPLAINABLE_COMMANDS:
+            command = {
+                k: v for k, v in event.command.items()
+                if not k.startswith('$') and k not in EXPLAIN_STRIPPED_FIELDS
+            }
+        self._pending[event.request_id] = (event.database_name, command, current_route(), current_request_id())
+
+    def _finish(self, event, outcome):
+        pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        database_name, command, route, request_id = pending
+        collection = command.get(event.command_name) if command else None
+        entry = {
+            'at': datetime.now(timezone.utc).isoformat(),
+            'request_id': request_id,
+            'route': route,
+            'database': database_name,
+            'collection': collection if isinstance(collection, str) else None,
+            'command': event.command_name,
+            'duration_ms': round(duration_ms, 2),
+            'outcome': outcome,
+            'explain': None,
+        }
+        self.entries.append(entry)
+        logger.warning(f"SLOW QUERY {event.command_name} on {entry['collection']} took {entry['duration_ms']}ms ({route})")
+
+        if (command is not None and outcome == 'ok' and self._loop is not None
+                and random.random() < self.sample_rate and self._take_explain_slot()):
+            try:
+                self._loop.call_soon_threadsafe(
+                    lambda: asyncio.ensure_future(self._explain(entry, database_name, command))
+                )
+            except RuntimeError:  # loop already closed
+                self._release_explain_slot()
+
+    def _take_explain_slot(self) -> bool:
+        with self._explains_lock:
+            if self._explains_in_flight >= SLOW_QUERY_MAX_CONCURRENT_EXPLAINS:
+                return False
+            self._explains_in_flight += 1
+            return True
+
+    def _release_explain_slot(self):
+        with self._explains_lock:
+            self._explains_in_flight -= 1
+
+    async def _explain(self, entry: dict, database_name: str, command: dict):
+        try:
+            result = await client[database_name].command(
+                {'explain': command, 'verbosity': 'executionStats'}
+            )
+            entry['explain'] = summarize_explain(result)
+        except Exception as e:
+            entry['explain'] = {'error': str(e)}
+        finally:
+            self._release_explain_slot()
+
+    def succeeded(self, event):
+        self._finish(event, 'ok')
+
+    def failed(self, event):
+        self._finish(event, 'error')
+
+
+slow_queries = SlowQueryRecorder(SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN_SAMPLE_RATE, SLOW_QUERY_BUFFER_SIZE)
+
+# ============ Request Timing ============
+
+class RequestTimings:
+    """Per-request span totals, rendered as a Server-Timing header."""
+    __slots__ = ('request_id', 'spans', 'endpoint_done')
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.spans = {}
+        self.endpoint_done = None
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def header(self) -> str:
+        return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.spans.items())
+
+# Set once per request by the instrumentation middleware. Handlers run in a child
+# task (and Motor in worker threads) with a copy of the context, so they all add
+# to the same RequestTimings object.
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('current_timings', default=None)
+
+def record_timing(name: str, seconds: float):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+@contextmanager
+def span(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - started)
+
+def current_request_id() -> Optional[str]:
+    timings = current_timings.get()
+    return timings.request_id if timings is not None else None
+
+
+class TimedRoute(APIRoute):
+    """Route class that splits handler time into the endpoint and response serialization."""
+
+    def get_route_handler(self):
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    timings = current_timings.get()
+                    if timings is not None:
+                        timings.endpoint_done = time.perf_counter()
+            self.dependant.call = timed_endpoint
+
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            timings = current_timings.get()
+            if timings is not None and timings.endpoint_done is not None:
+                timings.add('serialize', time.perf_counter() - timings.endpoint_done)
+            return response
+
+        collections = getattr(self.endpoint, 'catalog_collections', None)
+        if collections is not None:
+            return catalog_cache.wrap(timed_handler, collections)
+        return timed_handler
+
+# ============ Compression & Catalog Cache ============
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+# Per-response compression favours speed; cached catalog bodies are compressed
+# once, so they can afford a denser setting.
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 4}
+PRECOMPRESSION_LEVELS = {'gzip': 9, 'br': 9}
+
+CATALOG_CACHE_TTL_SECONDS = float(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '60'))
+CATALOG_CACHE_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '256'))
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks br, then gzip, from an Accept-Encoding header; None means identity."""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+def compress_body(body: bytes, encoding: str, levels: dict = COMPRESSION_LEVELS) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+
+
+class CompressionMiddleware:
+    """Compresses buffered responses above a minimum size with the negotiated encoding.
+
+    Streaming responses and bodies that already carry a Content-Encoding (such as
+    catalog cache hits) are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start_message['headers'])
+            body = message.get('body', b'')
+            if (not message.get('more_body', False)
+                    and len(body) >= self.minimum_size
+                    and 'content-encoding' not in headers
+                    and headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES)):
+                with span('compress'):
+                    body = compress_body(body, encoding)
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(body))
+                headers.add_vary_header('Accept-Encoding')
+                message = {**message, 'body': body}
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+class CatalogEntry:
+    __slots__ = ('body', 'media_type', 'etag', 'expires_at', 'collections', 'encoded')
+
+    def __init__(self, body: bytes, media_type: str, collections: frozenset, ttl: float):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.expires_at = time.monotonic() + ttl
+        self.collections = collections
+        self.encoded = {}
+
+
+class CatalogCache:
+    """Serialized public catalog responses keyed by path and query string.
+
+    Compressed variants are stored next to each entry the first time a client asks
+    for that encoding, so hits never recompress. Entries expire after a TTL and are
+    dropped as soon as a write touches one of the collections they were built from.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[CatalogEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, body: bytes, media_type: str, collections: frozenset) -> CatalogEntry:
+        entry = CatalogEntry(body, media_type, collections, self.ttl)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *collections: str):
+        stale = [key for key, entry in self._entries.items() if entry.collections.intersection(collections)]
+        for key in stale:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def encoded_body(self, entry: CatalogEntry, encoding: str) -> bytes:
+        body = entry.encoded.get(encoding)
+        if body is None:
+            with span('compress'):
+                body = compress_body(entry.body, encoding, PRECOMPRESSION_LEVELS)
+            entry.encoded[encoding] = body
+        return body
+
+    def respond(self, request: Request, entry: CatalogEntry, status: str) -> Response:
+        headers = {'ETag': entry.etag, 'Vary': 'Accept-Encoding', 'X-Cache': status}
+        if request.headers.get('if-none-match') == entry.etag:
+            return Response(status_code=304, headers=headers)
+        body = entry.body
+        encoding = negotiate_encoding(request.headers.get('accept-encoding', ''))
+        if encoding is not None and len(body) >= COMPRESSION_MIN_SIZE:
+            body = self.encoded_body(entry, encoding)
+            headers['Content-Encoding'] = encoding
+        return Response(body, media_type=entry.media_type, headers=headers)
+
+    def wrap(self, handler, collections: frozenset):
+        async def cached_handler(request: Request) -> Response:
+            key = request.url.path + '?' + '&'.join(
+                f"{k}={v}" for k, v in sorted(request.query_params.multi_items())
+            )
+            entry = self.get(key)
+            if entry is not None:
+                return self.respond(request, entry, 'HIT')
+            response = await handler(request)
+            body = getattr(response, 'body', None)
+            if response.status_code != 200 or not body:
+                return response
+            entry = self.put(key, body, response.media_type or 'application/json', collections)
+            return self.respond(request, entry, 'MISS')
+        return cached_handler
+
+
+catalog_cache = CatalogCache(CATALOG_CACHE_TTL_SECONDS, CATALOG_CACHE_MAX_ENTRIES)
+
+def catalog_cached(*collections: str):
+    """Marks a public GET endpoint as cacheable; writes to `collections` invalidate it."""
+    def mark(endpoint):
+        endpoint.catalog_collections = frozenset(collections)
+        return endpoint
+    return mark
+
 # MongoDB connection - CRASH PROOF WRAPPER
-try:
-    mongo_url = os.environ.get('MONGO_URL')
-    db_name = os.environ.get('DB_NAME', 'mavecode_db') # Default to avoid crash
-    
+# The client is created inside the app lifespan (see `lifespan` below), not at
+# import time, so importing the module stays cheap and each process gets its own pool.
+mongo_url = os.environ.get('MONGO_URL')
+db_name = os.environ.get('DB_NAME', 'mavecode_db') # Default to avoid crash
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '2'))
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_WARMUP_PINGS = int(os.environ.get('MONGO_WARMUP_PINGS', '2'))
+MONGO_WARMUP_TIMEOUT_SECONDS = float(os.environ.get('MONGO_WARMUP_TIMEOUT_SECONDS', '3'))
+
+client = None
+db = None
+
+def connect_mongo():
+    """Creates the Motor client; leaves `db` as None (maintenance mode) if that is not possible."""
+    global client, db
     if not mongo_url:
-        print("WARNING: MONGO_URL is missing! App will start in Maintenance Mode.")
-        db = None
-    else:
+        logger.warning("MONGO_URL is missing! App will start in Maintenance Mode.")
+        return
+    try:
         # Menambahkan timeout agar tidak menggantung selamanya jika DB mati
         client = AsyncIOMotorClient(
             mongo_url,
             serverSelectionTimeoutMS=5000,
             connectTimeoutMS=5000,
-            heartbeatFrequencyMS=10000
+            heartbeatFrequencyMS=10000,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            tz_aware=True,
+            event_listeners=[MongoCommandMetrics(), MongoPoolMetrics(), slow_queries]
         )
         db = client[db_name]
-        print(f"SUCCESS: Connected to DB {db_name}")
-except Exception as e:
-    print(f"CRITICAL DB ERROR: {e}")
-    db = None
+        logger.info(f"Mongo client ready for DB {db_name} (pool {MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE})")
+    except Exception as e:
+        logger.error(f"CRITICAL DB ERROR: {e}")
+        client = None
+        db = None
+
+async def warm_up_mongo() -> bool:
+    """Opens pooled connections with concurrent pings so the first requests skip the TLS handshake.
+
+    Returns whether Mongo answered within MONGO_WARMUP_TIMEOUT_SECONDS (one ping if warm-up is off).
+    """
+    if client is None:
+        return False
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(client.admin.command('ping') for _ in range(max(MONGO_WARMUP_PINGS, 1)))),
+            timeout=MONGO_WARMUP_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        logger.warning(f"Mongo warm-up failed, continuing without it: {e!r}")
+        return False
+    return True
 
 # JWT config
 JWT_SECRET = os.environ.get('JWT_SECRET', 'mavecode-secret-key')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Serve list endpoints from stored documents without re-validating them (opt-in)
+FAST_SERIALIZATION = os.environ.get('FAST_SERIALIZATION', 'false').lower() == 'true'
+
 # Admin credentials
 ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'Mavecode07')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'Mavecode07')
 
-app = FastAPI(title="Mavecode API", version="1.0.0")
-api_router = APIRouter(prefix="/api")
+# ============ Cache Invalidation Bus ============
+
+CACHE_INVALIDATION_COLLECTIONS = ['courses', 'videos', 'articles', 'faqs', 'live_classes', 'live_classes_archive',
+                                  'settings', 'leaderboard_stats']
+CHANGE_STREAM_RETRY_SECONDS = 5
+# Server error codes: change streams need a replica set; resume token no longer in the oplog
+CHANGE_STREAMS_UNSUPPORTED = 40573
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+class CacheInvalidationBus:
+    """Keeps this worker's in-memory state coherent with writes made by any other
+    worker (or script) through a change stream on CACHE_INVALIDATION_COLLECTIONS.
+    Catalog cache entries are evicted here; other per-worker copies (live class
+    boundaries, recommender courses, leaderboards) subscribe and refresh themselves.
+
+    The last resume token is kept so a dropped connection picks up where it left
+    off. Without a replica set the bus stays idle and entries simply expire by TTL.
+    """
+
+    def __init__(self, cache: CatalogCache, collections: List[str]):
+        self.cache = cache
+        self.collections = collections
+        self.subscribers = []
+        self.resume_token = None
+        self.mode = 'stopped'
+        self.last_event_at = None
+        self._task = None
+
+    def subscribe(self, callback):
+        """Registers `callback(collection)` to run after every remote write."""
+        self.subscribers.append(callback)
+
+    def publish(self, collection: str):
+        self.cache.invalidate(collection)
+        for callback in self.subscribers:
+            callback(collection)
+
+    def start(self):
+        if db is None:
+            self.mode = 'ttl'
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        pipeline = [
+            {'$match': {'ns.coll': {'$in': self.collections}}},
+            {'$project': {'ns': 1, 'operationType': 1}}
+        ]
+        while True:
+            try:
+                async with db.watch(pipeline, resume_after=self.resume_token) as stream:
+                    if self.resume_token is None:
+                        # Nothing to replay from, so anything cached may already be stale
+                        self.cache.clear()
+                    self.mode = 'change_stream'
+                    async for change in stream:
+                        self.resume_token = stream.resume_token
+                        self.last_event_at = datetime.now(timezone.utc).isoformat()
+                        collection = change['ns']['coll']
+                        CACHE_INVALIDATIONS.labels(collection).inc()
+                        self.publish(collection)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning("Change streams unavailable (not a replica set); catalog cache falls back to TTL expiry")
+                    self.mode = 'ttl'
+                    return
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    self.resume_token = None
+                logger.warning(f"Change stream failed, retrying: {e}")
+            except PyMongoError as e:
+                logger.warning(f"Change stream disconnected, resuming: {e}")
+            self.mode = 'reconnecting'
+            await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
+
+
+invalidation_bus = CacheInvalidationBus(catalog_cache, CACHE_INVALIDATION_COLLECTIONS)
+
+# ============ Rate Limiting ============
+
+class RateLimitRule(NamedTuple):
+    name: str
+    key: str  # 'ip', 'user' (token subject, else ip) or 'email' (from the JSON body)
+    limit: int  # requests allowed per period (also the burst size)
+    period: float  # seconds
+
+# Limits for the endpoints that burn bcrypt, Gemini quota or writes. A request is
+# rejected as soon as any of its route's rules is exhausted. Each rule can be
+# overridden with RATE_LIMIT_OVERRIDES, e.g. '{"chat-ip": "40/60"}'.
+RATE_LIMIT_RULES = {
+    ('POST', '/api/auth/login'): [RateLimitRule('login-ip', 'ip', 20, 60), RateLimitRule('login-email', 'email', 5, 60)],
+    ('POST', '/api/auth/register'): [RateLimitRule('register-ip', 'ip', 5, 60)],
+    ('POST', '/api/auth/google'): [RateLimitRule('google-ip', 'ip', 10, 60)],
+    ('POST', '/api/chat'): [RateLimitRule('chat-ip', 'ip', 20, 60)],
+    ('POST', '/api/contact'): [RateLimitRule('contact-ip', 'ip', 5, 300)],
+}
+
+def apply_rate_limit_overrides(rules: dict, overrides: dict) -> dict:
+    def override(rule: RateLimitRule) -> RateLimitRule:
+        if rule.name not in overrides:
+            return rule
+        limit, period = overrides[rule.name].split('/')
+        return rule._replace(limit=int(limit), period=float(period))
+    return {route: [override(rule) for rule in route_rules] for route, route_rules in rules.items()}
+
+RATE_LIMIT_RULES = apply_rate_limit_overrides(RATE_LIMIT_RULES, json.loads(os.environ.get('RATE_LIMIT_OVERRIDES', '{}')))
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# 'memory' limits each worker separately, so with N workers a client gets up to N times every limit;
+# 'mongo' shares the buckets. gunicorn.conf.py defaults to 'mongo' when it runs more than one worker.
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+RATE_LIMIT_MAX_BODY_BYTES = 64 * 1024
+
+
+class MemoryRateLimitStore:
+    """Token buckets per (rule, key) in a bounded LRU; the least recently seen keys are evicted first."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def hit(self, rule: RateLimitRule, key: str) -> float:
+        """Takes a token; returns 0 if allowed, otherwise seconds until one is available."""
+        now = time.monotonic()
+        bucket_key = (rule.name, key)
+        refill_rate = rule.limit / rule.period
+        tokens, updated = self._buckets.pop(bucket_key, (rule.limit, now))
+        tokens = min(rule.limit, tokens + (now - updated) * refill_rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_rate
+        self._buckets[bucket_key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class MongoRateLimitStore:
+    """Fixed-window counters in the `rate_limits` collection, shared by every worker.
+
+    Expired windows are removed by a TTL index, so the collection stays small.
+    """
+
+    async def setup(self):
+        try:
+            await db.rate_limits.create_index('expires_at', expireAfterSeconds=0)
+        except PyMongoError as e:
+            logger.warning(f"Could not create rate limit index: {e!r}")
+
+    async def hit(self, rule: RateLimitRule, key: str) -> float:
+        now = time.time()
+        window_start = now - now % rule.period
+        window_end = window_start + rule.period
+        counter = await db.rate_limits.find_one_and_update(
+            {'_id': f"{rule.name}:{key}:{int(window_start)}"},
+            {'$inc': {'count': 1}, '$setOnInsert': {'expires_at': datetime.fromtimestamp(window_end, timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if counter['count'] > rule.limit:
+            return window_end - now
+        return 0.0
+
+
+def ip_networks(value: str) -> tuple:
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in value.split(',') if item.strip())
+
+# X-Forwarded-For is only believed from these peers. Railway's edge reaches the app from a
+# private address; a client connecting directly from anywhere else can't pick its own key.
+TRUSTED_PROXY_NETWORKS = ip_networks(os.environ.get(
+    'TRUSTED_PROXY_IPS', '127.0.0.0/8,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,100.64.0.0/10,fc00::/7'
+))
+
+@functools.lru_cache(maxsize=4096)
+def in_networks(address: str, networks: tuple) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+def client_ip(scope) -> str:
+    peer = scope.get('client')
+    peer_ip = peer[0] if peer else 'unknown'
+    forwarded = Headers(scope=scope).get('x-forwarded-for')
+    if not forwarded or not in_networks(peer_ip, TRUSTED_PROXY_NETWORKS):
+        return peer_ip
+    # Each proxy appends the address it saw: the nearest hop that isn't one of ours is the client
+    hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+    for hop in reversed(hops):
+        if not in_networks(hop, TRUSTED_PROXY_NETWORKS):
+            return hop
+    return hops[0] if hops else peer_ip
+
+
+class RateLimitMiddleware:
+    """Applies RATE_LIMIT_RULES before the request reaches routing or body validation.
+
+    The body is only read (and replayed downstream) when a rule keys on the email.
+    """
+
+    def __init__(self, app, rules: dict = RATE_LIMIT_RULES):
+        self.app = app
+        self.rules = rules
+        self.memory_store = MemoryRateLimitStore(RATE_LIMIT_MAX_KEYS)
+        self.mongo_store = MongoRateLimitStore()
+
+    @property
+    def store(self):
+        # While the catalog's breaker is open Mongo is known to be down; don't wait on it per request
+        if RATE_LIMIT_BACKEND == 'mongo' and db is not None and not mongo_breaker.open:
+            return self.mongo_store
+        return self.memory_store
+
+    async def __call__(self, scope, receive, send):
+        rules = self.rules.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+        if not rules or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        body = None
+        if any(rule.key == 'email' for rule in rules):
+            body, receive = await self._buffer_body(receive)
+
+        for rule in rules:
+            key = self._key(rule, scope, body)
+            if key is None:
+                continue
+            retry_after = await self._hit(rule, key)
+            if retry_after > 0:
+                RATE_LIMITED.labels(rule.name).inc()
+                response = Response(
+                    json.dumps({'detail': 'Terlalu banyak permintaan, coba lagi nanti'}),
+                    status_code=429,
+                    media_type='application/json',
+                    headers={'Retry-After': str(math.ceil(retry_after))}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    async def _hit(self, rule: RateLimitRule, key: str) -> float:
+        try:
+            return await self.store.hit(rule, key)
+        except PyMongoError as e:
+            # Fail open: while Mongo is unreachable each worker limits on its own
+            logger.warning(f"Rate limit store unavailable, using this worker's buckets: {e!r}")
+            return await self.memory_store.hit(rule, key)
+
+    def _key(self, rule: RateLimitRule, scope, body: Optional[bytes]) -> Optional[str]:
+        if rule.key == 'email':
+            try:
+                email = json.loads(body or b'{}').get('email')
+            except (ValueError, AttributeError):
+                return None
+            return email.strip().lower() if isinstance(email, str) else None
+        if rule.key == 'user':
+            authorization = Headers(scope=scope).get('authorization', '')
+            if authorization.lower().startswith('bearer '):
+                try:
+                    return 'user:' + jwt.decode(authorization[7:], JWT_SECRET, algorithms=[JWT_ALGORITHM])['user_id']
+                except (jwt.InvalidTokenError, KeyError):
+                    pass
+        return 'ip:' + client_ip(scope)
+
+    async def _buffer_body(self, receive):
+        # Reads at most RATE_LIMIT_MAX_BODY_BYTES; anything beyond is left for the app to read
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body and size <= RATE_LIMIT_MAX_BODY_BYTES:
+            message = await receive()
+            if message['type'] != 'http.request':
+                break
+            chunks.append(message.get('body', b''))
+            size += len(chunks[-1])
+            more_body = message.get('more_body', False)
+        body = b''.join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {'type': 'http.request', 'body': body, 'more_body': more_body}
+            return await receive()
+
+        return body, replay
+
+
+async def bootstrap_mongo():
+    """Index setup and startup checks, off the startup path so a worker serves (from the snapshot
+    if need be) at once. While Mongo is down it waits for the snapshot task to see it answer again."""
+    while mongo_breaker.open:
+        await asyncio.sleep(MONGO_BREAKER_PROBE_SECONDS)
+    if RATE_LIMIT_BACKEND == 'mongo':
+        await MongoRateLimitStore().setup()
+    await setup_analytics()
+    await setup_jobs()
+    await setup_outbox()
+    await setup_live_classes()
+    await enqueue_missing_course_aggregates()
+    start_job_workers()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    connect_mongo()
+    load_catalog_snapshot()
+    if db is not None and not await warm_up_mongo():
+        mongo_breaker.trip()
+    loop_monitor = asyncio.create_task(monitor_event_loop_lag())
+    slow_queries.bind_loop(asyncio.get_running_loop())
+    invalidation_bus.start()
+    bootstrap = asyncio.create_task(bootstrap_mongo()) if db is not None else None
+    prerender = asyncio.create_task(prerender_new_certificates_periodically()) if db is not None else None
+    recommendations = asyncio.create_task(refresh_recommendations_periodically()) if db is not None else None
+    snapshot = asyncio.create_task(maintain_catalog_snapshot()) if db is not None else None
+    leaderboard_sync = asyncio.create_task(sync_leaderboards_periodically()) if db is not None else None
+    outbox = asyncio.create_task(dispatch_outbox_forever()) if db is not None else None
+    reminders = asyncio.create_task(schedule_reminders_periodically()) if db is not None else None
+    live_class_archival = asyncio.create_task(archive_live_classes_periodically()) if db is not None else None
+    live_class_boundaries = asyncio.create_task(refresh_live_classes_on_boundaries()) if db is not None else None
+    yield
+    loop_monitor.cancel()
+    if bootstrap is not None:
+        bootstrap.cancel()
+    if outbox is not None:
+        outbox.cancel()
+    if reminders is not None:
+        reminders.cancel()
+    if live_class_archival is not None:
+        live_class_archival.cancel()
+    if live_class_boundaries is not None:
+        live_class_boundaries.cancel()
+    if leaderboard_sync is not None:
+        leaderboard_sync.cancel()
+    if snapshot is not None:
+        snapshot.cancel()
+    await stop_job_workers()
+    if recommendations is not None:
+        recommendations.cancel()
+    if prerender is not None:
+        prerender.cancel()
+    await invalidation_bus.stop()
+    if render_pool is not None:
+        render_pool.shutdown(wait=False, cancel_futures=True)
+    if shared_http_client is not None:
+        await shared_http_client.aclose()
+    if client is not None:
+        client.close()
+
+app = FastAPI(title="Mavecode API", version="1.0.0", lifespan=lifespan)
+api_router = APIRouter(prefix="/api", route_class=TimedRoute)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+# ============ Timestamps ============
+
+# Timestamps are stored as BSON datetimes (UTC, millisecond precision) so they sort,
+# range-query and index natively; the API keeps returning ISO 8601 strings. Live class
+# times are entered and shown in the academy's zone (WIB unless configured otherwise).
+TIMESTAMP_FIELDS = ('created_at', 'updated_at', 'issued_at', 'scheduled_at', 'paid_at')
+SCHEDULE_TZ = timezone(timedelta(hours=float(os.environ.get('SCHEDULE_UTC_OFFSET_HOURS', '7'))))
+TIMESTAMP_ZONES = {'scheduled_at': SCHEDULE_TZ, 'ends_at': SCHEDULE_TZ}
+# Until migrate_timestamps.py has finished, range queries also match ISO string values
+TIMESTAMP_LEGACY_READS = os.environ.get('TIMESTAMP_LEGACY_READS', 'true').lower() == 'true'
+
+def utcnow() -> datetime:
+    """Current time truncated to what BSON stores, so a value returned on write equals later reads."""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def parse_timestamp(value, naive_tz=timezone.utc) -> datetime:
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=naive_tz)
+    return value.astimezone(timezone.utc)
+
+def format_timestamp(value, tz=timezone.utc):
+    """API form of a stored timestamp; strings (not yet migrated) pass through unchanged."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(tz).isoformat()
+    return value
+
+Timestamp = Annotated[str, BeforeValidator(format_timestamp)]
+ScheduleTimestamp = Annotated[str, BeforeValidator(lambda value: format_timestamp(value, SCHEDULE_TZ))]
+
+def timestamp_range(field: str, since: Optional[datetime] = None, until: Optional[datetime] = None) -> dict:
+    """Filter for since <= field < until that also matches values still stored as ISO strings."""
+    def bounds(convert):
+        return {**({'$gte': convert(since)} if since else {}), **({'$lt': convert(until)} if until else {})}
+    native = {field: bounds(lambda value: value)}
+    if not TIMESTAMP_LEGACY_READS:
+        return native
+    return {'$or': [native, {field: bounds(lambda value: value.astimezone(timezone.utc).isoformat())}]}
+
+def timestamp_day(field: str) -> dict:
+    """Aggregation expression for the UTC YYYY-MM-DD day of a timestamp, stored either way."""
+    return {'$cond': [
+        {'$eq': [{'$type': '$' + field}, 'date']},
+        {'$dateToString': {'format': '%Y-%m-%d', 'date': '$' + field}},
+        {'$substrCP': ['$' + field, 0, 10]},
+    ]}
+
+# ============ Identifiers ============
+
+# A document's business id is its `_id`, stored as a 16-byte binary UUID (BSON subtype 4),
+# so a collection needs one unique index instead of `_id` plus `id`. References to other
+# documents use the same form. The API keeps exposing string ids under `id`; values that
+# are not canonical UUID strings ('admin', CERT-... numbers, imported slugs) are stored as is.
+REFERENCE_FIELDS = ('user_id', 'course_id', 'video_id')
+
+def store_id(value):
+    """Storage form of an id: a canonical UUID string becomes binary, anything else is unchanged."""
+    if isinstance(value, str) and len(value) == 36:
+        try:
+            parsed = uuid.UUID(value)
+        except ValueError:
+            return value
+        if str(parsed) == value:
+            return Binary.from_uuid(parsed)
+    return value
+
+def new_id() -> Binary:
+    return Binary.from_uuid(uuid.uuid4())
+
+def by_id(value) -> dict:
+    return {'_id': store_id(value)}
+
+def stored_document(doc: dict) -> dict:
+    """Storage form of an API-shaped document: `id` moves to `_id` and ids become binary UUIDs."""
+    stored = {}
+    for field, value in doc.items():
+        if field == 'id':
+            stored['_id'] = store_id(value)
+        else:
+            stored[field] = store_id(value) if field in REFERENCE_FIELDS else value
+    return stored
+
+def api_value(field: str, value):
+    if isinstance(value, Binary) and value.subtype == UUID_SUBTYPE:
+        return str(value.as_uuid())
+    if isinstance(value, datetime):
+        return format_timestamp(value, TIMESTAMP_ZONES.get(field, timezone.utc))
+    return value
+
+def api_document(doc: Optional[dict]) -> Optional[dict]:
+    """API form of a stored document: `_id` back under `id`, ids as strings, timestamps as ISO strings."""
+    if doc is None:
+        return None
+    return {('id' if field == '_id' else field): api_value(field, value) for field, value in doc.items()}
 
 # ============ Models ============
 
@@ -80,7 +1135,7 @@ class UserResponse(BaseModel):
     name: str
     phone: Optional[str] = None
     is_premium: bool = False
-    created_at: str
+    created_at: Timestamp
 
 class AdminLogin(BaseModel):
     username: str
@@ -116,8 +1171,25 @@ class CourseResponse(BaseModel):
     level: str
     duration_hours: int
     instructor: str
-    created_at: str
-    updated_at: str
+    lesson_count: int = 0
+    quiz_count: int = 0
+    preview_count: int = 0
+    total_minutes: int = 0
+    created_at: Timestamp
+    updated_at: Timestamp
+
+# GET /courses?view=summary: what a course card shows, description truncated to COURSE_SUMMARY_DESCRIPTION_CHARS
+class CourseSummaryResponse(BaseModel):
+    id: str
+    title: str
+    description: str
+    thumbnail: Optional[str] = None
+    price: float
+    is_free: bool
+    category: str
+    level: str
+    duration_hours: int
+    lesson_count: int = 0
 
 class VideoCreate(BaseModel):
     course_id: str
@@ -139,7 +1211,20 @@ class VideoResponse(BaseModel):
     order: int
     is_preview: bool
     type: str = "video"
-    created_at: str
+    created_at: Timestamp
+
+class LessonImport(BaseModel):
+    id: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    video_url: str
+    duration_minutes: int = 0
+    order: Optional[int] = None  # defaults to the lesson's position in the curriculum
+    is_preview: bool = False
+    type: str = "video"
+
+class CourseImport(CourseCreate):
+    id: Optional[str] = None
 
 class ArticleCreate(BaseModel):
     title: str
@@ -161,8 +1246,21 @@ class ArticleResponse(BaseModel):
     tags: List[str]
     author: str
     views: int
-    created_at: str
-    updated_at: str
+    created_at: Timestamp
+    updated_at: Timestamp
+
+class ArticleSummaryResponse(BaseModel):
+    id: str
+    title: str
+    slug: str
+    excerpt: Optional[str] = None
+    thumbnail: Optional[str] = None
+    category: str
+    tags: List[str]
+    author: str
+    views: int
+    created_at: Timestamp
+    updated_at: Timestamp
 
 class SubscriptionPlan(BaseModel):
     id: str
@@ -176,7 +1274,7 @@ class LiveClassCreate(BaseModel):
     title: str
     description: Optional[str] = None
     instructor: str = "Firza Ilmi"
-    scheduled_at: str
+    scheduled_at: datetime  # naive values are in SCHEDULE_TZ
     duration_minutes: int = 60
     meeting_url: Optional[str] = None
     max_participants: int = 100
@@ -186,12 +1284,13 @@ class LiveClassResponse(BaseModel):
     title: str
     description: Optional[str] = None
     instructor: str
-    scheduled_at: str
+    scheduled_at: ScheduleTimestamp
     duration_minutes: int
     meeting_url: Optional[str] = None
     max_participants: int
     participants_count: int
-    created_at: str
+    ends_at: Optional[ScheduleTimestamp] = None
+    created_at: Timestamp
 
 class FAQCreate(BaseModel):
     question: str
@@ -218,7 +1317,7 @@ class OrderResponse(BaseModel):
     status: str  # 'pending', 'paid', 'failed'
     payment_method: str
     va_number: Optional[str] = None  # Simulated VA Number
-    created_at: str
+    created_at: Timestamp
 
 class HeroContentUpdate(BaseModel):
     title: str
@@ -247,23 +1346,63 @@ class UserProgress(BaseModel):
     completed: bool = False
     progress_percent: int = 0
 
+QUIZ_MAX_QUESTIONS = 200
+QUIZ_MAX_OPTIONS = 10
+QUIZ_MAX_BATCH = 100
+
+class QuizQuestion(BaseModel):
+    prompt: str
+    options: List[str] = Field(min_length=2, max_length=QUIZ_MAX_OPTIONS)
+
+class QuizQuestionCreate(QuizQuestion):
+    answer: int = Field(ge=0, lt=QUIZ_MAX_OPTIONS)
+
+class QuizCreate(BaseModel):
+    questions: List[QuizQuestionCreate] = Field(min_length=1, max_length=QUIZ_MAX_QUESTIONS)
+    pass_percent: int = Field(70, ge=0, le=100)
+
+class QuizResponse(BaseModel):
+    video_id: str
+    course_id: str
+    questions: List[QuizQuestion]
+    pass_percent: int
+    version: int
+
+class QuizAnswers(BaseModel):
+    answers: List[Optional[int]]  # option index per question, None when skipped
+
+class QuizSubmission(QuizAnswers):
+    video_id: str
+
+class QuizSubmissionBatch(BaseModel):
+    submissions: List[QuizSubmission] = Field(min_length=1, max_length=QUIZ_MAX_BATCH)
+
+class QuizResult(BaseModel):
+    video_id: str
+    score: int
+    total: int
+    percent: int
+    passed: bool
+
 class CertificateResponse(BaseModel):
     id: str
     user_id: str
     user_name: str
     course_id: str
     course_title: str
-    issued_at: str
+    issued_at: Timestamp
     is_signed: bool = False
     signature_url: Optional[str] = None
 
 # ============ Helper Functions ============
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with span('hash'):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    with span('hash'):
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 def create_token(user_id: str, is_admin: bool = False) -> str:
     payload = {
@@ -282,27 +1421,234 @@ def decode_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    payload = decode_token(credentials.credentials)
-    if payload.get('is_admin'):
-        return {'id': 'admin', 'is_admin': True}
-    user = await db.users.find_one({'id': payload['user_id']}, {'_id': 0})
+    with span('auth'):
+        payload = decode_token(credentials.credentials)
+        if payload.get('is_admin'):
+            return {'id': 'admin', 'is_admin': True}
+        user = await db.users.find_one(by_id(payload['user_id']))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    return api_document(user)
 
 async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    payload = decode_token(credentials.credentials)
+    with span('auth'):
+        payload = decode_token(credentials.credentials)
     if not payload.get('is_admin'):
         raise HTTPException(status_code=403, detail="Admin access required")
     return {'id': 'admin', 'is_admin': True}
 
+async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """The signed-in user, or None for anonymous requests. An expired or invalid
+    token, or one for a user that no longer exists, is treated as anonymous."""
+    if credentials is None:
+        return None
+    try:
+        return await get_current_user(credentials)
+    except HTTPException as e:
+        if e.status_code != 401:
+            raise
+        return None
+
+@functools.lru_cache(maxsize=None)
+def model_field_defaults(model) -> tuple:
+    return tuple(
+        (name, None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    )
+
+def model_list_response(model, docs: List[dict]):
+    """Returns `docs` for FastAPI to validate against the route's response_model,
+    or, with FAST_SERIALIZATION on, trusts them as validated on write: each doc is
+    cut down to the model's fields (as model_construct would) and encoded straight
+    to JSON by pydantic-core."""
+    if not FAST_SERIALIZATION:
+        return [api_document(doc) for doc in docs]
+    with span('serialize'):
+        fields = model_field_defaults(model)
+        body = to_json([{name: api_value(name, doc.get('_id' if name == 'id' else name, default))
+                         for name, default in fields} for doc in docs])
+    return Response(body, media_type='application/json')
+
 def slugify(text: str) -> str:
-    import re
     text = text.lower().strip()
     text = re.sub(r'[^\w\s-]', '', text)
     text = re.sub(r'[-\s]+', '-', text)
     return text
 
+# ============ Catalog Snapshot ============
+
+# Last-known-good copy of the public catalog, written to local disk while Mongo is
+# healthy and loaded at startup. Catalog reads fall back to it in maintenance mode
+# (no database) and when Mongo fails: after MONGO_BREAKER_THRESHOLD consecutive failed
+# reads the breaker opens and reads go straight to the snapshot instead of waiting on
+# Mongo, until a background ping gets through and the snapshot is refreshed.
+CATALOG_SNAPSHOT_PATH = Path(os.environ.get('CATALOG_SNAPSHOT_PATH', ROOT_DIR / 'catalog_snapshot.json'))
+CATALOG_SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_INTERVAL_SECONDS', '300'))
+CATALOG_SNAPSHOT_MAX_DOCS = 5000
+CATALOG_READ_TIMEOUT_SECONDS = float(os.environ.get('CATALOG_READ_TIMEOUT_SECONDS', '2'))
+MONGO_BREAKER_THRESHOLD = int(os.environ.get('MONGO_BREAKER_THRESHOLD', '3'))
+MONGO_BREAKER_PROBE_SECONDS = float(os.environ.get('MONGO_BREAKER_PROBE_SECONDS', '10'))
+# Collection -> (filter, projection) of what the public catalog endpoints read
+CATALOG_SNAPSHOT_QUERIES = {
+    'courses': ({}, None),
+    'videos': ({}, None),
+    'articles': ({}, None),
+    'faqs': ({}, None),
+    'live_classes': ({}, {'participant_ids': 0}),
+    'live_classes_archive': ({}, {'participant_ids': 0}),
+    'settings': ({'type': 'hero'}, {'_id': 0}),
+}
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; the snapshot task closes it once Mongo answers again."""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def trip(self):
+        """Opens at once, for when Mongo is already known to be down (it did not answer at startup)."""
+        if self.opened_at is None:
+            self.opened_at = time.monotonic()
+            logger.warning("Mongo unreachable; serving the catalog snapshot until it answers")
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold and self.opened_at is None:
+            self.opened_at = time.monotonic()
+            logger.warning(f"Mongo circuit breaker open after {self.failures} failed reads; serving the catalog snapshot")
+
+mongo_breaker = CircuitBreaker(MONGO_BREAKER_THRESHOLD)
+# Documents in storage form, by collection; empty until loaded or taken
+catalog_snapshot = {'taken_at': None, 'collections': {}}
+
+def load_catalog_snapshot():
+    try:
+        data = json.loads(CATALOG_SNAPSHOT_PATH.read_bytes())
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f"Catalog snapshot {CATALOG_SNAPSHOT_PATH} not loaded: {e!r}")
+        return
+    # Timestamps stay ISO strings: they sort the same way and are returned as is
+    catalog_snapshot['collections'] = {name: [stored_document(doc) for doc in docs]
+                                       for name, docs in data['collections'].items()}
+    catalog_snapshot['taken_at'] = data['taken_at']
+    logger.info(f"Catalog snapshot from {data['taken_at']} loaded")
+
+def write_catalog_snapshot(body: bytes):
+    CATALOG_SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    partial = CATALOG_SNAPSHOT_PATH.with_name(f"{CATALOG_SNAPSHOT_PATH.name}.{os.getpid()}.tmp")
+    partial.write_bytes(body)
+    os.replace(partial, CATALOG_SNAPSHOT_PATH)
+
+async def take_catalog_snapshot():
+    collections = {}
+    for name, (query, projection) in CATALOG_SNAPSHOT_QUERIES.items():
+        collections[name] = await db[name].find(query, projection).to_list(CATALOG_SNAPSHOT_MAX_DOCS)
+    taken_at = format_timestamp(utcnow())
+    body = to_json({'taken_at': taken_at, 'collections': {
+        name: [api_document(doc) for doc in docs] for name, docs in collections.items()
+    }}, fallback=str)
+    await asyncio.to_thread(write_catalog_snapshot, body)
+    catalog_snapshot.update(taken_at=taken_at, collections=collections)
+
+async def maintain_catalog_snapshot():
+    """Refreshes the snapshot every interval; while the breaker is open, pings Mongo until it answers."""
+    while True:
+        if mongo_breaker.open:
+            await asyncio.sleep(MONGO_BREAKER_PROBE_SECONDS)
+            try:
+                await asyncio.wait_for(client.admin.command('ping'), CATALOG_READ_TIMEOUT_SECONDS)
+            except (PyMongoError, asyncio.TimeoutError):
+                continue
+            mongo_breaker.record_success()
+            # Cached responses may have been built from the snapshot
+            catalog_cache.clear()
+            logger.info("Mongo reachable again; catalog reads are back on the database")
+        try:
+            await take_catalog_snapshot()
+        except (PyMongoError, OSError) as e:
+            logger.warning(f"Catalog snapshot not refreshed: {e!r}")
+        deadline = time.monotonic() + CATALOG_SNAPSHOT_INTERVAL_SECONDS
+        while time.monotonic() < deadline and not mongo_breaker.open:
+            await asyncio.sleep(min(MONGO_BREAKER_PROBE_SECONDS, CATALOG_SNAPSHOT_INTERVAL_SECONDS))
+
+SNAPSHOT_OPERATORS = {'$gt': operator.gt, '$gte': operator.ge, '$lt': operator.lt, '$lte': operator.le}
+
+def snapshot_comparable(value):
+    # Snapshots loaded from disk hold timestamps as ISO strings; compare them as datetimes
+    if isinstance(value, str):
+        try:
+            return parse_timestamp(value)
+        except ValueError:
+            return value
+    return value
+
+def snapshot_matches(doc: dict, query: dict) -> bool:
+    """The subset of Mongo filters catalog reads use: equality, list membership, ranges and $or."""
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(snapshot_matches(doc, alternative) for alternative in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if value is None:
+                return False
+            try:
+                if not all(SNAPSHOT_OPERATORS[op](snapshot_comparable(value), snapshot_comparable(operand))
+                           for op, operand in condition.items()):
+                    return False
+            except TypeError:
+                return False
+        elif not (value == condition or (isinstance(value, list) and condition in value)):
+            return False
+    return True
+
+def snapshot_find(name: str, query: dict, sort: Optional[tuple], limit: int) -> list:
+    docs = catalog_snapshot['collections'].get(name)
+    if docs is None:
+        raise HTTPException(status_code=503, detail="Catalog temporarily unavailable")
+    found = [doc for doc in docs if snapshot_matches(doc, query)]
+    if sort:
+        field, direction = sort
+        found.sort(key=lambda doc: (doc.get(field) is not None, doc.get(field) or 0), reverse=direction < 0)
+    return found[:limit]
+
+async def catalog_find(name: str, query: dict, projection: Optional[dict] = None,
+                       sort: Optional[tuple] = None, limit: int = 100) -> list:
+    """Catalog read that falls back to the snapshot when Mongo is missing, failing or slow.
+
+    Snapshot reads ignore `projection`; response models drop the extra fields.
+    """
+    if db is not None and not mongo_breaker.open:
+        cursor = db[name].find(query, projection)
+        if sort:
+            cursor = cursor.sort(*sort)
+        try:
+            docs = await asyncio.wait_for(cursor.to_list(limit), CATALOG_READ_TIMEOUT_SECONDS)
+        except (PyMongoError, asyncio.TimeoutError) as e:
+            mongo_breaker.record_failure()
+            logger.warning(f"Catalog read from {name} failed, using the snapshot: {e!r}")
+        else:
+            mongo_breaker.record_success()
+            return docs
+    return snapshot_find(name, query, sort, limit)
+
+async def catalog_find_one(name: str, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+    docs = await catalog_find(name, query, projection, limit=1)
+    return docs[0] if docs else None
+
 # ============ Auth Routes ============
 
 @api_router.post("/auth/register", response_model=TokenResponse)
@@ -312,7 +1658,7 @@ async def register(data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     user_doc = {
         'id': user_id,
         'email': data.email,
@@ -322,7 +1668,8 @@ async def register(data: UserCreate):
         'is_premium': False,
         'created_at': now
     }
-    await db.users.insert_one(user_doc)
+    await db.users.insert_one(stored_document(user_doc))
+    await record_rollup('new_users', now)
     
     token = create_token(user_id)
     user_response = UserResponse(
@@ -333,7 +1680,7 @@ async def register(data: UserCreate):
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(data: UserLogin):
-    user = await db.users.find_one({'email': data.email}, {'_id': 0})
+    user = api_document(await db.users.find_one({'email': data.email}))
     if not user or not verify_password(data.password, user['password']):
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
@@ -370,8 +1717,8 @@ async def google_login(data: GoogleLoginRequest):
         # traceback.print_exc()
         raise HTTPException(status_code=400, detail=f"Token validation error: {str(e)}")
 
-    user = await db.users.find_one({'email': email}, {'_id': 0})
-    now = datetime.now(timezone.utc).isoformat()
+    user = api_document(await db.users.find_one({'email': email}))
+    now = utcnow()
 
     if not user:
         # Register new user
@@ -385,7 +1732,8 @@ async def google_login(data: GoogleLoginRequest):
             'is_premium': False,
             'created_at': now
         }
-        await db.users.insert_one(user_doc)
+        await db.users.insert_one(stored_document(user_doc))
+        await record_rollup('new_users', now)
         user = user_doc
     
     token = create_token(user['id'])
@@ -401,120 +1749,386 @@ async def admin_login(data: AdminLogin):
 @api_router.get("/auth/me", response_model=UserResponse)
 async def get_me(user: dict = Depends(get_current_user)):
     if user.get('is_admin'):
-        return UserResponse(id='admin', email='admin@mavecode.id', name='Admin', is_premium=True, created_at=datetime.now(timezone.utc).isoformat())
+        return UserResponse(id='admin', email='admin@mavecode.id', name='Admin', is_premium=True, created_at=utcnow())
     return UserResponse(**{k: v for k, v in user.items() if k != 'password'})
 
 # ============ Course Routes ============
 
-@api_router.get("/courses", response_model=List[CourseResponse])
-async def get_courses(category: Optional[str] = None, is_free: Optional[bool] = None):
+# List views: 'summary' is what the catalog cards render, projected in Mongo so
+# long bodies never leave the database; 'full' is the complete document.
+COURSE_SUMMARY_DESCRIPTION_CHARS = 200
+COURSE_SUMMARY_PROJECTION = {
+    **{name: 1 for name in CourseSummaryResponse.model_fields if name != 'id'},
+    'description': {'$substrCP': ['$description', 0, COURSE_SUMMARY_DESCRIPTION_CHARS]},
+}
+ARTICLE_SUMMARY_PROJECTION = {'content': 0}
+
+@api_router.get("/courses", response_model=Union[List[CourseResponse], List[CourseSummaryResponse]])
+@catalog_cached('courses')
+async def get_courses(
+    category: Optional[str] = None,
+    is_free: Optional[bool] = None,
+    view: Literal['summary', 'full'] = 'full'
+):
     query = {}
     if category:
         query['category'] = category
     if is_free is not None:
         query['is_free'] = is_free
-    courses = await db.courses.find(query, {'_id': 0}).to_list(100)
-    return courses
+    if view == 'summary':
+        courses = await catalog_find('courses', query, COURSE_SUMMARY_PROJECTION)
+        return model_list_response(CourseSummaryResponse, courses)
+    courses = await catalog_find('courses', query)
+    return model_list_response(CourseResponse, courses)
 
 @api_router.get("/courses/{course_id}", response_model=CourseResponse)
+@catalog_cached('courses')
 async def get_course(course_id: str):
-    course = await db.courses.find_one({'id': course_id}, {'_id': 0})
+    course = await catalog_find_one('courses', by_id(course_id))
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
-    return course
+    return api_document(course)
 
 @api_router.post("/courses", response_model=CourseResponse)
 async def create_course(data: CourseCreate, admin: dict = Depends(get_admin_user)):
     course_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     course_doc = {
         'id': course_id,
         **data.model_dump(),
+        **dict.fromkeys(COURSE_AGGREGATE_FIELDS, 0),
         'created_at': now,
         'updated_at': now
     }
-    await db.courses.insert_one(course_doc)
+    await db.courses.insert_one(stored_document(course_doc))
+    catalog_cache.invalidate('courses')
     return CourseResponse(**course_doc)
 
 @api_router.put("/courses/{course_id}", response_model=CourseResponse)
 async def update_course(course_id: str, data: CourseCreate, admin: dict = Depends(get_admin_user)):
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     result = await db.courses.update_one(
-        {'id': course_id},
+        by_id(course_id),
         {'$set': {**data.model_dump(), 'updated_at': now}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
-    course = await db.courses.find_one({'id': course_id}, {'_id': 0})
-    return CourseResponse(**course)
+    catalog_cache.invalidate('courses')
+    course = await db.courses.find_one(by_id(course_id))
+    return CourseResponse(**api_document(course))
 
 @api_router.delete("/courses/{course_id}")
 async def delete_course(course_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.courses.delete_one({'id': course_id})
+    # Lessons, progress and certificates can run to millions of rows: delete them (and flag the
+    # course's orders) off the request path. The job is queued first so a failure between the two
+    # writes can never leave a deleted course's rows behind; it waits until the course is gone.
+    job = await enqueue_job('delete_course', {'course_id': course_id})
+    result = await db.courses.delete_one(by_id(course_id))
     if result.deleted_count == 0:
+        await db.jobs.delete_one({**by_id(job['id']), 'status': 'queued'})
         raise HTTPException(status_code=404, detail="Course not found")
-    await db.videos.delete_many({'course_id': course_id})
-    return {"message": "Course deleted"}
+    catalog_cache.invalidate('courses')
+    drop_course_leaderboards(course_id)
+    return {"message": "Course deleted", "job_id": job['id']}
 
 # ============ Video Routes ============
 
+# Curriculum totals live on the course document, so certificate checks and dashboards
+# read them instead of counting videos. Each video write adjusts them with one $inc on
+# the course; the course_aggregates job recomputes them from the videos to repair drift
+# (a process dying between the two writes, or documents from before the fields existed).
+COURSE_AGGREGATE_FIELDS = ('lesson_count', 'quiz_count', 'preview_count', 'total_minutes')
+
+def curriculum_contribution(video: dict, sign: int = 1) -> dict:
+    """What one curriculum item adds to its course's totals; quizzes count as lessons too."""
+    return {
+        'lesson_count': sign,
+        'quiz_count': sign * int(video.get('type') == 'quiz'),
+        'preview_count': sign * int(bool(video.get('is_preview'))),
+        'total_minutes': sign * int(video.get('duration_minutes') or 0),
+    }
+
+async def adjust_course_aggregates(course_id, delta: dict):
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+    # $inc from a missing field would start the totals at this one write: count the course instead
+    result = await db.courses.update_one({'_id': course_id, 'lesson_count': {'$exists': True}}, {'$inc': delta})
+    if result.matched_count == 0:
+        await rebuild_course_aggregates([course_id])
+    catalog_cache.invalidate('courses')
+
+async def course_lesson_count(course: dict) -> int:
+    """The course's lesson total; counted from its videos until the course_aggregates job has set it."""
+    if 'lesson_count' in course:
+        return course['lesson_count']
+    return await db.videos.count_documents({'course_id': store_id(course.get('_id', course.get('id')))})
+
+async def enqueue_missing_course_aggregates():
+    """Queues the course_aggregates job at startup while any course still lacks its totals."""
+    try:
+        if await db.courses.find_one({'lesson_count': {'$exists': False}}, {'_id': 1}):
+            if not await db.jobs.find_one({'type': 'course_aggregates', 'status': {'$in': ['queued', 'running']}}):
+                await enqueue_job('course_aggregates')
+    except PyMongoError as e:
+        logger.warning(f"Course aggregates bootstrap check failed: {e!r}")
+
+async def rebuild_course_aggregates(course_ids: list) -> int:
+    """Recomputes the totals of `course_ids` (storage form) from their videos; returns how many were wrong."""
+    courses = await db.courses.find(
+        {'_id': {'$in': course_ids}}, dict.fromkeys(COURSE_AGGREGATE_FIELDS, 1)
+    ).to_list(None)
+    totals = {course['_id']: dict.fromkeys(COURSE_AGGREGATE_FIELDS, 0) for course in courses}
+    pipeline = [
+        {'$match': {'course_id': {'$in': course_ids}}},
+        {'$group': {
+            '_id': '$course_id',
+            'lesson_count': {'$sum': 1},
+            'quiz_count': {'$sum': {'$cond': [{'$eq': ['$type', 'quiz']}, 1, 0]}},
+            'preview_count': {'$sum': {'$cond': ['$is_preview', 1, 0]}},
+            'total_minutes': {'$sum': '$duration_minutes'},
+        }},
+    ]
+    async for row in db.videos.aggregate(pipeline):
+        if row['_id'] in totals:
+            totals[row.pop('_id')] = row
+    # Only overwrite values that are still the ones read: a concurrent $inc wins and is checked next run
+    fixes = [
+        UpdateOne({'_id': course['_id'], **{field: course.get(field) for field in COURSE_AGGREGATE_FIELDS}},
+                  {'$set': totals[course['_id']]})
+        for course in courses
+        if any(course.get(field) != totals[course['_id']][field] for field in COURSE_AGGREGATE_FIELDS)
+    ]
+    if fixes:
+        await db.courses.bulk_write(fixes, ordered=False)
+        catalog_cache.invalidate('courses')
+    return len(fixes)
+
 @api_router.get("/courses/{course_id}/videos", response_model=List[VideoResponse])
+@catalog_cached('videos')
 async def get_course_videos(course_id: str):
-    videos = await db.videos.find({'course_id': course_id}, {'_id': 0}).sort('order', 1).to_list(100)
-    return videos
+    videos = await catalog_find('videos', {'course_id': store_id(course_id)}, sort=('order', 1))
+    return model_list_response(VideoResponse, videos)
 
 @api_router.post("/videos", response_model=VideoResponse)
 async def create_video(data: VideoCreate, admin: dict = Depends(get_admin_user)):
     video_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     video_doc = {
         'id': video_id,
         **data.model_dump(),
         'created_at': now
     }
-    await db.videos.insert_one(video_doc)
+    await db.videos.insert_one(stored_document(video_doc))
+    await adjust_course_aggregates(store_id(data.course_id), curriculum_contribution(video_doc))
+    catalog_cache.invalidate('videos')
     return VideoResponse(**video_doc)
 
 @api_router.put("/videos/{video_id}", response_model=VideoResponse)
 async def update_video(video_id: str, data: VideoCreate, admin: dict = Depends(get_admin_user)):
-    result = await db.videos.update_one({'id': video_id}, {'$set': data.model_dump()})
-    if result.matched_count == 0:
+    update = stored_document(data.model_dump())
+    previous = await db.videos.find_one_and_update(by_id(video_id), {'$set': update})
+    if previous is None:
         raise HTTPException(status_code=404, detail="Video not found")
-    video = await db.videos.find_one({'id': video_id}, {'_id': 0})
-    return VideoResponse(**video)
+    removed, added = curriculum_contribution(previous, -1), curriculum_contribution(update)
+    if previous['course_id'] == update['course_id']:
+        await adjust_course_aggregates(update['course_id'], {field: removed[field] + added[field] for field in added})
+    else:
+        await adjust_course_aggregates(previous['course_id'], removed)
+        await adjust_course_aggregates(update['course_id'], added)
+    catalog_cache.invalidate('videos')
+    video = await db.videos.find_one(by_id(video_id))
+    return VideoResponse(**api_document(video))
 
 @api_router.delete("/videos/{video_id}")
 async def delete_video(video_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.videos.delete_one({'id': video_id})
-    if result.deleted_count == 0:
+    video = await db.videos.find_one_and_delete(by_id(video_id))
+    if video is None:
         raise HTTPException(status_code=404, detail="Video not found")
+    await adjust_course_aggregates(video['course_id'], curriculum_contribution(video, -1))
+    await db.quizzes.delete_one(by_id(video_id))
+    catalog_cache.invalidate('videos')
     return {"message": "Video deleted"}
 
+# ============ Bulk Import ============
+
+IMPORT_MAX_LESSONS = int(os.environ.get('IMPORT_MAX_LESSONS', '20000'))
+
+def parse_import_json(payload) -> list:
+    """Accepts one course, a list of courses or {"courses": [...]}; returns (row, course, lessons) groups."""
+    if isinstance(payload, dict) and isinstance(payload.get('courses'), list):
+        payload = payload['courses']
+    elif isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a course object or a list of courses")
+    groups = []
+    for i, raw in enumerate(payload):
+        lessons = raw.get('lessons') if isinstance(raw, dict) else None
+        lessons = lessons if isinstance(lessons, list) else []
+        groups.append((f"courses[{i}]", raw, [(f"courses[{i}].lessons[{j}]", lesson) for j, lesson in enumerate(lessons)]))
+    return groups
+
+def parse_import_csv(text: str) -> list:
+    """One lesson per row; course_* columns repeat per row and rows are grouped by course_id or course_title."""
+    import csv
+    groups = {}
+    for line, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+        values = {k.strip(): v.strip() for k, v in row.items() if k and isinstance(v, str) and v.strip()}
+        course = {k[len('course_'):]: v for k, v in values.items() if k.startswith('course_')}
+        lesson = {k[len('lesson_'):]: v for k, v in values.items() if k.startswith('lesson_')}
+        key = course.get('id') or course.get('title') or f"line {line}"
+        group = groups.setdefault(key, (f"line {line}", course, []))
+        if lesson:
+            group[2].append((f"line {line}", lesson))
+    return list(groups.values())
+
+def validate_import_row(model, raw, row: str, errors: list):
+    try:
+        return model.model_validate(raw)
+    except ValidationError as e:
+        errors.extend(
+            {'row': row, 'field': '.'.join(str(part) for part in err['loc']) or None, 'message': err['msg']}
+            for err in e.errors()
+        )
+        return None
+
+def validate_import(groups: list) -> tuple:
+    """Validates every row in one pass. A course is imported only if it and all its lessons are valid."""
+    courses, errors = [], []
+    for row, raw_course, raw_lessons in groups:
+        group_errors = []
+        course = validate_import_row(CourseImport, raw_course, row, group_errors)
+        lessons, orders = [], set()
+        for position, (lesson_row, raw_lesson) in enumerate(raw_lessons, start=1):
+            lesson = validate_import_row(LessonImport, raw_lesson, lesson_row, group_errors)
+            if lesson is None:
+                continue
+            if lesson.order is None:
+                lesson.order = position
+            if lesson.order in orders:
+                group_errors.append({'row': lesson_row, 'field': 'order', 'message': f"Duplicate lesson order {lesson.order}"})
+            orders.add(lesson.order)
+            lessons.append((lesson_row, lesson))
+        if group_errors:
+            errors.extend(group_errors)
+        else:
+            courses.append((row, course, lessons))
+    return courses, errors
+
+def import_operations(courses: list, now: datetime) -> tuple:
+    """Builds upserts keyed on course id and on lesson id, or (course_id, order) for lessons without one."""
+    course_ops, course_rows, lesson_ops, lesson_rows, course_ids = [], [], [], [], []
+    for row, course, lessons in courses:
+        course_id = course.id or str(uuid.uuid4())
+        course_ids.append(course_id)
+        course_ops.append(UpdateOne(
+            by_id(course_id),
+            {'$set': {**course.model_dump(exclude={'id'}), 'updated_at': now},
+             '$setOnInsert': {'created_at': now}},
+            upsert=True
+        ))
+        course_rows.append(row)
+        for lesson_row, lesson in lessons:
+            key = by_id(lesson.id) if lesson.id else {'course_id': store_id(course_id), 'order': lesson.order}
+            lesson_ops.append(UpdateOne(
+                key,
+                {'$set': {**lesson.model_dump(exclude={'id'}), 'course_id': store_id(course_id)},
+                 '$setOnInsert': {**({} if lesson.id else {'_id': new_id()}), 'created_at': now}},
+                upsert=True
+            ))
+            lesson_rows.append(lesson_row)
+    return course_ops, course_rows, lesson_ops, lesson_rows, course_ids
+
+async def apply_import(collection, ops: list, rows: list, errors: list) -> dict:
+    if not ops:
+        return {'inserted': 0, 'updated': 0}
+    try:
+        result = (await collection.bulk_write(ops, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+        errors.extend({'row': rows[err['index']], 'field': None, 'message': err['errmsg']} for err in result['writeErrors'])
+    return {'inserted': result['nUpserted'], 'updated': result['nMatched']}
+
+@api_router.post("/admin/import/courses")
+async def import_courses(request: Request, dry_run: bool = False, admin: dict = Depends(get_admin_user)):
+    import csv
+    body = await request.body()
+    try:
+        if request.headers.get('content-type', '').startswith('text/csv'):
+            groups = parse_import_csv(body.decode('utf-8-sig'))
+        else:
+            groups = parse_import_json(json.loads(body))
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse import: {e}")
+    if sum(len(lessons) for _, _, lessons in groups) > IMPORT_MAX_LESSONS:
+        raise HTTPException(status_code=413, detail=f"Import is limited to {IMPORT_MAX_LESSONS} lessons")
+
+    courses, errors = validate_import(groups)
+    report = {
+        'dry_run': dry_run,
+        'courses': {'valid': len(courses), 'rejected': len(groups) - len(courses)},
+        'lessons': {'valid': sum(len(lessons) for _, _, lessons in courses)},
+        'errors': errors,
+    }
+    if dry_run or not courses:
+        return report
+
+    course_ops, course_rows, lesson_ops, lesson_rows, course_ids = import_operations(
+        courses, utcnow()
+    )
+    # Lessons without an id are matched on (course_id, order); courses and lessons with one use _id
+    await db.videos.create_index([('course_id', 1), ('order', 1)])
+    course_result, lesson_result = await asyncio.gather(
+        apply_import(db.courses, course_ops, course_rows, errors),
+        apply_import(db.videos, lesson_ops, lesson_rows, errors),
+    )
+    await rebuild_course_aggregates([store_id(course_id) for course_id in course_ids])
+    catalog_cache.invalidate('courses', 'videos')
+    report['courses'].update(course_result)
+    report['lessons'].update(lesson_result)
+    report['course_ids'] = course_ids
+    return report
+
 # ============ Article Routes ============
 
-@api_router.get("/articles", response_model=List[ArticleResponse])
-async def get_articles(category: Optional[str] = None, tag: Optional[str] = None):
+@api_router.get("/articles", response_model=Union[List[ArticleResponse], List[ArticleSummaryResponse]])
+@catalog_cached('articles')
+async def get_articles(
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    view: Literal['summary', 'full'] = 'full'
+):
     query = {}
     if category:
         query['category'] = category
     if tag:
         query['tags'] = tag
-    articles = await db.articles.find(query, {'_id': 0}).sort('created_at', -1).to_list(100)
-    return articles
+    if view == 'summary':
+        articles = await catalog_find('articles', query, ARTICLE_SUMMARY_PROJECTION, sort=('created_at', -1))
+        return model_list_response(ArticleSummaryResponse, articles)
+    articles = await catalog_find('articles', query, sort=('created_at', -1))
+    return model_list_response(ArticleResponse, articles)
 
 @api_router.get("/articles/{slug}", response_model=ArticleResponse)
 async def get_article(slug: str):
-    article = await db.articles.find_one({'slug': slug}, {'_id': 0})
+    article = await catalog_find_one('articles', {'slug': slug})
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
-    await db.articles.update_one({'slug': slug}, {'$inc': {'views': 1}})
-    article['views'] = article.get('views', 0) + 1
-    return article
+    # The view count is best-effort: the article is still served from the snapshot during an outage
+    if db is not None and not mongo_breaker.open:
+        try:
+            await asyncio.wait_for(db.articles.update_one({'_id': article['_id']}, {'$inc': {'views': 1}}),
+                                   CATALOG_READ_TIMEOUT_SECONDS)
+            article['views'] = article.get('views', 0) + 1
+        except (PyMongoError, asyncio.TimeoutError) as e:
+            logger.warning(f"View count of article {slug} not updated: {e!r}")
+    return api_document(article)
 
 @api_router.post("/articles", response_model=ArticleResponse)
 async def create_article(data: ArticleCreate, admin: dict = Depends(get_admin_user)):
     article_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     slug = slugify(data.title) + '-' + article_id[:8]
     article_doc = {
         'id': article_id,
@@ -524,26 +2138,29 @@ async def create_article(data: ArticleCreate, admin: dict = Depends(get_admin_us
         'created_at': now,
         'updated_at': now
     }
-    await db.articles.insert_one(article_doc)
+    await db.articles.insert_one(stored_document(article_doc))
+    catalog_cache.invalidate('articles')
     return ArticleResponse(**article_doc)
 
 @api_router.put("/articles/{article_id}", response_model=ArticleResponse)
 async def update_article(article_id: str, data: ArticleCreate, admin: dict = Depends(get_admin_user)):
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     result = await db.articles.update_one(
-        {'id': article_id},
+        by_id(article_id),
         {'$set': {**data.model_dump(), 'updated_at': now}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Article not found")
-    article = await db.articles.find_one({'id': article_id}, {'_id': 0})
-    return ArticleResponse(**article)
+    catalog_cache.invalidate('articles')
+    article = await db.articles.find_one(by_id(article_id))
+    return ArticleResponse(**api_document(article))
 
 @api_router.delete("/articles/{article_id}")
 async def delete_article(article_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.articles.delete_one({'id': article_id})
+    result = await db.articles.delete_one(by_id(article_id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Article not found")
+    catalog_cache.invalidate('articles')
     return {"message": "Article deleted"}
 
 # ============ Subscription Plans ============
@@ -579,61 +2196,197 @@ async def get_subscription_plans():
 
 # ============ Live Class Routes ============
 
+# `live_classes` holds upcoming, running and just-finished classes; finished ones move to
+# `live_classes_archive` after a grace period, so the windowed views stay small index
+# scans. Their cached responses are dropped at every start or end of a class (and by
+# writes, as for the rest of the catalog), so a view never outlives its time window.
+LIVE_CLASS_VIEW_LIMIT = 100
+LIVE_CLASS_ARCHIVE_GRACE_MINUTES = int(os.environ.get('LIVE_CLASS_ARCHIVE_GRACE_MINUTES', '60'))
+LIVE_CLASS_ARCHIVE_SECONDS = float(os.environ.get('LIVE_CLASS_ARCHIVE_SECONDS', '600'))
+LIVE_CLASS_BOUNDARY_MAX_SECONDS = 300
+
+live_class_schedule_changed = asyncio.Event()
+invalidation_bus.subscribe(lambda collection: collection == 'live_classes' and live_class_schedule_changed.set())
+
+def live_class_ends_at(live_class: dict) -> datetime:
+    return (parse_timestamp(live_class['scheduled_at'], SCHEDULE_TZ)
+            + timedelta(minutes=live_class.get('duration_minutes') or 0))
+
+async def setup_live_classes():
+    try:
+        await db.live_classes.create_index('scheduled_at')
+        await db.live_classes.create_index('ends_at')
+        await db.live_classes_archive.create_index([('scheduled_at', -1)])
+        # Classes created before ends_at was stored; there are only ever a handful
+        async for live_class in db.live_classes.find({'ends_at': None}, {'scheduled_at': 1, 'duration_minutes': 1}):
+            await db.live_classes.update_one({'_id': live_class['_id']},
+                                             {'$set': {'ends_at': live_class_ends_at(live_class)}})
+    except (PyMongoError, ValueError) as e:
+        logger.warning(f"Could not set up live class indexes: {e!r}")
+
+async def archive_finished_live_classes() -> int:
+    """Moves classes that ended more than the grace period ago into the archive.
+
+    Each batch is copied before it is deleted, so an interrupted run leaves a class in
+    both collections (the past view shows it once) and the next run finishes the move.
+    """
+    cutoff = utcnow() - timedelta(minutes=LIVE_CLASS_ARCHIVE_GRACE_MINUTES)
+    archived = 0
+    while True:
+        finished = await db.live_classes.find({'ends_at': {'$lte': cutoff}}).limit(JOB_BATCH_SIZE).to_list(None)
+        if not finished:
+            break
+        now = utcnow()
+        await db.live_classes_archive.bulk_write([
+            ReplaceOne({'_id': live_class['_id']}, {**live_class, 'archived_at': now}, upsert=True)
+            for live_class in finished
+        ], ordered=False)
+        result = await db.live_classes.delete_many(
+            {'_id': {'$in': [live_class['_id'] for live_class in finished]}, 'ends_at': {'$lte': cutoff}}
+        )
+        archived += result.deleted_count
+    if archived:
+        catalog_cache.invalidate('live_classes', 'live_classes_archive')
+        logger.info(f"Archived {archived} finished live classes")
+    return archived
+
+async def archive_live_classes_periodically():
+    while True:
+        try:
+            await archive_finished_live_classes()
+        except PyMongoError as e:
+            logger.warning(f"Live class archival failed: {e!r}")
+        await asyncio.sleep(LIVE_CLASS_ARCHIVE_SECONDS)
+
+async def next_live_class_boundary() -> Optional[datetime]:
+    """The next time a class starts or ends, when the upcoming and live views change."""
+    now = utcnow()
+    starting, ending = await asyncio.gather(
+        db.live_classes.find_one({'scheduled_at': {'$gt': now}}, {'scheduled_at': 1}, sort=[('scheduled_at', 1)]),
+        db.live_classes.find_one({'ends_at': {'$gt': now}}, {'ends_at': 1}, sort=[('ends_at', 1)]),
+    )
+    boundaries = [doc[field] for doc, field in ((starting, 'scheduled_at'), (ending, 'ends_at')) if doc]
+    return min(boundaries) if boundaries else None
+
+async def refresh_live_classes_on_boundaries():
+    """Drops cached live class views as each boundary passes; schedule writes wake it early."""
+    while True:
+        try:
+            boundary = await next_live_class_boundary()
+        except PyMongoError as e:
+            logger.warning(f"Live class schedule lookup failed: {e!r}")
+            boundary = None
+        delay = LIVE_CLASS_BOUNDARY_MAX_SECONDS
+        if boundary is not None:
+            # A little past the boundary, so the refreshed views see the class on its new side
+            delay = min(max((boundary - utcnow()).total_seconds(), 0) + 0.05, delay)
+        live_class_schedule_changed.clear()
+        try:
+            await asyncio.wait_for(live_class_schedule_changed.wait(), delay)
+        except asyncio.TimeoutError:
+            if boundary is not None and boundary <= utcnow():
+                catalog_cache.invalidate('live_classes')
+
+async def find_live_classes(view: Optional[str], limit: int) -> list:
+    now = utcnow()
+    projection = {'participant_ids': 0}
+    if view == 'upcoming':
+        return await catalog_find('live_classes', timestamp_range('scheduled_at', since=now), projection,
+                                  sort=('scheduled_at', 1), limit=limit)
+    if view == 'live':
+        return await catalog_find('live_classes', {**timestamp_range('scheduled_at', until=now), 'ends_at': {'$gt': now}},
+                                  projection, sort=('scheduled_at', 1), limit=limit)
+    if view == 'past':
+        recent, archived = await asyncio.gather(
+            catalog_find('live_classes', {'ends_at': {'$lte': now}}, projection, sort=('scheduled_at', -1), limit=limit),
+            catalog_find('live_classes_archive', {}, projection, sort=('scheduled_at', -1), limit=limit),
+        )
+        merged = {live_class['_id']: live_class for live_class in archived + recent}
+        return sorted(merged.values(), key=lambda live_class: snapshot_comparable(live_class['scheduled_at']),
+                      reverse=True)[:limit]
+    return await catalog_find('live_classes', {}, projection, sort=('scheduled_at', 1), limit=limit)
+
 @api_router.get("/live-classes", response_model=List[LiveClassResponse])
-async def get_live_classes():
-    classes = await db.live_classes.find({}, {'_id': 0}).sort('scheduled_at', 1).to_list(100)
-    return classes
+@catalog_cached('live_classes', 'live_classes_archive')
+async def get_live_classes(view: Optional[Literal['upcoming', 'live', 'past']] = None,
+                           limit: int = LIVE_CLASS_VIEW_LIMIT):
+    """Without `view`, every class not archived yet (the original listing)."""
+    classes = await find_live_classes(view, min(max(limit, 1), LIVE_CLASS_VIEW_LIMIT))
+    return model_list_response(LiveClassResponse, classes)
 
 @api_router.post("/live-classes", response_model=LiveClassResponse)
 async def create_live_class(data: LiveClassCreate, admin: dict = Depends(get_admin_user)):
     class_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     class_doc = {
         'id': class_id,
         **data.model_dump(),
+        'scheduled_at': parse_timestamp(data.scheduled_at, SCHEDULE_TZ),
         'participants_count': 0,
         'created_at': now
     }
-    await db.live_classes.insert_one(class_doc)
+    class_doc['ends_at'] = live_class_ends_at(class_doc)
+    notifications = []
+    if NOTIFY_WEBHOOK_URL:
+        notifications.append(webhook_notification(f"live_class:{class_id}:created", 'live_class_created', {
+            'id': class_id, 'title': data.title, 'instructor': data.instructor,
+            'scheduled_at': format_timestamp(class_doc['scheduled_at'], SCHEDULE_TZ), 'meeting_url': data.meeting_url
+        }))
+    # Reminders are queued by schedule_reminders_periodically as the class approaches
+    await write_with_outbox(
+        lambda session: db.live_classes.insert_one(stored_document(class_doc), session=session),
+        notifications
+    )
+    catalog_cache.invalidate('live_classes')
+    live_class_schedule_changed.set()
     return LiveClassResponse(**class_doc)
 
 @api_router.post("/live-classes/{class_id}/join")
 async def join_live_class(class_id: str, user: dict = Depends(get_current_user)):
-    live_class = await db.live_classes.find_one({'id': class_id}, {'_id': 0})
+    live_class = await db.live_classes.find_one(by_id(class_id))
     if not live_class:
         raise HTTPException(status_code=404, detail="Live class not found")
-    await db.live_classes.update_one({'id': class_id}, {'$inc': {'participants_count': 1}})
+    # participant_ids is who gets the reminder; the count keeps counting every join as before
+    await db.live_classes.update_one(by_id(class_id), {'$inc': {'participants_count': 1},
+                                                       '$addToSet': {'participant_ids': store_id(user['id'])}})
+    catalog_cache.invalidate('live_classes')
     return {"message": "Joined successfully", "meeting_url": live_class.get('meeting_url')}
 
 @api_router.delete("/live-classes/{class_id}")
 async def delete_live_class(class_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.live_classes.delete_one({'id': class_id})
+    result = await db.live_classes.delete_one(by_id(class_id))
+    if result.deleted_count == 0:
+        result = await db.live_classes_archive.delete_one(by_id(class_id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Live class not found")
+    catalog_cache.invalidate('live_classes', 'live_classes_archive')
+    live_class_schedule_changed.set()
     return {"message": "Live class deleted"}
 
 # ============ FAQ Routes ============
 
 @api_router.get("/faqs", response_model=List[FAQResponse])
+@catalog_cached('faqs')
 async def get_faqs(category: Optional[str] = None):
     query = {}
     if category:
         query['category'] = category
-    faqs = await db.faqs.find(query, {'_id': 0}).sort('order', 1).to_list(100)
-    return faqs
+    faqs = await catalog_find('faqs', query, sort=('order', 1))
+    return model_list_response(FAQResponse, faqs)
 
 @api_router.post("/faqs", response_model=FAQResponse)
 async def create_faq(data: FAQCreate, admin: dict = Depends(get_admin_user)):
     faq_id = str(uuid.uuid4())
     faq_doc = {'id': faq_id, **data.model_dump()}
-    await db.faqs.insert_one(faq_doc)
+    await db.faqs.insert_one(stored_document(faq_doc))
+    catalog_cache.invalidate('faqs')
     return FAQResponse(**faq_doc)
 
 # ============ Payment & Orders ============
 
 @api_router.post("/orders", response_model=OrderResponse)
 async def create_order(data: CreateOrder, user: dict = Depends(get_current_user)):
-    course = await db.courses.find_one({'id': data.course_id})
+    course = await db.courses.find_one(by_id(data.course_id))
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
@@ -641,7 +2394,7 @@ async def create_order(data: CreateOrder, user: dict = Depends(get_current_user)
     # (Simplified: In real app check transaction history)
     
     order_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     
     # Simulate VA Number generation based on method
     va_number = None
@@ -659,23 +2412,29 @@ async def create_order(data: CreateOrder, user: dict = Depends(get_current_user)
         'created_at': now
     }
     
-    await db.orders.insert_one(order_doc)
+    await db.orders.insert_one(stored_document(order_doc))
     return OrderResponse(**order_doc)
 
 @api_router.post("/orders/{order_id}/pay")
 async def pay_order(order_id: str, user: dict = Depends(get_current_user)):
     # Simulate payment success
-    result = await db.orders.update_one(
-        {'id': order_id, 'user_id': user['id']},
-        {'$set': {'status': 'paid'}}
+    now = utcnow()
+    order = await db.orders.find_one_and_update(
+        {'_id': store_id(order_id), 'user_id': store_id(user['id'])},
+        {'$set': {'status': 'paid', 'paid_at': now}},
+        projection={'_id': 0, 'status': 1, 'course_id': 1, 'payment_method': 1, 'amount': 1}
     )
-    if result.matched_count == 0:
+    if order is None:
         raise HTTPException(status_code=404, detail="Order not found")
+    order = api_document(order)
+    if order['status'] != 'paid':
+        await record_rollup('revenue', now, order['course_id'], order['payment_method'], order['amount'])
+        recommender.observe(user['id'], order['course_id'])
     
     # GRANT ACCESS: For now, buying any course grants Premium status (Subscription Model)
     # In a full system, we would add to a 'purchased_courses' list or 'subscriptions' collection.
     await db.users.update_one(
-        {'id': user['id']}, 
+        by_id(user['id']), 
         {'$set': {'is_premium': True}}
     )
     
@@ -683,24 +2442,27 @@ async def pay_order(order_id: str, user: dict = Depends(get_current_user)):
 
 @api_router.put("/faqs/{faq_id}", response_model=FAQResponse)
 async def update_faq(faq_id: str, data: FAQCreate, admin: dict = Depends(get_admin_user)):
-    result = await db.faqs.update_one({'id': faq_id}, {'$set': data.model_dump()})
+    result = await db.faqs.update_one(by_id(faq_id), {'$set': data.model_dump()})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="FAQ not found")
-    faq = await db.faqs.find_one({'id': faq_id}, {'_id': 0})
-    return FAQResponse(**faq)
+    catalog_cache.invalidate('faqs')
+    faq = await db.faqs.find_one(by_id(faq_id))
+    return FAQResponse(**api_document(faq))
 
 @api_router.delete("/faqs/{faq_id}")
 async def delete_faq(faq_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.faqs.delete_one({'id': faq_id})
+    result = await db.faqs.delete_one(by_id(faq_id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="FAQ not found")
+    catalog_cache.invalidate('faqs')
     return {"message": "FAQ deleted"}
 
 # ============ Hero Content ============
 
 @api_router.get("/hero")
+@catalog_cached('settings')
 async def get_hero_content():
-    hero = await db.settings.find_one({'type': 'hero'}, {'_id': 0})
+    hero = await catalog_find_one('settings', {'type': 'hero'}, {'_id': 0})
     if not hero:
         return {
             'title': 'Mulai Karir Codingmu Sekarang',
@@ -717,6 +2479,7 @@ async def update_hero_content(data: HeroContentUpdate, admin: dict = Depends(get
         {'$set': {**data.model_dump(), 'type': 'hero'}},
         upsert=True
     )
+    catalog_cache.invalidate('settings')
     return {"message": "Hero content updated"}
 
 # ============ Contact ============
@@ -724,42 +2487,344 @@ async def update_hero_content(data: HeroContentUpdate, admin: dict = Depends(get
 @api_router.post("/contact")
 async def send_contact(data: ContactMessage):
     message_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     message_doc = {
         'id': message_id,
         **data.model_dump(),
         'created_at': now,
         'read': False
     }
-    await db.contact_messages.insert_one(message_doc)
+    notifications = []
+    if SMTP_HOST and NOTIFY_ADMIN_EMAIL:
+        notifications.append(email_notification(
+            f"contact:{message_id}:email", 'contact_message', NOTIFY_ADMIN_EMAIL,
+            f"[Kontak] {data.subject}", f"Dari: {data.name} <{data.email}>\n\n{data.message}\n",
+            reply_to=data.email
+        ))
+    if NOTIFY_WEBHOOK_URL:
+        notifications.append(webhook_notification(f"contact:{message_id}:webhook", 'contact_message', {
+            'id': message_id, 'name': data.name, 'email': data.email, 'subject': data.subject
+        }))
+    await write_with_outbox(
+        lambda session: db.contact_messages.insert_one(stored_document(message_doc), session=session),
+        notifications
+    )
     return {"message": "Message sent successfully", "id": message_id}
 
 @api_router.get("/contact/messages")
 async def get_contact_messages(admin: dict = Depends(get_admin_user)):
-    messages = await db.contact_messages.find({}, {'_id': 0}).sort('created_at', -1).to_list(100)
-    return messages
+    messages = await db.contact_messages.find({}).sort('created_at', -1).to_list(100)
+    return [api_document(message) for message in messages]
 
 # ============ User Progress ============
 
 @api_router.post("/progress")
 async def update_progress(data: UserProgress, user: dict = Depends(get_current_user)):
-    await db.progress.update_one(
-        {'user_id': user['id'], 'course_id': data.course_id, 'video_id': data.video_id},
-        {'$set': {'completed': data.completed, 'progress_percent': data.progress_percent}},
+    row = stored_document({'user_id': user['id'], 'course_id': data.course_id, 'video_id': data.video_id})
+    video = await db.videos.find_one(by_id(data.video_id), {'type': 1})
+    if video is not None and video.get('type') == 'quiz':
+        # A quiz item is completed by passing the quiz (record_quiz_progress), never set directly
+        current = await db.progress.find_one(row, {'_id': 0, 'completed': 1})
+        if data.completed != bool((current or {}).get('completed')):
+            raise HTTPException(status_code=400, detail="Quiz items are completed by passing the quiz")
+    now = utcnow()
+    previous = await db.progress.find_one_and_update(
+        row,
+        {'$set': {
+            'completed': data.completed,
+            'progress_percent': data.progress_percent,
+            'updated_at': now
+        }},
+        projection={'_id': 0, 'completed': 1},
         upsert=True
     )
+    was_completed = bool((previous or {}).get('completed'))
+    if data.completed and not was_completed:
+        await record_rollup('lesson_completions', now, data.course_id)
+    if data.completed != was_completed:
+        await record_lesson_completion(user['id'], data.course_id, data.completed, now)
+    recommender.observe(user['id'], data.course_id)
     return {"message": "Progress updated"}
 
 @api_router.get("/progress/{course_id}")
 async def get_progress(course_id: str, user: dict = Depends(get_current_user)):
     progress = await db.progress.find(
-        {'user_id': user['id'], 'course_id': course_id}, 
+        stored_document({'user_id': user['id'], 'course_id': course_id}), 
         {'_id': 0}
     ).to_list(100)
-    return progress
+    return [api_document(row) for row in progress]
+
+# ============ Quizzes ============
+
+# One quiz per `type: 'quiz'` curriculum item, stored under the item's id. The answer
+# key is one byte per question (the correct option's index) and so is each submission
+# (QUIZ_SKIPPED for an unanswered question), so grading a batch and computing cohort
+# statistics are comparisons over uint8 matrices rather than loops over documents.
+QUIZ_SKIPPED = 255
+
+def encode_answers(answers: List[Optional[int]]) -> bytes:
+    """Out-of-range choices are stored as skipped: they can never match the key."""
+    return bytes(QUIZ_SKIPPED if answer is None or not 0 <= answer < QUIZ_SKIPPED else answer
+                 for answer in answers)
+
+def grade_answers(answer_key: bytes, answers: 'np.ndarray') -> 'np.ndarray':
+    """Correctness mask of a (submissions × questions) uint8 matrix against the answer key."""
+    import numpy as np
+    return answers == np.frombuffer(answer_key, dtype=np.uint8)
+
+def quiz_item_statistics(correct: 'np.ndarray') -> dict:
+    """Classical item statistics for a (students × questions) correctness matrix.
+
+    Difficulty is the share of students who got a question right. Discrimination is the
+    point-biserial correlation between getting it right and the score on the other
+    questions: near zero or negative flags a question that does not separate strong
+    students from weak ones. Both are NaN where undefined (no students, or no variance).
+    """
+    import numpy as np
+    x = correct.astype(np.float64)
+    scores = x.sum(axis=1)
+    rest = scores[:, None] - x
+    x_dev = x - x.mean(axis=0) if len(x) else x
+    rest_dev = rest - rest.mean(axis=0) if len(x) else rest
+    with np.errstate(invalid='ignore', divide='ignore'):
+        difficulty = x.sum(axis=0) / len(x)
+        discrimination = (x_dev * rest_dev).sum(axis=0) / np.sqrt((x_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0))
+    return {'difficulty': difficulty, 'discrimination': discrimination, 'scores': scores}
+
+def finite_or_none(value: float, digits: int = 4) -> Optional[float]:
+    return round(float(value), digits) if math.isfinite(value) else None
+
+async def get_quiz_document(video_id: str) -> dict:
+    quiz = await db.quizzes.find_one(by_id(video_id))
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    return quiz
+
+def public_quiz(quiz: dict) -> dict:
+    return {
+        'video_id': api_value('_id', quiz['_id']), 'course_id': api_value('course_id', quiz['course_id']),
+        'questions': quiz['questions'], 'pass_percent': quiz['pass_percent'], 'version': quiz['version']
+    }
+
+async def record_quiz_progress(user_id: str, course_id: str, video_id: str, percent: int, passed: bool, now: datetime):
+    """Best attempt wins: a pass completes the lesson and a later failed attempt never un-completes it."""
+    update = {'$set': {'updated_at': now}, '$max': {'progress_percent': percent}}
+    if passed:
+        update['$set']['completed'] = True
+    else:
+        update['$setOnInsert'] = {'completed': False}
+    previous = await db.progress.find_one_and_update(
+        stored_document({'user_id': user_id, 'course_id': course_id, 'video_id': video_id}),
+        update, projection={'_id': 0, 'completed': 1}, upsert=True
+    )
+    if passed and not (previous or {}).get('completed'):
+        await record_rollup('lesson_completions', now, course_id)
+        await record_lesson_completion(user_id, course_id, True, now)
+    recommender.observe(user_id, course_id)
+
+async def grade_submissions(user_id: str, submissions: List[QuizSubmission]) -> List[QuizResult]:
+    import numpy as np
+    quizzes = {quiz['_id']: quiz for quiz in await db.quizzes.find(
+        {'_id': {'$in': list({store_id(s.video_id) for s in submissions})}}
+    ).to_list(None)}
+    by_quiz = {}
+    for i, submission in enumerate(submissions):
+        quiz = quizzes.get(store_id(submission.video_id))
+        if quiz is None:
+            raise HTTPException(status_code=404, detail=f"Quiz {submission.video_id} not found")
+        if len(submission.answers) != len(quiz['questions']):
+            raise HTTPException(status_code=400, detail=f"Quiz {submission.video_id} has {len(quiz['questions'])} questions")
+        by_quiz.setdefault(quiz['_id'], []).append(i)
+
+    now = utcnow()
+    results, documents, best = [None] * len(submissions), [], {}
+    for quiz_id, indexes in by_quiz.items():
+        quiz = quizzes[quiz_id]
+        encoded = [encode_answers(submissions[i].answers) for i in indexes]
+        answers = np.frombuffer(b''.join(encoded), dtype=np.uint8).reshape(len(indexes), -1)
+        scores = grade_answers(quiz['answer_key'], answers).sum(axis=1)
+        total = len(quiz['questions'])
+        for i, answer_bytes, score in zip(indexes, encoded, scores.tolist()):
+            percent = score * 100 // total
+            passed = percent >= quiz['pass_percent']
+            results[i] = QuizResult(video_id=submissions[i].video_id, score=score, total=total,
+                                    percent=percent, passed=passed)
+            documents.append({
+                'user_id': store_id(user_id), 'course_id': quiz['course_id'], 'video_id': quiz_id,
+                'version': quiz['version'], 'answers': answer_bytes, 'score': score, 'total': total,
+                'passed': passed, 'submitted_at': now
+            })
+            if quiz_id not in best or percent > best[quiz_id][0]:
+                best[quiz_id] = (percent, passed)
+    await db.quiz_submissions.insert_many(documents)
+    # One progress write per quiz, with the batch's best attempt
+    for quiz_id, (percent, passed) in best.items():
+        await record_quiz_progress(user_id, api_value('course_id', quizzes[quiz_id]['course_id']),
+                                   api_value('_id', quiz_id), percent, passed, now)
+    return results
+
+@api_router.get("/quizzes/{video_id}", response_model=QuizResponse)
+async def get_quiz(video_id: str):
+    return public_quiz(await get_quiz_document(video_id))
+
+@api_router.put("/admin/quizzes/{video_id}", response_model=QuizResponse)
+async def set_quiz(video_id: str, data: QuizCreate, admin: dict = Depends(get_admin_user)):
+    video = await db.videos.find_one(by_id(video_id), {'course_id': 1, 'type': 1})
+    if not video or video.get('type') != 'quiz':
+        raise HTTPException(status_code=404, detail="Quiz item not found")
+    for number, question in enumerate(data.questions, 1):
+        if question.answer >= len(question.options):
+            raise HTTPException(status_code=400, detail=f"Question {number}: answer is not one of the options")
+    # A new version starts a new cohort: statistics never mix answers to different keys
+    quiz = await db.quizzes.find_one_and_update(
+        by_id(video_id),
+        {'$set': {
+            'course_id': video['course_id'],
+            'questions': [question.model_dump(include={'prompt', 'options'}) for question in data.questions],
+            'answer_key': bytes(question.answer for question in data.questions),
+            'pass_percent': data.pass_percent,
+            'updated_at': utcnow()
+        }, '$inc': {'version': 1}},
+        upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return public_quiz(quiz)
+
+@api_router.post("/quizzes/{video_id}/submissions", response_model=QuizResult)
+async def submit_quiz(video_id: str, data: QuizAnswers, user: dict = Depends(get_current_user)):
+    results = await grade_submissions(user['id'], [QuizSubmission(video_id=video_id, answers=data.answers)])
+    return results[0]
+
+@api_router.post("/quizzes/submissions", response_model=List[QuizResult])
+async def submit_quizzes(data: QuizSubmissionBatch, user: dict = Depends(get_current_user)):
+    """Grades several attempts at once, e.g. ones taken offline and synced later."""
+    return await grade_submissions(user['id'], data.submissions)
+
+@api_router.get("/admin/quizzes/{video_id}/stats")
+async def get_quiz_stats(video_id: str, attempts: Literal['first', 'all'] = 'first',
+                         admin: dict = Depends(get_admin_user)):
+    import numpy as np
+    quiz = await get_quiz_document(video_id)
+    total = len(quiz['questions'])
+    users, encoded = [], []
+    cursor = db.quiz_submissions.find(
+        {'video_id': quiz['_id'], 'version': quiz['version']}, {'_id': 0, 'user_id': 1, 'answers': 1}
+    ).sort('submitted_at', 1)
+    async for doc in cursor:
+        user_id = doc['user_id']
+        users.append(bytes(user_id) if isinstance(user_id, bytes) else str(user_id).encode())
+        encoded.append(doc['answers'])
+    answers = np.frombuffer(b''.join(encoded), dtype=np.uint8).reshape(-1, total)
+    if attempts == 'first' and users:
+        # np.unique returns each user's first row; rows are in submission order
+        _, first = np.unique(np.array(users, dtype=object), return_index=True)
+        answers = answers[np.sort(first)]
+
+    stats = quiz_item_statistics(grade_answers(quiz['answer_key'], answers))
+    option_counts = np.zeros((total, QUIZ_SKIPPED + 1), dtype=np.int64)
+    if len(answers):
+        cells = (np.arange(total, dtype=np.int64) * (QUIZ_SKIPPED + 1) + answers).ravel()
+        option_counts = np.bincount(cells, minlength=total * (QUIZ_SKIPPED + 1)).reshape(total, -1)
+    scores = stats['scores']
+    return {
+        'video_id': video_id,
+        'version': quiz['version'],
+        'students': len(answers),
+        'mean_score': finite_or_none(scores.mean()) if len(scores) else None,
+        'score_std': finite_or_none(scores.std()) if len(scores) else None,
+        'pass_rate': finite_or_none((scores * 100 // total >= quiz['pass_percent']).mean()) if len(scores) else None,
+        'questions': [{
+            'prompt': question['prompt'],
+            'difficulty': finite_or_none(stats['difficulty'][i]),
+            'discrimination': finite_or_none(stats['discrimination'][i]),
+            'option_counts': option_counts[i, :len(question['options'])].tolist(),
+            'skipped': int(option_counts[i, QUIZ_SKIPPED]),
+        } for i, question in enumerate(quiz['questions'])],
+    }
+
+# ============ Course Page ============
+
+COURSE_PAGE_PUBLIC_COLLECTIONS = frozenset({'courses', 'videos'})
+
+async def course_page_public(course_id: str) -> Optional[CatalogEntry]:
+    """Course and curriculum serialized once into the catalog cache; the entry's ETag is the public version."""
+    key = f"/api/courses/{course_id}/full#public"
+    entry = catalog_cache.get(key)
+    if entry is not None:
+        return entry
+    course, videos = await asyncio.gather(
+        catalog_find_one('courses', by_id(course_id)),
+        catalog_find('videos', {'course_id': store_id(course_id)}, sort=('order', 1)),
+    )
+    if course is None:
+        return None
+    with span('serialize'):
+        body = to_json({
+            'course': CourseResponse(**api_document(course)).model_dump(),
+            'videos': [VideoResponse(**api_document(video)).model_dump() for video in videos],
+        })
+    return catalog_cache.put(key, body, 'application/json', COURSE_PAGE_PUBLIC_COLLECTIONS)
+
+async def optional_section(name: str, fetch):
+    """Personal sections are best-effort: a failure leaves the section null instead of failing the page."""
+    try:
+        return await fetch
+    except PyMongoError as e:
+        logger.warning(f"Course page section {name} unavailable: {e!r}")
+        return None
+
+@api_router.get("/courses/{course_id}/full")
+async def get_course_page(
+    course_id: str,
+    request: Request,
+    public_version: Optional[str] = None,
+    user: Optional[dict] = Depends(get_optional_user)
+):
+    """Course, curriculum, the caller's progress and certificate in one round trip.
+
+    `version` identifies the public part (course and videos). Clients that already hold
+    it pass it back as `public_version` and get those two sections as null.
+    """
+    fetches = [course_page_public(course_id)]
+    if user is not None:
+        owner = stored_document({'user_id': user['id'], 'course_id': course_id})
+        fetches += [
+            optional_section('progress', db.progress.find(owner, {'_id': 0}).to_list(100)),
+            optional_section('certificate', db.certificates.find_one(owner)),
+        ]
+    public, *personal = await asyncio.gather(*fetches)
+    if public is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    version = public.etag.strip('"')
+    with span('serialize'):
+        # The public part is spliced in as the cached bytes rather than re-serialized
+        sections = b'"course":null,"videos":null' if public_version == version else public.body[1:-1]
+        progress, certificate = personal or (None, None)
+        progress = None if progress is None else [api_document(row) for row in progress]
+        certificate = api_document(certificate)
+        body = b''.join([
+            b'{"version":', to_json(version), b',', sections,
+            b',"progress":', to_json(progress), b',"certificate":', to_json(certificate), b'}'
+        ])
+    if user is None:
+        headers = {'ETag': public.etag, 'Cache-Control': 'public, no-cache', 'Vary': 'Authorization'}
+        if request.headers.get('if-none-match') == public.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type='application/json', headers=headers)
+    return Response(body, media_type='application/json', headers={'Cache-Control': 'private, no-store'})
 
 # ============ AI Chatbot ============
-import httpx
+
+# httpx is only needed for outbound calls (Gemini, certificate signatures), so it is
+# imported on first use and the client is reused to keep upstream connections alive.
+shared_http_client = None
+
+def get_http_client():
+    global shared_http_client
+    if shared_http_client is None:
+        import httpx
+        shared_http_client = httpx.AsyncClient(timeout=30.0)
+    return shared_http_client
 
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 GEMINI_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent'
@@ -822,52 +2887,59 @@ async def chat_with_ai(data: ChatMessage):
         )
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            payload = {
-                "system_instruction": {
-                    "parts": [{"text": SYSTEM_PROMPT}]
-                },
-                "contents": [
-                    {"role": "user", "parts": [{"text": data.message}]}
-                ],
-                "generationConfig": {
-                    "temperature": 0.8,
-                    "topK": 40,
-                    "topP": 0.95,
-                    "maxOutputTokens": 1024
-                }
+        http_client = get_http_client()
+        payload = {
+            "system_instruction": {
+                "parts": [{"text": SYSTEM_PROMPT}]
+            },
+            "contents": [
+                {"role": "user", "parts": [{"text": data.message}]}
+            ],
+            "generationConfig": {
+                "temperature": 0.8,
+                "topK": 40,
+                "topP": 0.95,
+                "maxOutputTokens": 1024
             }
-            
-            response = await client.post(
-                f"{GEMINI_URL}?key={api_key}",
-                json=payload
+        }
+        
+        started = time.perf_counter()
+        response = await http_client.post(
+            f"{GEMINI_URL}?key={api_key}",
+            json=payload
+        )
+        elapsed = time.perf_counter() - started
+        GEMINI_LATENCY.labels(str(response.status_code)).observe(elapsed)
+        record_timing('gemini', elapsed)
+        
+        result = response.json()
+        
+        if response.status_code != 200:
+            logger.warning(f"Gemini returned {response.status_code}: {result}")
+        
+        if response.status_code == 429:
+            GEMINI_RATE_LIMITED.inc()
+            return ChatResponse(
+                response="Aduh, aku lagi rame banget nih yang nanya! ⏳ Coba colek lagi 1 menit lagi ya!",
+                session_id=session_id
+            )
+        
+        if "candidates" in result and result["candidates"]:
+            ai_response = result["candidates"][0]["content"]["parts"][0]["text"]
+            return ChatResponse(response=ai_response, session_id=session_id)
+        elif "error" in result:
+            GEMINI_ERRORS.labels('upstream').inc()
+            err_msg = result['error'].get('message', 'Unknown Error')
+            return ChatResponse(
+                response=f"Ups, ada gangguan sinyal ke otak AI-ku. 😅 (Status: {response.status_code})",
+                session_id=session_id
             )
+        else:
+            raise Exception("Format response Gemini tidak dikenal")
             
-            result = response.json()
-            
-            if response.status_code != 200:
-                print(f"DEBUG GEMINI ERROR: Status {response.status_code}, Body: {result}")
-            
-            if response.status_code == 429:
-                return ChatResponse(
-                    response="Aduh, aku lagi rame banget nih yang nanya! ⏳ Coba colek lagi 1 menit lagi ya!",
-                    session_id=session_id
-                )
-            
-            if "candidates" in result and result["candidates"]:
-                ai_response = result["candidates"][0]["content"]["parts"][0]["text"]
-                return ChatResponse(response=ai_response, session_id=session_id)
-            elif "error" in result:
-                err_msg = result['error'].get('message', 'Unknown Error')
-                return ChatResponse(
-                    response=f"Ups, ada gangguan sinyal ke otak AI-ku. 😅 (Status: {response.status_code})",
-                    session_id=session_id
-                )
-            else:
-                raise Exception("Format response Gemini tidak dikenal")
-                
     except Exception as e:
-        print(f"CRITICAL CHAT ERROR: {e}")
+        GEMINI_ERRORS.labels(type(e).__name__).inc()
+        logger.exception("Chat request to Gemini failed")
         return ChatResponse(
             response="Aduh, otak AI-ku lagi konslet. 🔌 Coba tanya lagi bentar lagi ya!",
             session_id=session_id
@@ -902,12 +2974,425 @@ async def get_stats():
         "mentors": 5
     }
 
+# ============ Analytics ============
+
+# One document per (day, metric, course, payment method), incremented as events happen.
+# Admin reports read only these, so they cost the same however much history there is.
+ANALYTICS_METRICS = ('revenue', 'new_users', 'lesson_completions', 'certificates')
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_BACKFILL_BATCH = 1000
+# The backfill runs as a job under this fixed id, so every worker sees the same run
+ANALYTICS_BACKFILL_JOB_ID = 'analytics_backfill'
+
+def rollup_id(day: str, metric: str, course_id: Optional[str], payment_method: Optional[str]) -> str:
+    return f"{day}|{metric}|{course_id or ''}|{payment_method or ''}"
+
+async def setup_analytics():
+    try:
+        await db.analytics_daily.create_index([('metric', 1), ('day', 1)])
+    except PyMongoError as e:
+        logger.warning(f"Could not create analytics index: {e!r}")
+
+async def record_rollup(metric: str, at: datetime, course_id: Optional[str] = None,
+                        payment_method: Optional[str] = None, amount: float = 0):
+    """Adds one event to its daily rollup. A failure here must not fail the request that caused it."""
+    day = at.astimezone(timezone.utc).date().isoformat()
+    try:
+        await db.analytics_daily.update_one(
+            {'_id': rollup_id(day, metric, course_id, payment_method)},
+            {'$inc': {'count': 1, 'amount': amount},
+             '$setOnInsert': {'day': day, 'metric': metric, 'course_id': course_id, 'payment_method': payment_method}},
+            upsert=True
+        )
+    except PyMongoError as e:
+        logger.warning(f"Analytics rollup {metric} not recorded: {e!r}")
+
+def backfill_pipelines(since: Optional[datetime]) -> list:
+    """(collection, metric, pipeline) triples that group the source collections into rollup rows."""
+    none, zero = {'$literal': None}, {'$literal': 0}
+
+    def pipeline(match, day_field, course_id=none, payment_method=none, amount=zero, prefix=()):
+        stages = [{'$match': match}, *prefix]
+        if since:
+            stages.append({'$match': timestamp_range(day_field, since)})
+        key = {'day': '$day', 'course_id': course_id, 'payment_method': payment_method}
+        return stages + [
+            {'$project': {'day': timestamp_day(day_field), 'course_id': course_id, 'payment_method': payment_method,
+                          'amount': amount}},
+            {'$group': {'_id': key, 'count': {'$sum': 1}, 'amount': {'$sum': '$amount'}}},
+        ]
+
+    return [
+        # Orders paid before paid_at was recorded fall back to their creation day
+        ('orders', 'revenue', pipeline({'status': 'paid'}, 'paid_at', '$course_id', '$payment_method', '$amount',
+                                       prefix=[{'$addFields': {'paid_at': {'$ifNull': ['$paid_at', '$created_at']}}}])),
+        ('users', 'new_users', pipeline({}, 'created_at')),
+        # Completions are dated by the row's last update; rows from before updated_at existed are skipped
+        ('progress', 'lesson_completions', pipeline({'completed': True, 'updated_at': {'$exists': True}},
+                                                    'updated_at', '$course_id')),
+        ('certificates', 'certificates', pipeline({}, 'issued_at', '$course_id')),
+    ]
+
+async def write_rollups(metric: str, rows) -> int:
+    """Replaces the rollup documents for grouped backfill rows. Keys are built here rather than with
+    $concat in the pipeline because course ids are binary UUIDs there."""
+    written, batch = 0, []
+    async for row in rows:
+        key = row['_id']
+        course_id = api_value('course_id', key['course_id'])
+        batch.append(ReplaceOne({'_id': rollup_id(key['day'], metric, course_id, key['payment_method'])}, {
+            'day': key['day'], 'metric': metric, 'course_id': course_id, 'payment_method': key['payment_method'],
+            'count': row['count'], 'amount': row['amount']
+        }, upsert=True))
+        if len(batch) >= ANALYTICS_BACKFILL_BATCH:
+            written += len(batch)
+            await db.analytics_daily.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        written += len(batch)
+        await db.analytics_daily.bulk_write(batch, ordered=False)
+    return written
+
+async def backfill_analytics(since: Optional[datetime] = None, done: tuple = (), report=None):
+    """Recomputes the rollups from `since` (start of a UTC day, or all history) with aggregation pipelines.
+
+    Days in range are replaced wholesale, so run it once after deploying and then only
+    to repair; events recorded while it runs may be overwritten by the recomputed day.
+    Metrics in `done` are skipped and `report(metric)` is awaited after each one, so a
+    resumed job carries on where the last attempt stopped.
+    """
+    for collection, metric, pipeline in backfill_pipelines(since):
+        if metric in done:
+            continue
+        await write_rollups(metric, db[collection].aggregate(pipeline, allowDiskUse=True))
+        if report:
+            await report(metric)
+
+def analytics_range(since: Optional[str], until: Optional[str]) -> tuple:
+    today = datetime.now(timezone.utc).date()
+    try:
+        start = datetime.fromisoformat(since).date() if since else today - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+        end = datetime.fromisoformat(until).date() if until else today
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    return start.isoformat(), end.isoformat()
+
+@api_router.get("/admin/analytics/summary")
+async def get_analytics_summary(since: Optional[str] = None, until: Optional[str] = None,
+                                admin: dict = Depends(get_admin_user)):
+    start, end = analytics_range(since, until)
+    totals = {metric: 0 for metric in ANALYTICS_METRICS}
+    revenue = 0
+    revenue_by_method = {}
+    per_course = {}
+    async for row in db.analytics_daily.find({'day': {'$gte': start, '$lte': end}}):
+        metric = row['metric']
+        totals[metric] = totals.get(metric, 0) + row['count']
+        if metric == 'revenue':
+            revenue += row['amount']
+            method = row['payment_method'] or 'unknown'
+            revenue_by_method[method] = revenue_by_method.get(method, 0) + row['amount']
+        if row['course_id']:
+            course = per_course.setdefault(row['course_id'], {
+                'course_id': row['course_id'], 'paid_orders': 0, 'revenue': 0,
+                'lesson_completions': 0, 'certificates': 0
+            })
+            if metric == 'revenue':
+                course['paid_orders'] += row['count']
+                course['revenue'] += row['amount']
+            else:
+                course[metric] += row['count']
+    titles = {api_value('_id', c['_id']): c['title'] async for c in db.courses.find(
+        {'_id': {'$in': [store_id(course_id) for course_id in per_course]}}, {'title': 1})}
+    for course_id, course in per_course.items():
+        course['title'] = titles.get(course_id)
+    return {
+        'since': start,
+        'until': end,
+        'revenue': revenue,
+        'paid_orders': totals['revenue'],
+        'new_users': totals['new_users'],
+        'lesson_completions': totals['lesson_completions'],
+        'certificates': totals['certificates'],
+        'revenue_by_payment_method': revenue_by_method,
+        'courses': sorted(per_course.values(), key=lambda c: c['revenue'], reverse=True),
+    }
+
+@api_router.get("/admin/analytics/daily")
+async def get_analytics_daily(
+    metric: Literal['revenue', 'new_users', 'lesson_completions', 'certificates'],
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    course_id: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    start, end = analytics_range(since, until)
+    query = {'metric': metric, 'day': {'$gte': start, '$lte': end}}
+    if course_id:
+        query['course_id'] = course_id
+    days = {}
+    async for row in db.analytics_daily.find(query, {'_id': 0, 'day': 1, 'count': 1, 'amount': 1}):
+        day = days.setdefault(row['day'], {'day': row['day'], 'count': 0, 'amount': 0})
+        day['count'] += row['count']
+        day['amount'] += row['amount']
+    return [days[day] for day in sorted(days)]
+
+@api_router.post("/admin/analytics/backfill", status_code=202)
+async def start_analytics_backfill(since: Optional[str] = None, admin: dict = Depends(get_admin_user)):
+    if since:
+        since = analytics_range(since, None)[0]
+    now = utcnow()
+    # A finished run is queued again under the same id; a queued or running one is left alone
+    job = await db.jobs.find_one_and_update(
+        {'_id': ANALYTICS_BACKFILL_JOB_ID, 'status': {'$in': ['done', 'failed']}},
+        {'$set': {'params': {'since': since}, 'status': 'queued', 'attempts': 0, 'progress': None, 'state': None,
+                  'error': None, 'run_after': now, 'created_at': now, 'updated_at': now,
+                  'started_at': None, 'finished_at': None}},
+        projection={'state': 0}, return_document=ReturnDocument.AFTER
+    )
+    if job is not None:
+        job_wakeup.set()
+        return api_document(job)
+    try:
+        return await enqueue_job('analytics_backfill', {'since': since}, job_id=ANALYTICS_BACKFILL_JOB_ID)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Backfill already running")
+
+@api_router.get("/admin/analytics/backfill")
+async def get_analytics_backfill(admin: dict = Depends(get_admin_user)):
+    job = await db.jobs.find_one({'_id': ANALYTICS_BACKFILL_JOB_ID}, {'state': 0})
+    return api_document(job) if job else {'status': 'idle'}
+
+# ============ Recommendations ============
+
+RECOMMENDATIONS_REFRESH_SECONDS = int(os.environ.get('RECOMMENDATIONS_REFRESH_SECONDS', '300'))
+RECOMMENDATIONS_REBUILD_SECONDS = int(os.environ.get('RECOMMENDATIONS_REBUILD_SECONDS', '86400'))
+RECOMMENDATION_COURSE_FIELDS = {'title': 1, 'thumbnail': 1, 'category': 1, 'level': 1, 'price': 1, 'is_free': 1}
+RECOMMENDATION_BUILD_CHUNK = 8192
+
+# numpy is imported where it is used, so worker start-up does not pay for it
+def mask_columns(mask: int) -> 'np.ndarray':
+    import numpy as np
+    return np.array([i for i in range(mask.bit_length()) if mask >> i & 1], dtype=np.intp)
+
+def mask_rows(masks: list, width: int) -> 'np.ndarray':
+    """Unpacks per-user column bitmasks into a dense 0/1 float32 matrix, one row per user."""
+    import numpy as np
+    nbytes = max(1, (width + 7) // 8)
+    packed = np.frombuffer(b''.join(m.to_bytes(nbytes, 'little') for m in masks), dtype=np.uint8)
+    bits = np.unpackbits(packed.reshape(len(masks), nbytes), axis=1, bitorder='little')[:, :width]
+    return bits.astype(np.float32)
+
+class CourseRecommender:
+    """Course-to-course co-occurrence over users' progress and paid orders, held in memory.
+
+    counts[i, j] is the number of users who engaged with both course i and course j, so
+    the diagonal is each course's popularity. Each user is a bitmask over the course
+    columns, which is all that is needed to exclude taken courses and score the rest.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.courses = []
+        # Arrays are allocated by the first set_courses
+        self.active = self.categories = self.levels = self.counts = None
+        self.category_codes = {}
+        self.level_codes = {}
+        self.user_courses = {}
+        self.similarity = None
+        self.watermark = None
+
+    def set_courses(self, courses: list):
+        """Adds columns for new courses and deactivates deleted ones; existing columns keep their index."""
+        import numpy as np
+        if self.counts is None:
+            self.counts = np.zeros((0, 0), dtype=np.uint32)
+        seen = set()
+        for course in courses:
+            column = self.columns.get(course['id'])
+            if column is None:
+                column = self.columns[course['id']] = len(self.courses)
+                self.courses.append(course)
+            else:
+                self.courses[column] = course
+            seen.add(column)
+        width = len(self.courses)
+        if width > self.counts.shape[0]:
+            grown = np.zeros((width, width), dtype=np.uint32)
+            grown[:self.counts.shape[0], :self.counts.shape[1]] = self.counts
+            self.counts = grown
+        self.active = np.zeros(width, dtype=bool)
+        self.active[list(seen)] = True
+        self.category_codes, self.level_codes = {}, {}
+        self.categories = np.array([self.category_codes.setdefault(c.get('category'), len(self.category_codes))
+                                    for c in self.courses], dtype=np.int32)
+        self.levels = np.array([self.level_codes.setdefault(c.get('level'), len(self.level_codes))
+                                for c in self.courses], dtype=np.int32)
+        self.similarity = None
+
+    @classmethod
+    def build(cls, courses: list, user_courses: dict) -> 'CourseRecommender':
+        """Full rebuild from {user id: set of course ids}; counts come from chunked X.T @ X."""
+        import numpy as np
+        fresh = cls()
+        fresh.set_courses(courses)
+        masks = {}
+        for user_id, course_ids in user_courses.items():
+            mask = 0
+            for course_id in course_ids:
+                column = fresh.columns.get(course_id)
+                if column is not None:
+                    mask |= 1 << column
+            if mask:
+                masks[user_id] = mask
+        width = len(fresh.courses)
+        counts = np.zeros((width, width), dtype=np.float64)
+        values = list(masks.values())
+        for start in range(0, len(values), RECOMMENDATION_BUILD_CHUNK):
+            rows = mask_rows(values[start:start + RECOMMENDATION_BUILD_CHUNK], width)
+            counts += rows.T @ rows
+        fresh.counts = counts.astype(np.uint32)
+        fresh.user_courses = masks
+        return fresh
+
+    def observe(self, user_id: str, course_id: str):
+        """Counts one user/course engagement; repeats are no-ops, so refresh windows may overlap."""
+        column = self.columns.get(course_id)
+        if column is None:
+            return
+        mask = self.user_courses.get(user_id, 0)
+        if mask >> column & 1:
+            return
+        taken = mask_columns(mask)
+        self.counts[column, taken] += 1
+        self.counts[taken, column] += 1
+        self.counts[column, column] += 1
+        self.user_courses[user_id] = mask | 1 << column
+        self.similarity = None
+
+    def similarity_matrix(self) -> 'np.ndarray':
+        import numpy as np
+        if self.similarity is None:
+            popularity = np.diag(self.counts).astype(np.float32)
+            norms = np.sqrt(np.outer(popularity, popularity))
+            similarity = np.divide(self.counts, norms, out=np.zeros(norms.shape, dtype=np.float32), where=norms > 0)
+            np.fill_diagonal(similarity, 0)
+            self.similarity = similarity
+        return self.similarity
+
+    def recommend(self, user_id: Optional[str], limit: int = 5,
+                  category: Optional[str] = None, level: Optional[str] = None) -> list:
+        """Top `limit` courses by cosine co-occurrence with the user's courses.
+
+        Ties, and users with no history, fall back to courses in the requested (or the
+        user's own) categories, then levels, then to overall popularity.
+        """
+        import numpy as np
+        width = len(self.courses)
+        if width == 0:
+            return []
+        taken = mask_columns(self.user_courses.get(user_id, 0)) if user_id else np.zeros(0, dtype=np.intp)
+        scores = self.similarity_matrix()[taken].sum(axis=0) if len(taken) else np.zeros(width, dtype=np.float32)
+
+        def preferred(codes: 'np.ndarray', code_of: dict, value: Optional[str]) -> 'np.ndarray':
+            wanted = codes[taken] if value is None else [code_of.get(value, -1)]
+            return np.isin(codes, wanted)
+
+        same_category = preferred(self.categories, self.category_codes, category)
+        same_level = preferred(self.levels, self.level_codes, level)
+        popularity = np.diag(self.counts)
+        eligible = self.active.copy()
+        eligible[taken] = False
+        order = np.lexsort((popularity, same_level, same_category, scores))[::-1]
+        picked = order[eligible[order]][:limit]
+
+        results = []
+        for column in picked:
+            if scores[column] > 0:
+                reason = 'similar'
+            elif same_category[column]:
+                reason = 'category'
+            elif same_level[column]:
+                reason = 'level'
+            else:
+                reason = 'popular'
+            results.append({**self.courses[column], 'score': round(float(scores[column]), 4), 'reason': reason})
+        return results
+
+recommender = CourseRecommender()
+
+async def engagement_pairs(since: Optional[datetime] = None):
+    """Distinct (user id, course id) pairs from progress rows and paid orders, optionally since a timestamp."""
+    sources = [
+        ('progress', timestamp_range('updated_at', since) if since else {}),
+        ('orders', {'status': 'paid', **(timestamp_range('paid_at', since) if since else {})}),
+    ]
+    for collection, match in sources:
+        pipeline = [{'$match': match}, {'$group': {'_id': {'user_id': '$user_id', 'course_id': '$course_id'}}}]
+        async for row in db[collection].aggregate(pipeline, allowDiskUse=True, batchSize=10_000):
+            yield api_value('user_id', row['_id']['user_id']), api_value('course_id', row['_id']['course_id'])
+
+async def rebuild_recommendations():
+    global recommender
+    started = utcnow()
+    courses = [api_document(c) for c in await db.courses.find({}, RECOMMENDATION_COURSE_FIELDS).to_list(None)]
+    user_courses = {}
+    async for user_id, course_id in engagement_pairs():
+        user_courses.setdefault(user_id, set()).add(course_id)
+    # Built off the event loop, swapped in on it; anything observed meanwhile is at or after
+    # `started` and is picked up again by the next incremental refresh
+    fresh = await asyncio.to_thread(CourseRecommender.build, courses, user_courses)
+    fresh.watermark = started
+    recommender = fresh
+
+async def refresh_recommendations():
+    started = utcnow()
+    recommender.set_courses([api_document(c) for c in await db.courses.find({}, RECOMMENDATION_COURSE_FIELDS).to_list(None)])
+    async for user_id, course_id in engagement_pairs(recommender.watermark):
+        recommender.observe(user_id, course_id)
+    recommender.watermark = started
+
+recommendation_courses_changed = asyncio.Event()
+invalidation_bus.subscribe(lambda collection: collection == 'courses' and recommendation_courses_changed.set())
+
+async def refresh_recommendations_periodically():
+    """Full rebuild at startup and once per RECOMMENDATIONS_REBUILD_SECONDS (dropping deleted
+    courses and un-done engagements), incremental refreshes in between; a course write from
+    any worker triggers one early."""
+    last_rebuild = None
+    while True:
+        recommendation_courses_changed.clear()
+        try:
+            if last_rebuild is None or time.monotonic() - last_rebuild >= RECOMMENDATIONS_REBUILD_SECONDS:
+                await rebuild_recommendations()
+                last_rebuild = time.monotonic()
+                logger.info(f"Recommendations rebuilt: {len(recommender.courses)} courses, "
+                            f"{len(recommender.user_courses)} users")
+            else:
+                await refresh_recommendations()
+        except PyMongoError as e:
+            logger.warning(f"Recommendation refresh failed: {e!r}")
+        try:
+            await asyncio.wait_for(recommendation_courses_changed.wait(), RECOMMENDATIONS_REFRESH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+@api_router.get("/recommendations")
+async def get_recommendations(
+    limit: int = 5,
+    category: Optional[str] = None,
+    level: Optional[str] = None,
+    user: Optional[dict] = Depends(get_optional_user)
+):
+    with span('recommend'):
+        return recommender.recommend(user['id'] if user else None, min(max(limit, 1), 20), category, level)
+
 # ============ Seed Data ============
 
 @api_router.post("/seed")
 async def seed_data():
     """Seed initial data for the platform"""
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     
     # Seed courses
     # Course IDs
@@ -974,11 +3459,11 @@ async def seed_data():
     ])
 
     await db.courses.delete_many({})
-    await db.courses.insert_many(courses)
+    await db.courses.insert_many([stored_document(c) for c in courses])
     
     await db.videos.delete_many({})
     if videos:
-        await db.videos.insert_many(videos)
+        await db.videos.insert_many([stored_document(v) for v in videos])
     
     # Seed articles
     articles = [
@@ -1033,14 +3518,14 @@ async def seed_data():
         {
             'id': str(uuid.uuid4()), 'title': 'Live Coding: Build Todo App with React',
             'description': 'Belajar membuat aplikasi Todo dari nol menggunakan React.js dan hooks.',
-            'instructor': 'Firza Ilmi', 'scheduled_at': (datetime.now(timezone.utc) + timedelta(days=3)).isoformat(),
+            'instructor': 'Firza Ilmi', 'scheduled_at': now + timedelta(days=3),
             'duration_minutes': 90, 'meeting_url': 'https://meet.google.com/abc-defg-hij',
             'max_participants': 100, 'participants_count': 45, 'created_at': now
         },
         {
             'id': str(uuid.uuid4()), 'title': 'Q&A Session: Karir sebagai Developer',
             'description': 'Sesi tanya jawab seputar persiapan karir, interview, dan tips sukses sebagai developer.',
-            'instructor': 'Firza Ilmi', 'scheduled_at': (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
+            'instructor': 'Firza Ilmi', 'scheduled_at': now + timedelta(days=7),
             'duration_minutes': 60, 'meeting_url': 'https://meet.google.com/xyz-uvwx-rst',
             'max_participants': 200, 'participants_count': 78, 'created_at': now
         }
@@ -1051,12 +3536,16 @@ async def seed_data():
     await db.articles.delete_many({})
     await db.faqs.delete_many({})
     await db.live_classes.delete_many({})
+    for live_class in live_classes:
+        live_class['ends_at'] = live_class_ends_at(live_class)
     
-    await db.courses.insert_many(courses)
-    await db.articles.insert_many(articles)
-    await db.faqs.insert_many(faqs)
-    await db.live_classes.insert_many(live_classes)
+    await db.courses.insert_many([stored_document(c) for c in courses])
+    await db.articles.insert_many([stored_document(a) for a in articles])
+    await db.faqs.insert_many([stored_document(f) for f in faqs])
+    await db.live_classes.insert_many([stored_document(c) for c in live_classes])
+    await rebuild_course_aggregates([store_id(c['id']) for c in courses])
     
+    catalog_cache.clear()
     return {"message": "Seed data created successfully"}
 
 # ============ Certificate Routes ============
@@ -1064,23 +3553,23 @@ async def seed_data():
 @api_router.get("/certificates/{course_id}", response_model=CertificateResponse)
 async def get_certificate(course_id: str, user: dict = Depends(get_current_user)):
     # 1. Check if certificate already exists
-    cert = await db.certificates.find_one({'user_id': user['id'], 'course_id': course_id}, {'_id': 0})
+    owner = stored_document({'user_id': user['id'], 'course_id': course_id})
+    cert = await db.certificates.find_one(owner)
     if cert:
-        return CertificateResponse(**cert)
+        return CertificateResponse(**api_document(cert))
     
     # 2. Check course exists
-    course = await db.courses.find_one({'id': course_id})
+    course = await db.courses.find_one(by_id(course_id))
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
     # 3. Check progress (Verify all videos completed)
-    total_videos = await db.videos.count_documents({'course_id': course_id})
+    total_videos = await course_lesson_count(course)
     if total_videos == 0:
         raise HTTPException(status_code=400, detail="Course curriculum not set up")
         
     completed_videos = await db.progress.count_documents({
-        'user_id': user['id'], 
-        'course_id': course_id,
+        **owner,
         'completed': True
     })
     
@@ -1090,7 +3579,7 @@ async def get_certificate(course_id: str, user: dict = Depends(get_current_user)
     
     # 4. Create Certificate
     cert_id = f"CERT-{uuid.uuid4().hex[:12].upper()}"
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     
     cert_doc = {
         'id': cert_id,
@@ -1102,13 +3591,15 @@ async def get_certificate(course_id: str, user: dict = Depends(get_current_user)
         'is_signed': False,
         'signature_url': None
     }
-    await db.certificates.insert_one(cert_doc)
+    await db.certificates.insert_one(stored_document(cert_doc))
+    await record_rollup('certificates', now, course_id)
+    await record_course_completion(user['id'], course_id, now)
     return CertificateResponse(**cert_doc)
 
 @api_router.get("/admin/certificates", response_model=List[CertificateResponse])
 async def get_all_certificates(admin: dict = Depends(get_admin_user)):
-    certs = await db.certificates.find({}, {'_id': 0}).sort('issued_at', -1).to_list(100)
-    return certs
+    certs = await db.certificates.find({}).sort('issued_at', -1).to_list(100)
+    return model_list_response(CertificateResponse, certs)
 
 @api_router.post("/admin/certificates/{cert_id}/sign")
 async def sign_certificate(cert_id: str, signature_url: Optional[str] = None, admin: dict = Depends(get_admin_user)):
@@ -1117,25 +3608,47 @@ async def sign_certificate(cert_id: str, signature_url: Optional[str] = None, ad
         signature_url = "https://customer-assets.emergentagent.com/job_f18ca982-69d5-4169-9c73-02205ce66a01/artifacts/signature_demo.png"
         
     result = await db.certificates.update_one(
-        {'id': cert_id},
+        by_id(cert_id),
         {'$set': {'is_signed': True, 'signature_url': signature_url}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Certificate not found")
+    invalidate_certificate_render(cert_id)
     return {"message": "Sertifikat berhasil ditandatangani"}
 
+@api_router.get("/admin/cache")
+async def get_cache_status(admin: dict = Depends(get_admin_user)):
+    return {
+        "entries": len(catalog_cache),
+        "ttl_seconds": catalog_cache.ttl,
+        "invalidation_mode": invalidation_bus.mode,
+        "last_invalidation_at": invalidation_bus.last_event_at
+    }
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(limit: int = 50, admin: dict = Depends(get_admin_user)):
+    entries = list(slow_queries.entries)[-limit:]
+    entries.reverse()
+    return {
+        "threshold_ms": slow_queries.threshold_ms,
+        "sample_rate": slow_queries.sample_rate,
+        "entries": entries
+    }
+
 @api_router.get("/dashboard/courses")
 async def get_dashboard_courses(user: dict = Depends(get_current_user)):
     # Fetch courses user is enrolled in.
     # For now, let's assume they have access to all courses if premium, or just show all for demo
-    courses = await db.courses.find({}, {'_id': 0}).to_list(100)
+    courses = [api_document(c) for c in await db.courses.find({}).to_list(100)]
+    user_id = store_id(user['id'])
     
     # Enrich with progress
     for course in courses:
-        total_videos = await db.videos.count_documents({'course_id': course['id']})
+        course_id = store_id(course['id'])
+        total_videos = await course_lesson_count(course)
         completed_videos = await db.progress.count_documents({
-            'user_id': user['id'],
-            'course_id': course['id'],
+            'user_id': user_id,
+            'course_id': course_id,
             'completed': True
         })
         
@@ -1151,8 +3664,1099 @@ async def get_dashboard_courses(user: dict = Depends(get_current_user)):
 
 @api_router.get("/certificates", response_model=List[CertificateResponse])
 async def get_user_certificates(user: dict = Depends(get_current_user)):
-    certs = await db.certificates.find({'user_id': user['id']}, {'_id': 0}).sort('issued_at', -1).to_list(100)
-    return certs
+    certs = await db.certificates.find({'user_id': store_id(user['id'])}).sort('issued_at', -1).to_list(100)
+    return model_list_response(CertificateResponse, certs)
+
+# ============ Certificate Rendering ============
+
+CERT_RENDER_DIR = Path(os.environ.get('CERT_RENDER_DIR', ROOT_DIR / 'rendered_certificates'))
+CERT_RENDER_WORKERS = int(os.environ.get('CERT_RENDER_WORKERS', '2'))
+CERT_RENDER_FORMATS = {'png': 'image/png', 'pdf': 'application/pdf'}
+CERT_PRERENDER_INTERVAL_SECONDS = float(os.environ.get('CERT_PRERENDER_INTERVAL_SECONDS', '60'))
+CERT_PRERENDER_BATCH_SIZE = 50
+
+render_pool = None
+renders_in_flight = {}
+
+def get_render_pool() -> 'ProcessPoolExecutor':
+    """Process pool for Pillow rendering, created lazily in each server worker.
+
+    Children are spawned rather than forked so they don't inherit Motor's threads,
+    and they only import certificate_renderer, never this module.
+    """
+    global render_pool
+    if render_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        render_pool = ProcessPoolExecutor(
+            max_workers=CERT_RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn')
+        )
+    return render_pool
+
+def certificate_digest(cert: dict) -> str:
+    """Content address of a render: everything drawn on the certificate plus the template version."""
+    from certificate_renderer import TEMPLATE_VERSION
+    key = '|'.join(str(api_value(field, cert.get(field))) for field in (
+        'id', 'user_name', 'course_title', 'issued_at', 'is_signed', 'signature_url'
+    ))
+    return hashlib.sha256(f"{TEMPLATE_VERSION}|{key}".encode()).hexdigest()[:32]
+
+def certificate_render_path(cert: dict, fmt: str) -> Path:
+    return CERT_RENDER_DIR / cert['id'] / f"{certificate_digest(cert)}.{fmt}"
+
+def invalidate_certificate_render(cert_id: str):
+    shutil.rmtree(CERT_RENDER_DIR / cert_id, ignore_errors=True)
+
+async def fetch_signature(url: str) -> Optional[bytes]:
+    path = CERT_RENDER_DIR / '_signatures' / hashlib.sha256(url.encode()).hexdigest()
+    if path.exists():
+        return path.read_bytes()
+    try:
+        response = await get_http_client().get(url, follow_redirects=True)
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Could not fetch signature {url}: {e}")
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(response.content)
+    return response.content
+
+async def render_certificate_file(cert: dict, fmt: str, path: Path) -> Path:
+    from certificate_renderer import render_certificate
+    signature = None
+    if cert.get('is_signed') and cert.get('signature_url'):
+        signature = await fetch_signature(cert['signature_url'])
+    with span('render'):
+        data = await asyncio.get_running_loop().run_in_executor(
+            get_render_pool(), render_certificate, cert, signature, fmt
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return path
+
+async def ensure_certificate_rendered(cert: dict, fmt: str = 'png') -> Path:
+    """Returns the cached render for `cert`, rendering it once if needed (concurrent callers share the work)."""
+    path = certificate_render_path(cert, fmt)
+    if path.exists():
+        return path
+    task = renders_in_flight.get(path)
+    if task is None:
+        task = asyncio.ensure_future(render_certificate_file(cert, fmt, path))
+        renders_in_flight[path] = task
+        task.add_done_callback(lambda _: renders_in_flight.pop(path, None))
+    return await task
+
+def ranged_file_response(request: Request, path: Path, media_type: str, etag: str, filename: str) -> Response:
+    """FileResponse with a strong ETag, If-None-Match and single-range requests."""
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'public, max-age=300',
+        'Content-Disposition': f'inline; filename="{filename}"'
+    }
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get('range', '')
+    if_range = request.headers.get('if-range')
+    if range_header.startswith('bytes=') and ',' not in range_header and if_range in (None, etag):
+        size = path.stat().st_size
+        start_text, _, end_text = range_header[6:].strip().partition('-')
+        try:
+            if start_text:
+                start = int(start_text)
+                end = min(int(end_text), size - 1) if end_text else size - 1
+            else:
+                start = max(size - int(end_text), 0)
+                end = size - 1
+        except ValueError:
+            start, end = 0, -1
+        if start > end or start >= size:
+            return Response(status_code=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+        with open(path, 'rb') as f:
+            f.seek(start)
+            chunk = f.read(end - start + 1)
+        return Response(chunk, status_code=206, media_type=media_type, headers={
+            **headers, 'Content-Range': f'bytes {start}-{end}/{size}'
+        })
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+async def prerender_certificates(query: dict) -> int:
+    rendered = 0
+    cursor = db.certificates.find(query).sort('issued_at', 1).batch_size(CERT_PRERENDER_BATCH_SIZE)
+    async for cert in cursor:
+        cert = api_document(cert)
+        try:
+            await ensure_certificate_rendered(cert, 'png')
+            rendered += 1
+        except Exception as e:
+            logger.warning(f"Pre-render of {cert['id']} failed: {e}")
+    return rendered
+
+async def prerender_new_certificates_periodically():
+    """Queues a render of recently issued certificates so the first download is already a cache hit.
+
+    Every worker runs this loop, but the job id is the interval's number: the first worker
+    to queue it wins and the job lease has exactly one worker render each certificate.
+    Each job looks back two intervals, so a pass that misses its slot leaves no gap.
+    """
+    while True:
+        await asyncio.sleep(CERT_PRERENDER_INTERVAL_SECONDS)
+        slot = int(time.time() // CERT_PRERENDER_INTERVAL_SECONDS)
+        since = datetime.fromtimestamp((slot - 2) * CERT_PRERENDER_INTERVAL_SECONDS, timezone.utc)
+        try:
+            if await db.certificates.find_one(timestamp_range('issued_at', since), {'_id': 1}):
+                await enqueue_job('prerender_certificates', {'since': since}, job_id=f"prerender_certificates:{slot}")
+        except DuplicateKeyError:
+            pass
+        except PyMongoError as e:
+            logger.warning(f"Certificate pre-render not queued: {e!r}")
+
+@api_router.get("/certificates/{cert_id}/download")
+async def download_certificate(cert_id: str, request: Request, format: Literal['png', 'pdf'] = 'png',
+                               user: dict = Depends(get_current_user)):
+    cert = api_document(await db.certificates.find_one(by_id(cert_id)))
+    # Only the holder and admins; anyone else gets the same answer as for a missing certificate
+    if not cert or not (user.get('is_admin') or cert['user_id'] == user['id']):
+        raise HTTPException(status_code=404, detail="Certificate not found")
+    path = await ensure_certificate_rendered(cert, format)
+    return ranged_file_response(
+        request, path, CERT_RENDER_FORMATS[format],
+        etag=f'"{path.stem}"', filename=f"{cert_id}.{format}"
+    )
+
+@api_router.post("/admin/certificates/prerender")
+async def prerender_all_certificates(admin: dict = Depends(get_admin_user)):
+    rendered = await prerender_certificates({})
+    return {"message": "Pre-render selesai", "rendered": rendered}
+
+# ============ Admin Exports ============
+
+class ExportSpec(NamedTuple):
+    collection: str
+    fields: tuple
+    date_field: Optional[str]
+
+# Passwords and other secrets are never exportable: only listed fields can be projected
+EXPORTS = {
+    'users': ExportSpec('users', ('id', 'email', 'name', 'phone', 'is_premium', 'created_at'), 'created_at'),
+    'orders': ExportSpec('orders', ('id', 'user_id', 'course_id', 'amount', 'status', 'payment_method',
+                                    'va_number', 'course_deleted', 'created_at'), 'created_at'),
+    'progress': ExportSpec('progress', ('user_id', 'course_id', 'video_id', 'completed', 'progress_percent',
+                                        'updated_at'), 'updated_at'),
+    'certificates': ExportSpec('certificates', ('id', 'user_id', 'user_name', 'course_id', 'course_title',
+                                                'issued_at', 'is_signed', 'signature_url'), 'issued_at'),
+    'contact_messages': ExportSpec('contact_messages', ('id', 'name', 'email', 'subject', 'message', 'read',
+                                                        'created_at'), 'created_at'),
+}
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def export_fields(spec: ExportSpec, fields: Optional[str]) -> tuple:
+    if not fields:
+        return spec.fields
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+    unknown = [f for f in requested if f not in spec.fields]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown export fields: {', '.join(unknown) or fields}")
+    return requested
+
+def export_date_bound(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date")
+
+def csv_cell(field: str, value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return api_value(field, value)
+
+async def export_rows(cursor, fields: tuple, format: str):
+    """Yields the cursor as NDJSON or CSV in ~64 KiB chunks, holding one batch at a time."""
+    import csv
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n') if format == 'csv' else None
+    if writer:
+        writer.writerow(fields)
+    columns = [(f, '_id' if f == 'id' else f) for f in fields]
+    try:
+        async for doc in cursor:
+            if writer:
+                writer.writerow([csv_cell(f, doc.get(stored)) for f, stored in columns])
+            else:
+                buffer.write(json.dumps({f: api_value(f, doc.get(stored)) for f, stored in columns},
+                                        ensure_ascii=False, default=str))
+                buffer.write('\n')
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    finally:
+        # Also runs when the client disconnects mid-export, so the server cursor is not left open
+        await cursor.close()
+
+@api_router.get("/admin/export/{dataset}")
+async def export_dataset(
+    dataset: Literal['users', 'orders', 'progress', 'certificates', 'contact_messages'],
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+    fields: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    spec = EXPORTS[dataset]
+    selected = export_fields(spec, fields)
+    since, until = export_date_bound(since, 'since'), export_date_bound(until, 'until')
+    query = timestamp_range(spec.date_field, since, until) if since or until else {}
+
+    # No sort: natural order streams straight off the collection without an in-memory sort stage
+    projection = {'_id': int('id' in selected), **{f: 1 for f in selected if f != 'id'}}
+    cursor = db[spec.collection].find(query, projection, batch_size=EXPORT_BATCH_SIZE)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    return StreamingResponse(
+        export_rows(cursor, selected, format),
+        media_type='text/csv; charset=utf-8' if format == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{dataset}-{stamp}.{format}"'}
+    )
+
+# ============ Background Jobs ============
+
+# Durable queue in the `jobs` collection for work too large for a request: cascading
+# deletes, index builds, data migrations. Every server process runs JOB_WORKERS workers
+# that claim jobs under a lease and keep renewing it while the job runs, so a job whose
+# process died is claimed again once its lease lapses and resumes from its last
+# checkpoint. Handlers work in bounded batches and must be safe to re-run from a checkpoint.
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '5'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_SECONDS = 10
+JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', '500'))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '30'))
+
+JOB_HANDLERS = {}
+job_wakeup = asyncio.Event()
+job_worker_tasks = []
+
+class JobLeaseLost(Exception):
+    """Another worker took the job over after this one's lease lapsed."""
+
+class Job:
+    """A claimed job as its handler sees it."""
+
+    def __init__(self, doc: dict, worker_id: str):
+        self.id = doc['_id']
+        self.type = doc['type']
+        self.params = doc.get('params') or {}
+        self.state = doc.get('state') or {}
+        self.attempts = doc['attempts']
+        self.max_attempts = doc['max_attempts']
+        self.worker_id = worker_id
+
+    def owned(self) -> dict:
+        return {'_id': self.id, 'lease_owner': self.worker_id}
+
+    async def renew_lease(self) -> bool:
+        now = utcnow()
+        result = await db.jobs.update_one(self.owned(), {'$set': {
+            'lease_until': now + timedelta(seconds=JOB_LEASE_SECONDS), 'updated_at': now
+        }})
+        return result.matched_count == 1
+
+    async def checkpoint(self, state: dict, done: int, total: Optional[int] = None):
+        """Records progress and the state to resume from; call after every batch."""
+        result = await db.jobs.update_one(self.owned(), {'$set': {
+            'state': state, 'progress': {'done': done, 'total': total}, 'updated_at': utcnow()
+        }})
+        if result.matched_count == 0:
+            raise JobLeaseLost(f"Job {api_value('_id', self.id)} was taken over")
+        self.state = state
+
+def job_handler(job_type: str):
+    def register(handler):
+        JOB_HANDLERS[job_type] = handler
+        return handler
+    return register
+
+async def setup_jobs():
+    try:
+        await db.jobs.create_index([('status', 1), ('run_after', 1)])
+        await db.jobs.create_index([('created_at', -1)])
+        # Finished jobs are kept for the admin view, then expire
+        await db.jobs.create_index('finished_at', expireAfterSeconds=JOB_RETENTION_DAYS * 86400)
+    except PyMongoError as e:
+        logger.warning(f"Could not create job indexes: {e!r}")
+
+async def enqueue_job(job_type: str, params: Optional[dict] = None, max_attempts: int = JOB_MAX_ATTEMPTS,
+                      job_id: Optional[str] = None) -> dict:
+    """Queues a job. A fixed `job_id` makes it a one-off: queueing it again raises DuplicateKeyError."""
+    now = utcnow()
+    job = {
+        '_id': job_id or new_id(), 'type': job_type, 'params': params or {}, 'status': 'queued',
+        'attempts': 0, 'max_attempts': max_attempts, 'progress': None, 'state': None, 'error': None,
+        'lease_owner': None, 'lease_until': None, 'run_after': now,
+        'created_at': now, 'updated_at': now, 'started_at': None, 'finished_at': None
+    }
+    await db.jobs.insert_one(job)
+    job_wakeup.set()
+    return api_document(job)
+
+async def claim_job(worker_id: str) -> Optional[dict]:
+    """Oldest runnable job: queued, or running under a lease that lapsed (its worker is gone)."""
+    now = utcnow()
+    return await db.jobs.find_one_and_update(
+        {'status': {'$in': ['queued', 'running']}, 'run_after': {'$lte': now},
+         '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]},
+        {'$set': {'status': 'running', 'lease_owner': worker_id,
+                  'lease_until': now + timedelta(seconds=JOB_LEASE_SECONDS), 'started_at': now, 'updated_at': now},
+         '$inc': {'attempts': 1}},
+        sort=[('run_after', 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def finish_job(job: Job, **fields):
+    await db.jobs.update_one(job.owned(), {'$set': {
+        'lease_owner': None, 'lease_until': None, 'updated_at': utcnow(), **fields
+    }})
+
+async def run_job(job: Job):
+    if job.attempts > job.max_attempts:
+        # Every attempt so far was cut off by its process dying; the job itself is the likely cause
+        await finish_job(job, status='failed', error='Interrupted on every attempt', finished_at=utcnow())
+        return
+    handler = JOB_HANDLERS.get(job.type)
+    work = asyncio.create_task(handler(job)) if handler else None
+    try:
+        if work is None:
+            raise ValueError(f"Unknown job type {job.type!r}")
+        while not work.done():
+            await asyncio.wait({work}, timeout=JOB_LEASE_SECONDS / 3)
+            if not work.done() and not await job.renew_lease():
+                work.cancel()
+                raise JobLeaseLost(f"Job {api_value('_id', job.id)} was taken over")
+        work.result()
+    except JobLeaseLost as e:
+        logger.warning(str(e))
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back so the next process resumes it without waiting out the lease
+        if work is not None:
+            work.cancel()
+        await db.jobs.update_one(job.owned(), {'$set': {'status': 'queued', 'lease_owner': None, 'lease_until': None},
+                                               '$inc': {'attempts': -1}})
+        raise
+    except Exception as e:
+        retry = job.attempts < job.max_attempts
+        logger.warning(f"Job {job.type} {api_value('_id', job.id)} attempt {job.attempts} failed: {e!r}")
+        now = utcnow()
+        await finish_job(job, status='queued' if retry else 'failed', error=repr(e),
+                         run_after=now + timedelta(seconds=JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)),
+                         finished_at=None if retry else now)
+    else:
+        await finish_job(job, status='done', error=None, finished_at=utcnow())
+
+async def job_worker(worker_id: str):
+    while True:
+        try:
+            doc = await claim_job(worker_id)
+            if doc is not None:
+                await run_job(Job(doc, worker_id))
+                continue
+        except PyMongoError as e:
+            logger.warning(f"Job worker {worker_id}: {e!r}")
+        job_wakeup.clear()
+        try:
+            await asyncio.wait_for(job_wakeup.wait(), JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+def start_job_workers():
+    prefix = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    job_worker_tasks.extend(asyncio.create_task(job_worker(f"{prefix}:{i}")) for i in range(JOB_WORKERS))
+
+async def stop_job_workers():
+    for task in job_worker_tasks:
+        task.cancel()
+    await asyncio.gather(*job_worker_tasks, return_exceptions=True)
+    job_worker_tasks.clear()
+
+COURSE_CASCADE = ('videos', 'quizzes', 'quiz_submissions', 'progress', 'certificates', 'leaderboard_stats')
+
+@job_handler('delete_course')
+async def delete_course_cascade(job: Job):
+    """Deletes what references a deleted course, one bounded batch at a time.
+
+    Orders are revenue and purchase history, so they are kept and flagged `course_deleted` instead.
+    """
+    course_id = store_id(job.params['course_id'])
+    if await db.courses.find_one({'_id': course_id}, {'_id': 1}):
+        # Queued before the course itself is deleted: retried with backoff, and failed (deleting
+        # nothing) if the course delete never happened
+        raise RuntimeError(f"Course {job.params['course_id']} still exists")
+    deleted = dict(job.state.get('deleted', {}))
+    for name in COURSE_CASCADE:
+        collection = db[name]
+        while True:
+            batch = await collection.find({'course_id': course_id}, {'_id': 1}).limit(JOB_BATCH_SIZE).to_list(None)
+            if not batch:
+                break
+            ids = [doc['_id'] for doc in batch]
+            result = await collection.delete_many({'_id': {'$in': ids}})
+            if name == 'certificates':
+                for cert_id in ids:
+                    invalidate_certificate_render(api_value('_id', cert_id))
+            deleted[name] = deleted.get(name, 0) + result.deleted_count
+            await job.checkpoint({'deleted': deleted}, sum(deleted.values()))
+        if name == 'videos':
+            catalog_cache.invalidate('videos')
+    flagged = job.state.get('flagged_orders', 0)
+    while True:
+        batch = await db.orders.find({'course_id': course_id, 'course_deleted': {'$ne': True}},
+                                     {'_id': 1}).limit(JOB_BATCH_SIZE).to_list(None)
+        if not batch:
+            break
+        result = await db.orders.update_many({'_id': {'$in': [doc['_id'] for doc in batch]}},
+                                             {'$set': {'course_deleted': True}})
+        flagged += result.modified_count
+        await job.checkpoint({'deleted': deleted, 'flagged_orders': flagged}, sum(deleted.values()) + flagged)
+
+# Indexes behind the per-user, per-course and cascade queries above. Building one that
+# already exists is a no-op, so the job can simply be run again after adding an entry.
+APP_INDEXES = (
+    ('videos', [('course_id', 1), ('order', 1)]),
+    ('progress', [('user_id', 1), ('course_id', 1), ('video_id', 1)]),
+    ('progress', [('course_id', 1)]),
+    ('certificates', [('user_id', 1), ('course_id', 1)]),
+    ('certificates', [('course_id', 1)]),
+    ('orders', [('user_id', 1)]),
+    ('orders', [('course_id', 1)]),
+    ('quizzes', [('course_id', 1)]),
+    ('quiz_submissions', [('video_id', 1), ('version', 1), ('submitted_at', 1)]),
+    ('quiz_submissions', [('course_id', 1)]),
+    ('leaderboard_stats', [('updated_at', 1)]),
+    ('leaderboard_stats', [('course_id', 1)]),
+)
+
+@job_handler('reindex')
+async def reindex(job: Job):
+    for i in range(job.state.get('next', 0), len(APP_INDEXES)):
+        name, keys = APP_INDEXES[i]
+        await db[name].create_index(keys)
+        await job.checkpoint({'next': i + 1}, i + 1, len(APP_INDEXES))
+
+@job_handler('migrate_timestamps')
+async def migrate_timestamps_job(job: Job):
+    """migrate_timestamps.py run off the request path; it checkpoints in `migrations` itself."""
+    import migrate_timestamps
+    converted = 0
+
+    async def report(name: str, count: int, seconds: float):
+        nonlocal converted
+        converted += count
+        done = migrate_timestamps.COLLECTIONS.index(name) + 1
+        await job.checkpoint({'converted': converted}, done, len(migrate_timestamps.COLLECTIONS))
+
+    await migrate_timestamps.migrate(db, report)
+
+@job_handler('course_aggregates')
+async def check_course_aggregates(job: Job):
+    """Consistency check: recomputes every course's curriculum totals and fixes the ones that drifted."""
+    last_id, checked, fixed = job.state.get('last_id'), job.state.get('checked', 0), job.state.get('fixed', 0)
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+        batch = await db.courses.find(query, {'_id': 1}).sort('_id', 1).limit(JOB_BATCH_SIZE).to_list(None)
+        if not batch:
+            break
+        fixed += await rebuild_course_aggregates([course['_id'] for course in batch])
+        checked += len(batch)
+        last_id = batch[-1]['_id']
+        await job.checkpoint({'last_id': last_id, 'checked': checked, 'fixed': fixed}, checked)
+    if fixed:
+        logger.warning(f"Course aggregates: fixed {fixed} of {checked} courses")
+
+@job_handler('prerender_certificates')
+async def prerender_certificates_job(job: Job):
+    rendered = await prerender_certificates(timestamp_range('issued_at', parse_timestamp(job.params['since'])))
+    await job.checkpoint({}, rendered)
+
+@job_handler('analytics_backfill')
+async def analytics_backfill_job(job: Job):
+    since = job.params.get('since')
+    done = list(job.state.get('metrics', []))
+
+    async def report(metric: str):
+        done.append(metric)
+        await job.checkpoint({'metrics': done}, len(done), len(ANALYTICS_METRICS))
+
+    start = datetime.fromisoformat(since).replace(tzinfo=timezone.utc) if since else None
+    await backfill_analytics(start, tuple(done), report)
+
+ADMIN_JOB_TYPES = ('reindex', 'migrate_timestamps', 'course_aggregates', 'leaderboards')
+
+async def find_job(job_id: str) -> dict:
+    job = await db.jobs.find_one(by_id(job_id), {'state': 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return api_document(job)
+
+@api_router.get("/admin/jobs")
+async def list_jobs(
+    status: Optional[Literal['queued', 'running', 'done', 'failed']] = None,
+    type: Optional[str] = None,
+    limit: int = 50,
+    admin: dict = Depends(get_admin_user)
+):
+    query = {key: value for key, value in (('status', status), ('type', type)) if value}
+    jobs = await db.jobs.find(query, {'state': 0}).sort('created_at', -1).limit(min(max(limit, 1), 200)).to_list(None)
+    return [api_document(job) for job in jobs]
+
+@api_router.get("/admin/jobs/{job_id}")
+async def get_job(job_id: str, admin: dict = Depends(get_admin_user)):
+    return await find_job(job_id)
+
+@api_router.post("/admin/jobs/{job_type}", status_code=202)
+async def start_job(job_type: Literal[ADMIN_JOB_TYPES], admin: dict = Depends(get_admin_user)):
+    return await enqueue_job(job_type)
+
+@api_router.post("/admin/jobs/{job_id}/retry", status_code=202)
+async def retry_job(job_id: str, admin: dict = Depends(get_admin_user)):
+    result = await db.jobs.update_one(
+        {**by_id(job_id), 'status': 'failed'},
+        {'$set': {'status': 'queued', 'attempts': 0, 'error': None, 'run_after': utcnow(), 'finished_at': None}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Only failed jobs can be retried")
+    job_wakeup.set()
+    return await find_job(job_id)
+
+# ============ Notifications ============
+
+# Notifications are written to the `outbox` collection together with the business write
+# that causes them, so handlers never wait on SMTP or webhooks and nothing is lost if the
+# process dies after the write. Dispatchers in every process claim due entries in batches
+# under a lease, send them (email over one SMTP connection per batch, webhooks
+# concurrently) and retry failures with backoff. An entry's _id is its dedup key:
+# queueing the same notification twice is a no-op. Delivery is at least once; the key is
+# also sent as Message-ID / Idempotency-Key so receivers can drop a repeat.
+SMTP_HOST = os.environ.get('SMTP_HOST')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_USER = os.environ.get('SMTP_USER')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true'
+SMTP_FROM = os.environ.get('SMTP_FROM', 'Mavecode <no-reply@mavecode.id>')
+SMTP_TIMEOUT_SECONDS = 30
+NOTIFY_ADMIN_EMAIL = os.environ.get('NOTIFY_ADMIN_EMAIL')
+NOTIFY_WEBHOOK_URL = os.environ.get('NOTIFY_WEBHOOK_URL')
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '100'))
+OUTBOX_POLL_SECONDS = float(os.environ.get('OUTBOX_POLL_SECONDS', '5'))
+OUTBOX_LEASE_SECONDS = 120
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETENTION_DAYS = int(os.environ.get('OUTBOX_RETENTION_DAYS', '14'))
+REMINDER_LEAD_MINUTES = int(os.environ.get('REMINDER_LEAD_MINUTES', '60'))
+REMINDER_SCAN_SECONDS = float(os.environ.get('REMINDER_SCAN_SECONDS', '60'))
+
+mongo_transactions = False
+outbox_wakeup = asyncio.Event()
+
+async def setup_outbox():
+    global mongo_transactions
+    try:
+        hello = await client.admin.command('hello')
+        # Multi-document transactions need a replica set or a sharded cluster (Atlas is either)
+        mongo_transactions = 'setName' in hello or hello.get('msg') == 'isdbgrid'
+    except PyMongoError:
+        mongo_transactions = False
+    if not mongo_transactions:
+        logger.warning("Mongo has no transactions here; outbox entries are written right after their business write")
+    try:
+        await db.outbox.create_index([('status', 1), ('next_attempt_at', 1)])
+        await db.outbox.create_index('sent_at', expireAfterSeconds=OUTBOX_RETENTION_DAYS * 86400)
+    except PyMongoError as e:
+        logger.warning(f"Could not create outbox indexes: {e!r}")
+
+def email_notification(key: str, event: str, to: str, subject: str, body: str, **extra) -> dict:
+    return {'_id': key, 'event': event, 'channel': 'email', 'to': to, 'subject': subject, 'body': body, **extra}
+
+def webhook_notification(key: str, event: str, data: dict) -> dict:
+    return {'_id': key, 'event': event, 'channel': 'webhook', 'to': NOTIFY_WEBHOOK_URL,
+            'payload': {'event': event, 'data': data}}
+
+async def queue_notifications(entries: list, session=None):
+    if not entries:
+        return
+    now = utcnow()
+    await db.outbox.bulk_write([
+        UpdateOne({'_id': entry['_id']}, {'$setOnInsert': {
+            **entry, 'status': 'pending', 'attempts': 0, 'next_attempt_at': now, 'lease_owner': None,
+            'lease_until': None, 'error': None, 'created_at': now, 'sent_at': None
+        }}, upsert=True) for entry in entries
+    ], ordered=False, session=session)
+
+async def write_with_outbox(write, entries: list):
+    """Awaits `write(session)` and queues `entries` in one transaction where Mongo supports it.
+
+    The transaction is retried on TransientTransactionError (and its commit on
+    UnknownTransactionCommitResult), so `write` may run more than once. Without
+    transactions (a standalone server) the entries are queued right after the write.
+    """
+    if mongo_transactions:
+        async def transaction(session):
+            written = await write(session)
+            await queue_notifications(entries, session)
+            return written
+
+        async with await client.start_session() as session:
+            result = await session.with_transaction(transaction)
+    else:
+        result = await write(None)
+        await queue_notifications(entries)
+    if entries:
+        outbox_wakeup.set()
+    return result
+
+def header_value(value) -> str:
+    # A CR or LF (from a contact subject, say) would make EmailMessage reject the header
+    return ' '.join(str(value).splitlines())
+
+def send_emails(entries: list) -> list:
+    """Sends `entries` over one SMTP connection; returns an error (or None) per entry. Runs in a thread.
+
+    An entry that cannot be built or sent only fails itself; the rest of the batch still goes out.
+    """
+    import smtplib
+    from email.message import EmailMessage
+    errors = []
+    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS) as smtp:
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USER:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        for entry in entries:
+            try:
+                message = EmailMessage()
+                message['From'] = SMTP_FROM
+                message['To'] = header_value(entry['to'])
+                message['Subject'] = header_value(entry['subject'])
+                message['Message-ID'] = f"<{entry['_id']}@mavecode.id>"
+                if entry.get('reply_to'):
+                    message['Reply-To'] = header_value(entry['reply_to'])
+                message.set_content(entry['body'])
+                smtp.send_message(message)
+                errors.append(None)
+            except Exception as e:
+                errors.append(repr(e))
+    return errors
+
+async def send_webhook(entry: dict) -> Optional[str]:
+    try:
+        response = await get_http_client().post(entry['to'], json=entry['payload'],
+                                                headers={'Idempotency-Key': entry['_id']})
+        response.raise_for_status()
+    except Exception as e:
+        return repr(e)
+    return None
+
+async def claim_outbox_batch() -> list:
+    now = utcnow()
+    due = {'status': 'pending', 'next_attempt_at': {'$lte': now},
+           '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]}
+    candidates = await db.outbox.find(due, {'_id': 1}).sort('next_attempt_at', 1).limit(OUTBOX_BATCH_SIZE).to_list(None)
+    if not candidates:
+        return []
+    # Entries another dispatcher claimed in between no longer match `due` and are left to it
+    token = uuid.uuid4().hex
+    await db.outbox.update_many(
+        {**due, '_id': {'$in': [doc['_id'] for doc in candidates]}},
+        {'$set': {'lease_owner': token, 'lease_until': now + timedelta(seconds=OUTBOX_LEASE_SECONDS)}}
+    )
+    return await db.outbox.find({'lease_owner': token}).to_list(None)
+
+async def dispatch_outbox_batch() -> int:
+    """Sends one claimed batch and records each entry's outcome; returns the batch size."""
+    entries = await claim_outbox_batch()
+    if not entries:
+        return 0
+    emails = [entry for entry in entries if entry['channel'] == 'email']
+    webhooks = [entry for entry in entries if entry['channel'] == 'webhook']
+    errors = {}
+    if emails:
+        try:
+            errors.update(zip((entry['_id'] for entry in emails), await asyncio.to_thread(send_emails, emails)))
+        except Exception as e:  # connection, STARTTLS or login: the whole batch is retried
+            errors.update((entry['_id'], repr(e)) for entry in emails)
+    if webhooks:
+        errors.update(zip((entry['_id'] for entry in webhooks),
+                          await asyncio.gather(*(send_webhook(entry) for entry in webhooks))))
+
+    now = utcnow()
+    outcomes = []
+    for entry in entries:
+        error = errors.get(entry['_id'])
+        if error is None:
+            update = {'status': 'sent', 'sent_at': now, 'error': None}
+        else:
+            attempts = entry['attempts'] + 1
+            update = {'status': 'pending' if attempts < OUTBOX_MAX_ATTEMPTS else 'failed', 'attempts': attempts,
+                      'error': error, 'next_attempt_at': now + timedelta(seconds=OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))}
+            logger.warning(f"Notification {entry['_id']} attempt {attempts} failed: {error}")
+        outcomes.append(UpdateOne({'_id': entry['_id'], 'lease_owner': entry['lease_owner']},
+                                  {'$set': {**update, 'lease_owner': None, 'lease_until': None}}))
+    await db.outbox.bulk_write(outcomes, ordered=False)
+    return len(entries)
+
+async def dispatch_outbox_forever():
+    while True:
+        try:
+            if await dispatch_outbox_batch():
+                continue
+        except PyMongoError as e:
+            logger.warning(f"Outbox dispatch failed: {e!r}")
+        except Exception:
+            # Claimed entries are retried once their lease lapses; the dispatcher must keep running
+            logger.exception("Outbox dispatch failed")
+        outbox_wakeup.clear()
+        try:
+            await asyncio.wait_for(outbox_wakeup.wait(), OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+async def queue_live_class_reminders() -> int:
+    """Queues reminders for classes starting within REMINDER_LEAD_MINUTES that have none yet."""
+    now = utcnow()
+    due = await db.live_classes.find(
+        {'scheduled_at': {'$gt': now, '$lte': now + timedelta(minutes=REMINDER_LEAD_MINUTES)},
+         'reminders_queued_at': None},
+        {'title': 1, 'scheduled_at': 1, 'meeting_url': 1, 'participant_ids': 1}
+    ).to_list(None)
+    for live_class in due:
+        class_id = api_value('_id', live_class['_id'])
+        starts = format_timestamp(live_class['scheduled_at'], SCHEDULE_TZ)
+        entries = []
+        if SMTP_HOST and live_class.get('participant_ids'):
+            participants = await db.users.find(
+                {'_id': {'$in': live_class['participant_ids']}}, {'email': 1, 'name': 1}
+            ).to_list(None)
+            entries.extend(email_notification(
+                f"reminder:{class_id}:{api_value('_id', user['_id'])}", 'live_class_reminder', user['email'],
+                f"Pengingat: {live_class['title']} segera dimulai",
+                f"Halo {user.get('name', '')},\n\nKelas live \"{live_class['title']}\" dimulai pada {starts}.\n"
+                f"Link: {live_class.get('meeting_url') or '-'}\n"
+            ) for user in participants if user.get('email'))
+        if NOTIFY_WEBHOOK_URL:
+            entries.append(webhook_notification(f"reminder:{class_id}:webhook", 'live_class_reminder', {
+                'id': class_id, 'title': live_class['title'], 'scheduled_at': starts,
+                'meeting_url': live_class.get('meeting_url')
+            }))
+
+        def mark(session, class_id=live_class['_id']):
+            return db.live_classes.update_one({'_id': class_id}, {'$set': {'reminders_queued_at': now}},
+                                              session=session)
+        await write_with_outbox(mark, entries)
+    return len(due)
+
+async def schedule_reminders_periodically():
+    while True:
+        try:
+            await queue_live_class_reminders()
+        except PyMongoError as e:
+            logger.warning(f"Live class reminder scan failed: {e!r}")
+        await asyncio.sleep(REMINDER_SCAN_SECONDS)
+
+@api_router.get("/admin/outbox")
+async def get_outbox(status: Optional[Literal['pending', 'sent', 'failed']] = None, limit: int = 50,
+                     admin: dict = Depends(get_admin_user)):
+    query = {'status': status} if status else {}
+    entries = await db.outbox.find(query).sort('created_at', -1).limit(min(max(limit, 1), 200)).to_list(None)
+    return [api_document(entry) for entry in entries]
+
+# ============ Leaderboards ============
+
+# Global and per-course boards for lessons completed, fastest course completion and
+# longest daily streak. Each board is a sorted list of (sort key, user) plus a score map,
+# so updates, a user's rank and the top N are O(log n) reads of memory. The scores come
+# from one leaderboard_stats document per (user, course) and per user, updated atomically
+# as events happen; every process applies its own updates at once and pulls the other
+# workers' when the invalidation bus reports a write (at least every LEADERBOARD_SYNC_SECONDS,
+# the only trigger without a replica set). The leaderboards job recomputes the documents
+# from progress and certificates and runs by itself the first time the app starts.
+LEADERBOARD_SYNC_SECONDS = float(os.environ.get('LEADERBOARD_SYNC_SECONDS', '30'))
+LEADERBOARD_MAX_LIMIT = 100
+# Metric -> (stats field, smaller is better)
+LEADERBOARD_METRICS = {
+    'lessons': ('lessons', False),
+    'fastest': ('fastest_seconds', True),
+    'streak': ('streak_longest', False),
+}
+
+class Leaderboard:
+    """Scores ranked with a SortedList of (sort key, user id); ties rank by user id, sharing the rank number."""
+
+    def __init__(self, ascending: bool):
+        from sortedcontainers import SortedList
+        self.ascending = ascending
+        self.order = SortedList()
+        self.scores = {}
+
+    def sort_key(self, score):
+        return score if self.ascending else -score
+
+    def set(self, user_id: str, score):
+        """Moves `user_id` to `score`; None (or a zero count) takes them off the board."""
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self.order.remove((self.sort_key(old), user_id))
+        if score:
+            self.scores[user_id] = score
+            self.order.add((self.sort_key(score), user_id))
+
+    def rank(self, user_id: str) -> Optional[int]:
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.order.bisect_left((self.sort_key(score), '')) + 1
+
+    def top(self, n: int) -> list:
+        return [(user_id, self.scores[user_id]) for _, user_id in self.order[:n]]
+
+    def __len__(self):
+        return len(self.scores)
+
+leaderboards = {}
+leaderboard_watermark = None
+
+def leaderboard(metric: str, course_id: Optional[str]) -> Leaderboard:
+    board = leaderboards.get((metric, course_id))
+    if board is None:
+        board = leaderboards[(metric, course_id)] = Leaderboard(LEADERBOARD_METRICS[metric][1])
+    return board
+
+def drop_course_leaderboards(course_id: str):
+    for metric in LEADERBOARD_METRICS:
+        leaderboards.pop((metric, course_id), None)
+
+def leaderboard_key(user_id: str, course_id: Optional[str]) -> str:
+    return f"{user_id}|{course_id or ''}"
+
+def apply_leaderboard_stats(doc: Optional[dict]):
+    if doc is None or doc.get('user_id') is None:
+        return
+    user_id, course_id = api_value('user_id', doc['user_id']), api_value('course_id', doc.get('course_id'))
+    for metric, (field, _) in LEADERBOARD_METRICS.items():
+        leaderboard(metric, course_id).set(user_id, doc.get(field))
+
+def streak_update(user_id: str, course_id: Optional[str], at: datetime) -> list:
+    """Pipeline update for one completed lesson: +1 lesson and the day's effect on the streak."""
+    day = at.date()
+    return [
+        {'$set': {
+            'user_id': {'$literal': store_id(user_id)},
+            'course_id': {'$literal': store_id(course_id)},
+            'lessons': {'$add': [{'$ifNull': ['$lessons', 0]}, 1]},
+            'started_at': {'$ifNull': ['$started_at', at]},
+            'streak_current': {'$switch': {'branches': [
+                {'case': {'$eq': ['$streak_last_day', day.isoformat()]}, 'then': '$streak_current'},
+                {'case': {'$eq': ['$streak_last_day', (day - timedelta(days=1)).isoformat()]},
+                 'then': {'$add': ['$streak_current', 1]}},
+            ], 'default': 1}},
+            'updated_at': at,
+        }},
+        {'$set': {
+            'streak_longest': {'$max': [{'$ifNull': ['$streak_longest', 0]}, '$streak_current']},
+            'streak_last_day': day.isoformat(),
+        }},
+    ]
+
+async def update_leaderboard_stats(user_id: str, course_id: str, update, upsert: bool = True,
+                                   match: Optional[dict] = None):
+    """Applies `update` (a function of the scope's course id) to the user's course and global documents.
+
+    With upsert=False, scopes without a document (or not matching `match`) are left alone.
+    """
+    try:
+        docs = await asyncio.gather(*(
+            db.leaderboard_stats.find_one_and_update(
+                {'_id': leaderboard_key(user_id, scope), **(match or {})}, update(scope),
+                upsert=upsert, return_document=ReturnDocument.AFTER
+            ) for scope in (course_id, None)
+        ))
+    except PyMongoError as e:
+        logger.warning(f"Leaderboard stats for {user_id} not updated: {e!r}")
+        return
+    for doc in docs:
+        apply_leaderboard_stats(doc)
+
+async def record_lesson_completion(user_id: str, course_id: str, completed: bool, now: datetime):
+    """Called on a lesson's transition to (or, with completed=False, back from) completed."""
+    if completed:
+        await update_leaderboard_stats(user_id, course_id, lambda scope: streak_update(user_id, scope, now))
+    else:
+        # A lesson completed before its stats existed (backfill pending, failed write) has nothing to undo
+        await update_leaderboard_stats(
+            user_id, course_id, lambda scope: {'$inc': {'lessons': -1}, '$set': {'updated_at': now}},
+            upsert=False, match={'lessons': {'$gt': 0}}
+        )
+
+async def record_course_completion(user_id: str, course_id: str, now: datetime):
+    """Times the course from its first completed lesson to the certificate."""
+    stats = await db.leaderboard_stats.find_one({'_id': leaderboard_key(user_id, course_id)}, {'started_at': 1})
+    started = parse_timestamp((stats or {}).get('started_at') or now)
+    seconds = max(1, int((now - started).total_seconds()))
+    await update_leaderboard_stats(user_id, course_id, lambda scope: {
+        '$min': {'fastest_seconds': seconds},
+        '$set': {'updated_at': now},
+        '$setOnInsert': {'user_id': store_id(user_id), 'course_id': store_id(scope)},
+    })
+
+async def sync_leaderboards():
+    """Applies stats written since the last pass (by any process); the overlap covers in-flight writes."""
+    global leaderboard_watermark
+    started = utcnow()
+    query = {'updated_at': {'$gte': leaderboard_watermark - timedelta(seconds=5)}} if leaderboard_watermark else {}
+    async for doc in db.leaderboard_stats.find(query, batch_size=10_000):
+        apply_leaderboard_stats(doc)
+    # Deleted stats never show up above, so boards of courses deleted by any worker are dropped here
+    course_ids = {course_id for _, course_id in leaderboards if course_id is not None}
+    if course_ids:
+        existing = await db.courses.distinct('_id', {'_id': {'$in': [store_id(c) for c in course_ids]}})
+        for course_id in course_ids - {api_value('_id', c) for c in existing}:
+            drop_course_leaderboards(course_id)
+    leaderboard_watermark = started
+
+leaderboard_stats_changed = asyncio.Event()
+invalidation_bus.subscribe(lambda collection: collection == 'leaderboard_stats' and leaderboard_stats_changed.set())
+
+async def sync_leaderboards_periodically():
+    """Pulls stats every LEADERBOARD_SYNC_SECONDS, or as soon as the bus reports a write."""
+    try:
+        if not await db.leaderboard_stats.find_one({}, {'_id': 1}) and await db.progress.find_one({'completed': True}):
+            if not await db.jobs.find_one({'type': 'leaderboards', 'status': {'$in': ['queued', 'running']}}):
+                await enqueue_job('leaderboards')
+    except PyMongoError as e:
+        logger.warning(f"Leaderboard bootstrap check failed: {e!r}")
+    while True:
+        leaderboard_stats_changed.clear()
+        try:
+            await sync_leaderboards()
+        except Exception as e:
+            # A bad document must not stop syncing for the life of the worker
+            logger.warning(f"Leaderboard sync failed: {e!r}")
+        try:
+            await asyncio.wait_for(leaderboard_stats_changed.wait(), LEADERBOARD_SYNC_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+def streak_stats(days) -> dict:
+    """Streak fields for a set of YYYY-MM-DD days with a completed lesson."""
+    longest = current = 0
+    previous = None
+    for day in sorted(datetime.fromisoformat(day).date() for day in days):
+        current = current + 1 if previous is not None and (day - previous).days == 1 else 1
+        longest = max(longest, current)
+        previous = day
+    return {'streak_longest': longest, 'streak_current': current,
+            'streak_last_day': previous.isoformat() if previous else None}
+
+def leaderboard_documents(user_id, rows: list, issued: dict, now: datetime) -> list:
+    """Stats documents (course ones, then the global one) for one user's grouped completed progress.
+
+    Timestamps may still be ISO strings while TIMESTAMP_LEGACY_READS is on, so they are parsed first.
+    """
+    docs, all_days, fastest, first_started = [], set(), None, None
+    for row in rows:
+        course_id = row['_id']['course_id']
+        started = parse_timestamp(row['started_at'])
+        first_started = started if first_started is None else min(first_started, started)
+        seconds = None
+        if (user_id, course_id) in issued:
+            seconds = max(1, int((parse_timestamp(issued[(user_id, course_id)]) - started).total_seconds()))
+            fastest = seconds if fastest is None else min(fastest, seconds)
+        all_days.update(row['days'])
+        docs.append({'user_id': user_id, 'course_id': course_id, 'lessons': row['lessons'],
+                     'started_at': started, 'fastest_seconds': seconds,
+                     **streak_stats(row['days']), 'updated_at': now})
+    docs.append({'user_id': user_id, 'course_id': None, 'lessons': sum(row['lessons'] for row in rows),
+                 'started_at': first_started, 'fastest_seconds': fastest,
+                 **streak_stats(all_days), 'updated_at': now})
+    return docs
+
+@job_handler('leaderboards')
+async def rebuild_leaderboards(job: Job):
+    """Recomputes leaderboard_stats from progress and certificates, one user at a time in user id order.
+
+    Lessons are dated by their progress row's last update, so streaks and times are approximate.
+    """
+    issued = {(cert['user_id'], cert['course_id']): cert['issued_at']
+              async for cert in db.certificates.find({}, {'user_id': 1, 'course_id': 1, 'issued_at': 1})}
+    last_user = job.state.get('last_user')
+    match = {'completed': True, 'updated_at': {'$exists': True}}
+    if last_user is not None:
+        match['user_id'] = {'$gt': last_user}
+    pipeline = [
+        {'$match': match},
+        {'$group': {'_id': {'user_id': '$user_id', 'course_id': '$course_id'}, 'lessons': {'$sum': 1},
+                    # $toDate so legacy ISO strings don't win the $min (strings sort before dates)
+                    'started_at': {'$min': {'$toDate': '$updated_at'}}, 'days': {'$addToSet': timestamp_day('updated_at')}}},
+        {'$sort': {'_id.user_id': 1}},
+    ]
+    users, current, rows, batch = job.state.get('users', 0), None, [], []
+
+    async def flush(user_id):
+        nonlocal users, batch
+        for doc in leaderboard_documents(user_id, rows, issued, utcnow()):
+            key = leaderboard_key(api_value('user_id', user_id), api_value('course_id', doc['course_id']))
+            batch.append(ReplaceOne({'_id': key}, doc, upsert=True))
+        users += 1
+        if len(batch) >= JOB_BATCH_SIZE:
+            await db.leaderboard_stats.bulk_write(batch, ordered=False)
+            batch = []
+            await job.checkpoint({'last_user': user_id, 'users': users}, users)
+
+    async for row in db.progress.aggregate(pipeline, allowDiskUse=True):
+        if current is not None and row['_id']['user_id'] != current:
+            await flush(current)
+            rows = []
+        current = row['_id']['user_id']
+        rows.append(row)
+    if current is not None:
+        await flush(current)
+    if batch:
+        await db.leaderboard_stats.bulk_write(batch, ordered=False)
+    await job.checkpoint({'last_user': current, 'users': users}, users)
+
+async def leaderboard_names(user_ids: list) -> dict:
+    users = await db.users.find({'_id': {'$in': [store_id(user_id) for user_id in user_ids]}}, {'name': 1}).to_list(None)
+    return {api_value('_id', user['_id']): user.get('name') for user in users}
+
+@api_router.get("/leaderboards/{metric}")
+async def get_leaderboard(metric: Literal['lessons', 'fastest', 'streak'], course_id: Optional[str] = None,
+                          limit: int = 10):
+    # Reads never create a board, so arbitrary course ids cannot grow the registry
+    board = leaderboards.get((metric, course_id)) or Leaderboard(LEADERBOARD_METRICS[metric][1])
+    top = board.top(min(max(limit, 1), LEADERBOARD_MAX_LIMIT))
+    names = await leaderboard_names([user_id for user_id, _ in top])
+    return {
+        'metric': metric,
+        'course_id': course_id,
+        'total': len(board),
+        'entries': [{'rank': board.rank(user_id), 'user_id': user_id, 'name': names.get(user_id), 'score': score}
+                    for user_id, score in top],
+    }
+
+@api_router.get("/leaderboards/{metric}/me")
+async def get_my_leaderboard_rank(metric: Literal['lessons', 'fastest', 'streak'], course_id: Optional[str] = None,
+                                  user: dict = Depends(get_current_user)):
+    board = leaderboards.get((metric, course_id)) or Leaderboard(LEADERBOARD_METRICS[metric][1])
+    return {'metric': metric, 'course_id': course_id, 'total': len(board),
+            'rank': board.rank(user['id']), 'score': board.scores.get(user['id'])}
 
 # ============ Root ============
 
@@ -1161,16 +4765,94 @@ async def root():
     return {"message": "Mavecode API v1.0", "status": "running"}
 
 # Include router and middleware
+# Added first so CORS wraps it: browsers only see a 429 (and its Retry-After) with CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing", "Retry-After"],
 )
 
-app.include_router(api_router)
+app.add_middleware(CompressionMiddleware)
+
+def incoming_request_id(headers: Headers) -> str:
+    request_id = headers.get('x-request-id', '')
+    if 0 < len(request_id) <= 64 and request_id.replace('-', '').isalnum():
+        return request_id
+    return uuid.uuid4().hex
+
+
+class InstrumentationMiddleware:
+    """Request id, Server-Timing and the HTTP metrics for every request.
+
+    Server-Timing's total is taken when the response starts; the latency histogram
+    covers the whole response, streamed bodies included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        current_request_scope.set(scope)
+        timings = RequestTimings(incoming_request_id(Headers(scope=scope)))
+        current_timings.set(timings)
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status_code = 500
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+        async def send_instrumented(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                timings.add('total', time.perf_counter() - started)
+                headers = MutableHeaders(raw=message['headers'])
+                headers['X-Request-ID'] = timings.request_id
+                headers['Server-Timing'] = timings.header()
+                headers['Timing-Allow-Origin'] = '*'
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumented)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Label by the matched route template so ids in paths don't explode cardinality
+            route = scope.get('route')
+            route_path = route.path if route is not None else 'unmatched'
+            HTTP_REQUESTS.labels(scope['method'], route_path, str(status_code)).inc()
+            HTTP_LATENCY.labels(scope['method'], route_path, str(status_code)).observe(time.perf_counter() - started)
+
+# Added last so it is outermost and times everything, including rate limiting and compression
+app.add_middleware(InstrumentationMiddleware)
+
+# Scrapers either send METRICS_TOKEN as a bearer token or connect from METRICS_ALLOWED_IPS
+# (checked against the direct peer, never X-Forwarded-For). Anyone else gets a 404.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_NETWORKS = ip_networks(os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.0/8,::1'))
+
+def metrics_allowed(request: Request) -> bool:
+    authorization = request.headers.get('authorization', '')
+    if METRICS_TOKEN and authorization.lower().startswith('bearer '):
+        return hmac.compare_digest(authorization[7:].encode(), METRICS_TOKEN.encode())
+    return request.client is not None and in_networks(request.client.host, METRICS_ALLOWED_NETWORKS)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if not metrics_allowed(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Under gunicorn every worker writes its samples to the shared directory;
+        # aggregate them so a scrape sees the whole instance, not one worker.
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+app.include_router(api_router)
@@ -0,0 +1,35 @@
+"""Scratch database for tests that need a real MongoDB at MONGO_URL."""
+
+import pytest
+from pymongo.errors import PyMongoError
+
+import server
+
+
+async def connect_test_db(replica_set: bool = False):
+    """Points `server` at the `<DB_NAME>_test` database on MONGO_URL, or skips the test."""
+    if not server.mongo_url:
+        pytest.skip("MONGO_URL not set")
+    server.connect_mongo()
+    try:
+        hello = await server.client.admin.command('hello')
+    except PyMongoError as e:
+        close_client()
+        pytest.skip(f"MongoDB not reachable: {e!r}")
+    if replica_set and 'setName' not in hello:
+        close_client()
+        pytest.skip("MONGO_URL is not a replica set")
+    name = f"{server.db_name}_test"
+    await server.client.drop_database(name)
+    server.db = server.client[name]
+    return hello
+
+
+async def drop_test_db():
+    await server.client.drop_database(server.db.name)
+    close_client()
+
+
+def close_client():
+    server.client.close()
+    server.client = server.db = None
@@ -0,0 +1,54 @@
+"""Minimal local SMTP server for outbox tests and benchmarks."""
+
+import asyncio
+import email
+import email.policy
+
+
+class SMTPStub:
+    """Accepts every message except those to a `refused` recipient, keeping the parsed messages."""
+
+    def __init__(self, refused=(), keep_messages: bool = True):
+        self.refused = set(refused)
+        self.keep_messages = keep_messages
+        self.received = 0
+        self.messages = []
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.session, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def session(self, reader, writer):
+        writer.write(b'220 stub ESMTP\r\n')
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                writer.write(b'250 stub\r\n')
+            elif command == b'RCPT':
+                recipient = line.split(b':', 1)[1].strip().strip(b'<>').decode()
+                writer.write(b'550 no such user\r\n' if recipient in self.refused else b'250 ok\r\n')
+            elif command == b'DATA':
+                writer.write(b'354 end with .\r\n')
+                await writer.drain()
+                lines = []
+                while (data := await reader.readline()) not in (b'.\r\n', b''):
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                if not data:
+                    # Client went away mid-message
+                    break
+                self.received += 1
+                if self.keep_messages:
+                    self.messages.append(email.message_from_bytes(b''.join(lines), policy=email.policy.default))
+                writer.write(b'250 queued\r\n')
+            elif command == b'QUIT':
+                writer.write(b'221 bye\r\n')
+                break
+            else:
+                writer.write(b'250 ok\r\n')
+            await writer.drain()
+        writer.close()
@@ -0,0 +1,61 @@
+"""Course deletion against MONGO_URL: the cascade job is queued first and leaderboards forget the course.
+
+Everything is written to the `<DB_NAME>_test` database, which is dropped afterwards.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from mongo_test_db import connect_test_db, drop_test_db
+
+ADMIN = {'id': 'admin', 'is_admin': True}
+
+
+def run_with_db(test):
+    async def main():
+        await connect_test_db()
+        try:
+            await test()
+        finally:
+            server.leaderboards.clear()
+            await drop_test_db()
+    asyncio.run(main())
+
+
+def test_deleting_a_course_queues_the_cascade_and_drops_its_leaderboards():
+    async def test():
+        course_id, other_id = str(uuid.uuid4()), str(uuid.uuid4())
+        await server.db.courses.insert_many([server.stored_document({'id': c}) for c in (course_id, other_id)])
+        server.leaderboard('lessons', course_id).set('u1', 3)
+        server.leaderboard('lessons', other_id).set('u1', 2)
+
+        response = await server.delete_course(course_id, ADMIN)
+        job = await server.find_job(response['job_id'])
+        assert job['type'] == 'delete_course' and job['params'] == {'course_id': course_id}
+        assert ('lessons', course_id) not in server.leaderboards
+        assert len(server.leaderboards[('lessons', other_id)]) == 1
+    run_with_db(test)
+
+
+def test_deleting_a_missing_course_leaves_no_job():
+    async def test():
+        with pytest.raises(HTTPException) as error:
+            await server.delete_course(str(uuid.uuid4()), ADMIN)
+        assert error.value.status_code == 404
+        assert await server.db.jobs.count_documents({}) == 0
+    run_with_db(test)
+
+
+def test_other_workers_drop_boards_of_deleted_courses_on_sync():
+    async def test():
+        course_id = str(uuid.uuid4())
+        server.leaderboard('streak', course_id).set('u1', 4)
+        server.leaderboard('streak', None).set('u1', 4)
+        await server.sync_leaderboards()
+        assert ('streak', course_id) not in server.leaderboards
+        assert ('streak', None) in server.leaderboards
+    run_with_db(test)
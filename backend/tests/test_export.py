@@ -0,0 +1,153 @@
+"""Streaming admin exports: field selection, NDJSON/CSV encoding, chunking and cursor cleanup."""
+
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import server
+from mongo_test_db import connect_test_db, drop_test_db
+
+
+class FakeCursor:
+    """Async iteration over `docs`, recording whether close() was awaited."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.closed = False
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for doc in self.docs:
+            yield doc
+
+    async def close(self):
+        self.closed = True
+
+
+def collect(cursor, fields, format):
+    async def main():
+        return [chunk async for chunk in server.export_rows(cursor, fields, format)]
+    return asyncio.run(main())
+
+
+USER_ID = uuid.UUID('7f9c4a52-3d1e-4b8a-9c2f-0e6d5b4a3c21')
+CREATED = datetime(2026, 3, 1, 8, 30, tzinfo=timezone.utc)
+
+
+def order(i: int, **extra) -> dict:
+    return {'_id': server.new_id(), 'user_id': server.Binary.from_uuid(USER_ID), 'amount': 199000 + i,
+            'status': 'paid', 'created_at': CREATED, **extra}
+
+
+def test_export_fields_only_allows_listed_fields():
+    spec = server.EXPORTS['users']
+    assert server.export_fields(spec, None) == spec.fields
+    assert server.export_fields(spec, ' email, name ,email') == ('email', 'name')
+    with pytest.raises(HTTPException) as error:
+        server.export_fields(spec, 'email,password')
+    assert error.value.status_code == 400 and 'password' in error.value.detail
+    with pytest.raises(HTTPException):
+        server.export_fields(spec, ' , ')
+
+
+def test_export_date_bound_rejects_garbage():
+    assert server.export_date_bound(None, 'since') is None
+    assert server.export_date_bound('2026-03-01', 'since') == datetime(2026, 3, 1, tzinfo=timezone.utc)
+    with pytest.raises(HTTPException) as error:
+        server.export_date_bound('kemarin', 'until')
+    assert error.value.status_code == 400
+
+
+def test_ndjson_rows_use_api_forms():
+    doc = order(0)
+    cursor = FakeCursor([doc])
+    body = b''.join(collect(cursor, ('id', 'user_id', 'amount', 'created_at', 'va_number'), 'ndjson'))
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert rows == [{'id': str(doc['_id'].as_uuid()), 'user_id': str(USER_ID), 'amount': 199000,
+                     'created_at': CREATED.isoformat(), 'va_number': None}]
+    assert cursor.closed
+
+
+def test_csv_has_header_and_flattens_values():
+    docs = [order(0, tags=['a', 'b']), order(1, va_number='8812345678')]
+    body = b''.join(collect(FakeCursor(docs), ('user_id', 'amount', 'va_number', 'tags'), 'csv')).decode()
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == ['user_id', 'amount', 'va_number', 'tags']
+    assert rows[1] == [str(USER_ID), '199000', '', '["a", "b"]']
+    assert rows[2] == [str(USER_ID), '199001', '8812345678', '']
+
+
+def test_output_is_streamed_in_bounded_chunks():
+    docs = [order(i, va_number='x' * 200) for i in range(2000)]
+    chunks = collect(FakeCursor(docs), ('id', 'va_number'), 'ndjson')
+    assert len(chunks) > 1
+    # Every chunk but the last is flushed as soon as it reaches the threshold (plus at most one row)
+    for chunk in chunks[:-1]:
+        assert server.EXPORT_CHUNK_BYTES <= len(chunk) < server.EXPORT_CHUNK_BYTES + 512
+    assert len(b''.join(chunks).splitlines()) == len(docs)
+
+
+def test_memory_stays_flat_however_many_rows_are_exported():
+    def peak_kb(rows: int) -> float:
+        cursor = FakeCursor(order(i, va_number='x' * 200) for i in range(rows))
+
+        async def main():
+            async for _ in server.export_rows(cursor, ('id', 'user_id', 'amount', 'created_at', 'va_number'), 'ndjson'):
+                pass
+        tracemalloc.start()
+        try:
+            asyncio.run(main())
+            return tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak_kb(1_000), peak_kb(20_000)
+    # Twenty times the rows may not cost more than a few chunks' worth of extra memory
+    assert large < small + 4 * server.EXPORT_CHUNK_BYTES / 1024
+
+
+def test_cursor_is_closed_when_the_client_disconnects():
+    cursor = FakeCursor([order(i, va_number='x' * 200) for i in range(2000)])
+
+    async def main():
+        rows = server.export_rows(cursor, ('id', 'va_number'), 'ndjson')
+        await rows.__anext__()
+        await rows.aclose()
+    asyncio.run(main())
+    assert cursor.closed
+
+
+def test_export_endpoint_streams_the_selected_range():
+    async def main():
+        await connect_test_db()
+        try:
+            await server.db.orders.insert_many([
+                order(0), order(1, created_at=datetime(2026, 4, 1, tzinfo=timezone.utc))
+            ])
+            token = server.create_token('admin', is_admin=True)
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as http:
+                response = await http.get('/api/admin/export/orders',
+                                          params={'format': 'csv', 'fields': 'amount,created_at',
+                                                  'until': '2026-03-31'},
+                                          headers={'Authorization': f'Bearer {token}'})
+                denied = await http.get('/api/admin/export/orders')
+        finally:
+            await drop_test_db()
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/csv')
+        assert 'attachment; filename="orders-' in response.headers['content-disposition']
+        assert list(csv.reader(io.StringIO(response.text))) == [['amount', 'created_at'],
+                                                               ['199000', CREATED.isoformat()]]
+        assert denied.status_code in (401, 403)
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""CacheInvalidationBus against a real change stream.
+
+Needs MONGO_URL to be a replica set (a single node started with --replSet is enough);
+the tests write only to the `<DB_NAME>_test` database and drop it afterwards.
+"""
+
+import asyncio
+
+import server
+from mongo_test_db import connect_test_db, drop_test_db
+
+
+def cached(cache: server.CatalogCache, *collections: str):
+    for collection in collections:
+        cache.put(f'/api/{collection}?', b'[]', 'application/json', frozenset([collection]))
+
+
+async def wait_until(condition, timeout: float = 10):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting for the change stream"
+        await asyncio.sleep(0.02)
+
+
+async def open_bus(bus: server.CacheInvalidationBus):
+    bus.start()
+    await wait_until(lambda: bus.mode == 'change_stream')
+
+
+def test_remote_write_evicts_only_its_collection():
+    async def main():
+        await connect_test_db(replica_set=True)
+        cache = server.CatalogCache(ttl=600, max_entries=100)
+        bus = server.CacheInvalidationBus(cache, server.CACHE_INVALIDATION_COLLECTIONS)
+        notified = []
+        bus.subscribe(notified.append)
+        try:
+            await open_bus(bus)
+            cached(cache, 'courses', 'faqs')
+            await server.db.courses.insert_one({'title': 'Python Dasar'})
+            await wait_until(lambda: cache.get('/api/courses?') is None)
+            assert cache.get('/api/faqs?') is not None
+            assert notified == ['courses']
+            # Collections outside the bus are not watched
+            await server.db.users.insert_one({'name': 'Budi'})
+            await server.db.faqs.insert_one({'question': 'Apa?'})
+            await wait_until(lambda: cache.get('/api/faqs?') is None)
+            assert notified == ['courses', 'faqs']
+        finally:
+            await bus.stop()
+            await drop_test_db()
+    asyncio.run(main())
+
+
+def test_restart_resumes_after_last_token():
+    async def main():
+        await connect_test_db(replica_set=True)
+        cache = server.CatalogCache(ttl=600, max_entries=100)
+        bus = server.CacheInvalidationBus(cache, server.CACHE_INVALIDATION_COLLECTIONS)
+        notified = []
+        bus.subscribe(notified.append)
+        try:
+            await open_bus(bus)
+            await server.db.courses.insert_one({'title': 'Python Dasar'})
+            await wait_until(lambda: notified == ['courses'])
+            token = bus.resume_token
+            await bus.stop()
+            # Written while this worker was not listening
+            await server.db.videos.insert_one({'title': 'Pengenalan'})
+            cached(cache, 'courses', 'videos')
+            await open_bus(bus)
+            await wait_until(lambda: cache.get('/api/videos?') is None)
+            assert notified == ['courses', 'videos']
+            assert bus.resume_token != token
+            # Resuming replays from the token instead of clearing everything
+            assert cache.get('/api/courses?') is not None
+        finally:
+            await bus.stop()
+            await drop_test_db()
+    asyncio.run(main())
+
+
+def test_per_worker_state_is_told_about_remote_writes():
+    async def main():
+        await connect_test_db(replica_set=True)
+        server.leaderboard_stats_changed.clear()
+        server.recommendation_courses_changed.clear()
+        server.live_class_schedule_changed.clear()
+        server.invalidation_bus.resume_token = None
+        try:
+            await open_bus(server.invalidation_bus)
+            await server.db.leaderboard_stats.insert_one({'_id': 'u|', 'lessons': 1})
+            await wait_until(server.leaderboard_stats_changed.is_set)
+            await server.db.courses.insert_one({'title': 'Python Dasar'})
+            await wait_until(server.recommendation_courses_changed.is_set)
+            await server.db.live_classes.insert_one({'title': 'Live'})
+            await wait_until(server.live_class_schedule_changed.is_set)
+        finally:
+            await server.invalidation_bus.stop()
+            await drop_test_db()
+    asyncio.run(main())
+
+
+def test_without_replica_set_bus_falls_back_to_ttl():
+    async def main():
+        hello = await connect_test_db()
+        if 'setName' in hello:
+            await drop_test_db()
+            return
+        bus = server.CacheInvalidationBus(server.CatalogCache(ttl=600, max_entries=100),
+                                          server.CACHE_INVALIDATION_COLLECTIONS)
+        try:
+            bus.start()
+            await wait_until(lambda: bus.mode == 'ttl' and bus._task.done())
+        finally:
+            await bus.stop()
+            await drop_test_db()
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Outbox claiming and same-transaction writes against MONGO_URL.
+
+Claiming needs any MongoDB; the transaction tests need a replica set. Everything is
+written to the `<DB_NAME>_test` database, which is dropped afterwards.
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from pymongo.errors import OperationFailure
+
+import server
+from mongo_test_db import connect_test_db, drop_test_db
+
+
+def entries(prefix: str, n: int) -> list:
+    return [server.webhook_notification(f"{prefix}:{i}", 'test', {'i': i}) for i in range(n)]
+
+
+def run_with_outbox(test, replica_set: bool = False):
+    async def main():
+        await connect_test_db(replica_set=replica_set)
+        await server.setup_outbox()
+        try:
+            await test()
+        finally:
+            server.mongo_transactions = False
+            await drop_test_db()
+    asyncio.run(main())
+
+
+def test_queueing_the_same_key_twice_is_a_no_op():
+    async def test():
+        await server.queue_notifications(entries('contact', 3))
+        await server.queue_notifications(entries('contact', 3))
+        assert await server.db.outbox.count_documents({}) == 3
+        assert await server.db.outbox.count_documents({'status': 'pending', 'attempts': 0}) == 3
+    run_with_outbox(test)
+
+
+def test_concurrent_dispatchers_claim_disjoint_batches():
+    async def test():
+        server.OUTBOX_BATCH_SIZE, batch_size = 25, server.OUTBOX_BATCH_SIZE
+        try:
+            await server.queue_notifications(entries('contact', 60))
+            batches = await asyncio.gather(*(server.claim_outbox_batch() for _ in range(4)))
+            # Leased entries are not handed out again, so draining claims each of the rest once
+            while batch := await server.claim_outbox_batch():
+                batches.append(batch)
+        finally:
+            server.OUTBOX_BATCH_SIZE = batch_size
+        assert all(len(batch) <= 25 for batch in batches)
+        claimed = sorted(entry['_id'] for batch in batches for entry in batch)
+        assert claimed == sorted(entry['_id'] for entry in entries('contact', 60))
+        # Each batch is held under its own lease token
+        owners = [{entry['lease_owner'] for entry in batch} for batch in batches if batch]
+        assert all(len(owner) == 1 for owner in owners)
+        assert len(set().union(*owners)) == len(owners)
+    run_with_outbox(test)
+
+
+def test_lapsed_lease_is_claimed_again():
+    async def test():
+        await server.queue_notifications(entries('contact', 2))
+        first = await server.claim_outbox_batch()
+        assert len(first) == 2
+        assert await server.claim_outbox_batch() == []
+        # The dispatcher holding the lease died
+        await server.db.outbox.update_many({}, {'$set': {'lease_until': server.utcnow() - timedelta(seconds=1)}})
+        again = await server.claim_outbox_batch()
+        assert {entry['_id'] for entry in again} == {entry['_id'] for entry in first}
+        assert {entry['lease_owner'] for entry in again}.isdisjoint({entry['lease_owner'] for entry in first})
+    run_with_outbox(test)
+
+
+def test_write_and_entries_commit_together():
+    async def test():
+        assert server.mongo_transactions
+        await server.write_with_outbox(
+            lambda session: server.db.contact_messages.insert_one({'_id': 'm1'}, session=session),
+            entries('contact:m1', 2)
+        )
+        assert await server.db.contact_messages.count_documents({}) == 1
+        assert await server.db.outbox.count_documents({}) == 2
+    run_with_outbox(test, replica_set=True)
+
+
+def test_failed_queueing_rolls_back_the_write(monkeypatch):
+    queue_notifications = server.queue_notifications
+
+    async def queue_then_fail(entries, session=None):
+        await queue_notifications(entries, session)
+        raise OperationFailure('outbox write failed', 2)
+
+    monkeypatch.setattr(server, 'queue_notifications', queue_then_fail)
+
+    async def test():
+        with pytest.raises(OperationFailure):
+            await server.write_with_outbox(
+                lambda session: server.db.contact_messages.insert_one({'_id': 'm1'}, session=session),
+                entries('contact:m1', 2)
+            )
+        assert await server.db.contact_messages.count_documents({}) == 0
+        assert await server.db.outbox.count_documents({}) == 0
+    run_with_outbox(test, replica_set=True)
+
+
+def test_transient_transaction_error_is_retried():
+    async def test():
+        attempts = []
+
+        async def write(session):
+            attempts.append(session)
+            await server.db.contact_messages.insert_one({'_id': 'm1'}, session=session)
+            if len(attempts) == 1:
+                raise OperationFailure('write conflict', 112, {'errorLabels': ['TransientTransactionError']})
+
+        await server.write_with_outbox(write, entries('contact:m1', 1))
+        assert len(attempts) == 2
+        assert await server.db.contact_messages.count_documents({}) == 1
+        assert await server.db.outbox.count_documents({}) == 1
+    run_with_outbox(test, replica_set=True)
@@ -0,0 +1,168 @@
+"""Email delivery from the outbox through a local SMTP stub.
+
+send_emails and the dispatcher loop need no database; the dispatch tests record
+outcomes in MongoDB at MONGO_URL (the `<DB_NAME>_test` database, dropped afterwards).
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+import pytest
+
+import server
+from mongo_test_db import connect_test_db, drop_test_db
+from smtp_stub import SMTPStub
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    """Starts a stub per test run and points the SMTP settings at it; call with the refused recipients."""
+    def configure(*refused):
+        stub = SMTPStub(refused)
+
+        async def start():
+            monkeypatch.setattr(server, 'SMTP_PORT', await stub.start())
+        stub.start_serving = start
+        return stub
+    monkeypatch.setattr(server, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(server, 'SMTP_STARTTLS', False)
+    monkeypatch.setattr(server, 'SMTP_USER', None)
+    return configure
+
+
+def email(key: str, to: str = 'admin@example.com', subject: str = 'Halo', body: str = 'Isi pesan\n', **extra):
+    return {**server.email_notification(key, 'test', to, subject, body, **extra), 'attempts': 0}
+
+
+def send(stub: SMTPStub, entries: list) -> list:
+    async def main():
+        await stub.start_serving()
+        try:
+            return await asyncio.to_thread(server.send_emails, entries)
+        finally:
+            await stub.stop()
+    return asyncio.run(main())
+
+
+def test_send_emails_delivers_each_entry(smtp):
+    stub = smtp()
+    errors = send(stub, [email('a', reply_to='budi@example.com'), email('b', to='ops@example.com')])
+    assert errors == [None, None]
+    assert [message['To'] for message in stub.messages] == ['admin@example.com', 'ops@example.com']
+    assert stub.messages[0]['Message-ID'] == '<a@mavecode.id>'
+    assert stub.messages[0]['Reply-To'] == 'budi@example.com'
+    assert stub.messages[0].get_content().rstrip() == 'Isi pesan'
+
+
+def test_line_breaks_in_headers_are_flattened(smtp):
+    stub = smtp()
+    errors = send(stub, [email('a', subject='[Kontak] Halo\r\nBcc: victim@example.com', reply_to='x@example.com\n')])
+    assert errors == [None]
+    assert stub.messages[0]['Subject'] == '[Kontak] Halo Bcc: victim@example.com'
+    assert stub.messages[0]['Bcc'] is None
+
+
+def test_a_bad_entry_fails_alone(smtp):
+    stub = smtp('gone@example.com')
+    errors = send(stub, [email('a'), email('b', body=None), email('c', to='gone@example.com'), email('d')])
+    assert errors[0] is None and errors[3] is None
+    assert errors[1] is not None
+    assert errors[2] is not None and 'SMTPRecipientsRefused' in errors[2]
+    assert stub.received == 2
+
+
+def test_dispatcher_survives_unexpected_errors(monkeypatch, caplog):
+    calls = []
+
+    async def dispatch():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError('boom')
+        return 0
+
+    monkeypatch.setattr(server, 'dispatch_outbox_batch', dispatch)
+    monkeypatch.setattr(server, 'OUTBOX_POLL_SECONDS', 0.01)
+
+    async def main():
+        dispatcher = asyncio.create_task(server.dispatch_outbox_forever())
+        await asyncio.sleep(0.1)
+        assert not dispatcher.done()
+        dispatcher.cancel()
+
+    with caplog.at_level(logging.ERROR, logger='server'):
+        asyncio.run(main())
+    assert len(calls) > 1
+    assert 'Outbox dispatch failed' in caplog.text
+
+
+def run_dispatch(stub: SMTPStub, test):
+    async def main():
+        await connect_test_db()
+        await server.setup_outbox()
+        await stub.start_serving()
+        try:
+            await test()
+        finally:
+            await stub.stop()
+            await drop_test_db()
+    asyncio.run(main())
+
+
+def test_dispatch_marks_sent_entries(smtp):
+    stub = smtp()
+
+    async def test():
+        await server.queue_notifications([email('contact:1:email', subject='Halo\nlagi')])
+        assert await server.dispatch_outbox_batch() == 1
+        entry = await server.db.outbox.find_one({'_id': 'contact:1:email'})
+        assert entry['status'] == 'sent' and entry['sent_at'] is not None and entry['lease_owner'] is None
+        assert stub.messages[0]['Subject'] == 'Halo lagi'
+    run_dispatch(stub, test)
+
+
+def test_dispatch_retries_with_backoff(smtp):
+    stub = smtp('gone@example.com')
+
+    async def test():
+        await server.queue_notifications([email('reminder:1', to='gone@example.com')])
+        before = server.utcnow()
+        await server.dispatch_outbox_batch()
+        entry = await server.db.outbox.find_one({'_id': 'reminder:1'})
+        assert entry['status'] == 'pending' and entry['attempts'] == 1
+        assert 'SMTPRecipientsRefused' in entry['error']
+        assert entry['next_attempt_at'] >= before + timedelta(seconds=server.OUTBOX_RETRY_BASE_SECONDS)
+        # Not due yet: the next pass leaves it alone
+        assert await server.dispatch_outbox_batch() == 0
+        await server.db.outbox.update_one({'_id': 'reminder:1'}, {'$set': {'next_attempt_at': server.utcnow()}})
+        await server.dispatch_outbox_batch()
+        entry = await server.db.outbox.find_one({'_id': 'reminder:1'})
+        assert entry['attempts'] == 2
+        assert entry['next_attempt_at'] >= server.utcnow() + timedelta(seconds=server.OUTBOX_RETRY_BASE_SECONDS * 2 - 5)
+    run_dispatch(stub, test)
+
+
+def test_dispatch_gives_up_after_max_attempts(smtp):
+    stub = smtp('gone@example.com')
+
+    async def test():
+        await server.queue_notifications([email('reminder:1', to='gone@example.com')])
+        await server.db.outbox.update_one({'_id': 'reminder:1'},
+                                          {'$set': {'attempts': server.OUTBOX_MAX_ATTEMPTS - 1}})
+        await server.dispatch_outbox_batch()
+        entry = await server.db.outbox.find_one({'_id': 'reminder:1'})
+        assert entry['status'] == 'failed' and entry['attempts'] == server.OUTBOX_MAX_ATTEMPTS
+        assert await server.dispatch_outbox_batch() == 0
+    run_dispatch(stub, test)
+
+
+def test_malformed_entry_does_not_block_the_batch(smtp):
+    stub = smtp()
+
+    async def test():
+        await server.queue_notifications([email('a'), email('b', body=None), email('c')])
+        assert await server.dispatch_outbox_batch() == 3
+        statuses = {entry['_id']: entry['status'] async for entry in server.db.outbox.find({})}
+        assert statuses == {'a': 'sent', 'b': 'pending', 'c': 'sent'}
+        assert stub.received == 2
+    run_dispatch(stub, test)
@@ -0,0 +1,64 @@
+"""Lesson progress against MONGO_URL: quiz items are only completed by grading.
+
+Everything is written to the `<DB_NAME>_test` database, which is dropped afterwards.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from mongo_test_db import connect_test_db, drop_test_db
+
+USER = {'id': str(uuid.uuid4())}
+COURSE_ID = str(uuid.uuid4())
+
+
+def run_with_items(test):
+    async def main():
+        await connect_test_db()
+        try:
+            items = {kind: str(uuid.uuid4()) for kind in ('video', 'quiz')}
+            await server.db.videos.insert_many([
+                server.stored_document({'id': item_id, 'course_id': COURSE_ID, 'type': kind})
+                for kind, item_id in items.items()
+            ])
+            await test(items)
+        finally:
+            await drop_test_db()
+    asyncio.run(main())
+
+
+def progress(video_id: str, completed: bool) -> server.UserProgress:
+    return server.UserProgress(user_id=USER['id'], course_id=COURSE_ID, video_id=video_id, completed=completed,
+                               progress_percent=100 if completed else 0)
+
+
+async def completed(video_id: str) -> bool:
+    row = await server.db.progress.find_one(
+        server.stored_document({'user_id': USER['id'], 'course_id': COURSE_ID, 'video_id': video_id}))
+    return bool((row or {}).get('completed'))
+
+
+def test_quiz_item_cannot_be_marked_complete_directly():
+    async def test(items):
+        await server.update_progress(progress(items['video'], True), USER)
+        assert await completed(items['video'])
+        with pytest.raises(HTTPException) as error:
+            await server.update_progress(progress(items['quiz'], True), USER)
+        assert error.value.status_code == 400
+        assert not await completed(items['quiz'])
+    run_with_items(test)
+
+
+def test_graded_quiz_item_keeps_its_completion():
+    async def test(items):
+        await server.record_quiz_progress(USER['id'], COURSE_ID, items['quiz'], 80, True, server.utcnow())
+        # Re-posting the graded state is accepted; undoing it is not
+        await server.update_progress(progress(items['quiz'], True), USER)
+        with pytest.raises(HTTPException):
+            await server.update_progress(progress(items['quiz'], False), USER)
+        assert await completed(items['quiz'])
+    run_with_items(test)
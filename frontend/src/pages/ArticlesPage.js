@@ -39,7 +39,7 @@ export const ArticlesPage = () => {
         setLoading(true);
         try {
           const res = await axios.get(`${API}/articles`, {
-            params: { category: categoryFilter || undefined }
+            params: { category: categoryFilter || undefined, view: 'summary' }
           });
           setArticles(res.data);
         } catch (err) {
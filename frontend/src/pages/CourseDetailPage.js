@@ -29,21 +29,12 @@ export const CourseDetailPage = () => {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const [courseRes, videosRes] = await Promise.all([
-          axios.get(`${API}/courses/${id}`),
-          axios.get(`${API}/courses/${id}/videos`)
-        ]);
-        setCourse(courseRes.data);
-        setVideos(videosRes.data);
-
-        if (token) {
-          try {
-            const progressRes = await axios.get(`${API}/progress/${id}`, {
-              headers: { Authorization: `Bearer ${token}` }
-            });
-            setProgress(progressRes.data);
-          } catch (err) { }
-        }
+        const res = await axios.get(`${API}/courses/${id}/full`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {}
+        });
+        setCourse(res.data.course);
+        setVideos(res.data.videos);
+        setProgress(res.data.progress || []);
       } catch (err) {
         console.error('Error fetching course:', err);
       } finally {
@@ -32,23 +32,17 @@ const CoursePlayerPage = () => {
         const fetchData = async () => {
             setLoading(true);
             try {
-                const [courseRes, videosRes] = await Promise.all([
-                    axios.get(`${API}/courses/${id}`),
-                    axios.get(`${API}/courses/${id}/videos`)
-                ]);
-                setCourse(courseRes.data);
-                setVideos(videosRes.data);
+                const res = await axios.get(`${API}/courses/${id}/full`, {
+                    headers: token ? { Authorization: `Bearer ${token}` } : {}
+                });
+                setCourse(res.data.course);
+                setVideos(res.data.videos);
 
-                if (videosRes.data.length > 0) {
-                    setCurrentVideo(videosRes.data[0]);
+                if (res.data.videos.length > 0) {
+                    setCurrentVideo(res.data.videos[0]);
                 }
 
-                if (token) {
-                    const progressRes = await axios.get(`${API}/progress/${id}`, {
-                        headers: { Authorization: `Bearer ${token}` }
-                    });
-                    setProgress(progressRes.data);
-                }
+                setProgress(res.data.progress || []);
             } catch (err) {
                 console.error('Error fetching course player data:', err);
                 toast.error('Gagal memuat materi belajar');
@@ -44,7 +44,7 @@ export const DashboardPage = () => {
         // Fetch saved articles
         const savedSlugs = JSON.parse(localStorage.getItem('mavecode_saved_articles') || '[]');
         if (savedSlugs.length > 0) {
-          const articlesRes = await axios.get(`${API}/articles`);
+          const articlesRes = await axios.get(`${API}/articles`, { params: { view: 'summary' } });
           const saved = articlesRes.data.filter(a => savedSlugs.includes(a.slug));
           setSavedArticles(saved);
         }
@@ -99,8 +99,8 @@ export const LandingPage = () => {
       try {
         const [statsRes, coursesRes, articlesRes, categoriesRes, heroRes] = await Promise.all([
           axios.get(`${API}/stats`).catch(() => ({ data: stats })),
-          axios.get(`${API}/courses`).catch(() => ({ data: [] })),
-          axios.get(`${API}/articles`).catch(() => ({ data: [] })),
+          axios.get(`${API}/courses`, { params: { view: 'summary' } }).catch(() => ({ data: [] })),
+          axios.get(`${API}/articles`, { params: { view: 'summary' } }).catch(() => ({ data: [] })),
           axios.get(`${API}/categories`).catch(() => ({ data: [] })),
           axios.get(`${API}/hero`).catch(() => ({ data: hero }))
         ]);